@@ -30,7 +30,8 @@ CREATE TABLE courses (
     course_code VARCHAR(20) NOT NULL UNIQUE,
     name VARCHAR(100) NOT NULL,
     credits INT NOT NULL,
-    description TEXT
+    description TEXT,
+    INDEX ix_courses_name (name)  -- Tìm / sắp xếp theo tên trên trang quản lý
 );
 
 -- 5. Bảng students: thông tin sinh viên (nghiệp vụ)
@@ -42,7 +43,10 @@ CREATE TABLE students (
     date_of_birth DATE,
     email VARCHAR(100),
     is_active BOOLEAN DEFAULT TRUE,  -- ✅ Thêm: hỗ trợ deactivate
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX ix_students_full_name (full_name),
+    INDEX ix_students_active_code (is_active, student_code),  -- Lọc trạng thái + phân trang
+    INDEX ix_students_active_name (is_active, full_name)
 );
 
 -- 6. Bảng instructors: thông tin giảng viên (nghiệp vụ)
@@ -54,7 +58,9 @@ CREATE TABLE instructors (
     department VARCHAR(100),
     email VARCHAR(100),
     is_active BOOLEAN DEFAULT TRUE,  -- ✅ Thêm: hỗ trợ deactivate
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX ix_instructors_full_name (full_name),
+    INDEX ix_instructors_department (department)
 );
 
 -- 7. Bảng sections: lớp học phần
@@ -67,10 +73,15 @@ CREATE TABLE sections (
     schedule_info VARCHAR(255),
     max_capacity INT DEFAULT 50,
     total_sessions INT DEFAULT 15,  -- ✅ Thêm: tổng số buổi học của môn
+    enrolled_count INT NOT NULL DEFAULT 0,  -- Sĩ số hiện tại (đăng ký active), đối soát: flask recount-enrollments
+    schedule_mask BLOB,  -- Mặt nạ bit các ô thời gian của lịch học (NULL: tự phân tích schedule_info khi cần)
     FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
     FOREIGN KEY (instructor_id) REFERENCES instructors(id) ON DELETE RESTRICT,
     FOREIGN KEY (semester_id) REFERENCES semesters(id) ON DELETE CASCADE,
-    UNIQUE(course_id, section_code, semester_id)  -- ✅ Cải tiến: tránh xung đột mã lớp
+    UNIQUE(course_id, section_code, semester_id),  -- ✅ Cải tiến: tránh xung đột mã lớp
+    INDEX ix_sections_section_code (section_code),
+    INDEX ix_sections_semester_code (semester_id, section_code),  -- Lọc theo học kỳ + phân trang
+    INDEX ix_sections_instructor_semester (instructor_id, semester_id)  -- Kiểm tra trùng lịch giảng viên
 );
 
 -- 8. Bảng enrollments: đăng ký học
@@ -114,6 +125,92 @@ CREATE TABLE attendance (
     UNIQUE(enrollment_id, section_id, session_number)  -- Mỗi sinh viên chỉ có 1 bản ghi điểm danh cho mỗi buổi học
 );
 
+-- 11. Bảng section_attendance_summary: tổng hợp điểm danh theo lớp
+-- (cập nhật khi điểm danh, đối soát bằng lệnh: flask rebuild-attendance-summary)
+CREATE TABLE section_attendance_summary (
+    section_id INT PRIMARY KEY,
+    sessions_marked INT NOT NULL DEFAULT 0,
+    total_marked INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (section_id) REFERENCES sections(id) ON DELETE CASCADE
+);
+
+-- 12. Bảng report_snapshots: ảnh chụp báo cáo đã tính sẵn (JSON)
+-- (tự tính lại ở lần xem đầu tiên sau khi phiên bản dữ liệu điểm thay đổi)
+CREATE TABLE report_snapshots (
+    name VARCHAR(50) PRIMARY KEY,
+    data_version INT NOT NULL DEFAULT 0,  -- Phiên bản data_versions lúc tính
+    payload TEXT NOT NULL,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 13. Bảng student_grade_summary: tổng hợp điểm theo sinh viên (trung bình có trọng số tín chỉ)
+-- (cập nhật khi nhập điểm, đối soát bằng lệnh: flask rebuild-grade-summary)
+CREATE TABLE student_grade_summary (
+    student_id INT PRIMARY KEY,
+    credits_attempted INT NOT NULL DEFAULT 0,
+    credits_earned INT NOT NULL DEFAULT 0,
+    weighted_score_sum DECIMAL(10,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+);
+
+-- 14. Bảng student_semester_grade_summary: tổng hợp điểm theo sinh viên trong từng học kỳ
+CREATE TABLE student_semester_grade_summary (
+    student_id INT NOT NULL,
+    semester_id INT NOT NULL,
+    credits_attempted INT NOT NULL DEFAULT 0,
+    credits_earned INT NOT NULL DEFAULT 0,
+    weighted_score_sum DECIMAL(10,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (student_id, semester_id),
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (semester_id) REFERENCES semesters(id) ON DELETE CASCADE
+);
+
+-- 15. Bảng data_versions: số phiên bản dữ liệu theo phạm vi (tăng khi ghi điểm / đăng ký / sửa danh mục)
+CREATE TABLE data_versions (
+    scope VARCHAR(20) NOT NULL,
+    scope_id INT NOT NULL,
+    version INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (scope, scope_id)
+);
+
+-- 16. Bảng student_transcripts: bảng điểm dựng sẵn theo sinh viên (JSON)
+-- (dựng lại ở lần xem đầu tiên khi phiên bản dữ liệu thay đổi)
+CREATE TABLE student_transcripts (
+    student_id INT PRIMARY KEY,
+    student_version INT NOT NULL,
+    catalog_version INT NOT NULL,
+    payload TEXT NOT NULL,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+);
+
+-- 17. Bảng section_meetings: các buổi học trong tuần của lớp (phân tích từ sections.schedule_info)
+-- (lớp chưa có dòng nào được phân tích khi cần, hoặc chạy: flask rebuild-timetables)
+CREATE TABLE section_meetings (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    section_id INT NOT NULL,
+    weekday SMALLINT NOT NULL,  -- 2..7 = Thứ 2..Thứ 7, 8 = Chủ nhật
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    room VARCHAR(20),
+    FOREIGN KEY (section_id) REFERENCES sections(id) ON DELETE CASCADE,
+    INDEX ix_section_meetings_section (section_id),
+    INDEX ix_section_meetings_room (room, weekday)
+);
+
+-- 18. Bảng student_timetables: các ô thời gian sinh viên đã bận trong học kỳ (kiểm tra trùng lịch)
+CREATE TABLE student_timetables (
+    student_id INT NOT NULL,
+    semester_id INT NOT NULL,
+    occupied_mask BLOB NOT NULL,
+    PRIMARY KEY (student_id, semester_id),
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (semester_id) REFERENCES semesters(id) ON DELETE CASCADE
+);
+
 -- ====================================================================
 -- CHÈN DỮ LIỆU MẪU – ĐÃ CẬP NHẬT is_active = TRUE (mặc định)
 -- ====================================================================
@@ -215,4 +312,33 @@ INSERT INTO grades (enrollment_id, score, grade_letter, submitted_by) VALUES
 -- MinhHieu
 (14, 5.0, 'C', 1),
 (15, 8.8, 'A', 4),
-(16, 6.8, 'B', 5);
\ No newline at end of file
+(16, 6.8, 'B', 5);
+
+-- Bước 9: Sĩ số các lớp học phần
+UPDATE sections s
+SET s.enrolled_count = (SELECT COUNT(*) FROM enrollments e WHERE e.section_id = s.id AND e.status = 'active');
+
+-- Bước 10: Tổng hợp điểm danh theo lớp (tính từ dữ liệu mẫu ở trên)
+INSERT INTO section_attendance_summary (section_id, sessions_marked, total_marked)
+SELECT s.id,
+       (SELECT COUNT(DISTINCT a.session_number) FROM attendance a WHERE a.section_id = s.id),
+       (SELECT COUNT(*) FROM attendance a WHERE a.section_id = s.id)
+FROM sections s;
+
+-- Bước 11: Tổng hợp điểm theo sinh viên (tín chỉ đạt: điểm chữ khác F)
+INSERT INTO student_semester_grade_summary (student_id, semester_id, credits_attempted, credits_earned, weighted_score_sum)
+SELECT e.student_id, s.semester_id,
+       SUM(c.credits),
+       SUM(CASE WHEN g.grade_letter = 'F' OR (g.grade_letter IS NULL AND g.score < 4) THEN 0 ELSE c.credits END),
+       SUM(c.credits * g.score)
+FROM grades g
+JOIN enrollments e ON e.id = g.enrollment_id
+JOIN sections s ON s.id = e.section_id
+JOIN courses c ON c.id = s.course_id
+WHERE g.score IS NOT NULL
+GROUP BY e.student_id, s.semester_id;
+
+INSERT INTO student_grade_summary (student_id, credits_attempted, credits_earned, weighted_score_sum)
+SELECT student_id, SUM(credits_attempted), SUM(credits_earned), SUM(weighted_score_sum)
+FROM student_semester_grade_summary
+GROUP BY student_id;
@@ -1,12 +1,36 @@
 from flask import Flask, session, redirect, url_for
 from academic_system.config import Config
+from academic_system.templating import init_template_cache
+from academic_system.assets import init_assets
 from academic_system.models import db
+from academic_system.pool_metrics import init_pool_metrics
+from academic_system.dialects import configure_backend
+from academic_system.db_routing import configure_replica
+from academic_system.sql_metrics import init_sql_metrics
+from academic_system.principals import init_principal_cache
+from academic_system.fragments import init_fragment_cache
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
     
+    init_template_cache(app)  # Trước mọi thao tác dùng app.jinja_env
+    init_assets(app)
+    init_pool_metrics(app)
+    configure_backend(app)
+    configure_replica(app)
     db.init_app(app)
+    init_sql_metrics(app)
+    init_principal_cache(app)
+    init_fragment_cache(app)
+    
+    if app.config.get('CREATE_SCHEMA_ON_START'):
+        with app.app_context():
+            db.create_all(bind_key=None)  # chỉ CSDL chính, không tạo bảng trên replica
+    
+    if app.config.get('REGISTRATION_QUEUE_ENABLED'):
+        from academic_system.registration_queue import init_registration_queue
+        init_registration_queue(app)
     
     # Import và đăng ký blueprints
     from academic_system.auth import auth_bp
@@ -19,6 +43,10 @@ def create_app():
     app.register_blueprint(lecturer_bp, url_prefix='/lecturer')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
+    # Đăng ký các lệnh quản trị (flask <command>)
+    from academic_system.commands import register_commands
+    register_commands(app)
+    
     @app.route('/')
     def index():
         if 'user_id' in session:
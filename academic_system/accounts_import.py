@@ -0,0 +1,186 @@
+import csv
+import io
+import os
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from academic_system.models import db, User, Student, Instructor
+
+# ========== NHẬP HÀNG LOẠT SINH VIÊN / GIẢNG VIÊN ==========
+# File được đọc tuần tự từng dòng (CSV hoặc XLSX chế độ read-only), kiểm tra trùng
+# với tập username / mã đã lấy trước từ CSDL và ghi theo lô bằng executemany,
+# nên bộ nhớ không phụ thuộc kích thước file.
+# Mỗi lô được commit ngay: dòng lỗi chỉ bị bỏ qua (và liệt kê), không hủy các dòng đã ghi.
+# Trùng username / mã được so không phân biệt hoa thường như collation utf8mb4_unicode_ci.
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 200
+
+ACCOUNT_TYPES = {
+    'students': {
+        'role': 'student',
+        'model': Student,
+        'code_field': 'student_code',
+        'fields': ['username', 'password', 'full_name', 'student_code', 'date_of_birth', 'email']
+    },
+    'instructors': {
+        'role': 'lecturer',
+        'model': Instructor,
+        'code_field': 'instructor_code',
+        'fields': ['username', 'password', 'full_name', 'instructor_code', 'department', 'email']
+    }
+}
+
+class ImportResult:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.processed = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []  # (dòng, thông báo), chỉ giữ MAX_REPORTED_ERRORS lỗi đầu tiên
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+def iter_account_rows(stream, filename):
+    # Sinh ra (số dòng, dict cột -> giá trị) từ file CSV (UTF-8) hoặc XLSX có dòng tiêu đề
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.xlsx':
+        yield from _iter_xlsx_rows(stream)
+    elif extension == '.csv':
+        reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        header = _normalize_header(next(reader, []))
+        for line, values in enumerate(reader, start=2):
+            yield line, dict(zip(header, values))
+    else:
+        raise ValueError('Chỉ hỗ trợ file .csv hoặc .xlsx')
+
+def _iter_xlsx_rows(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Cần cài thư viện openpyxl để đọc file .xlsx (pip install openpyxl)')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, []))
+        for line, values in enumerate(rows, start=2):
+            yield line, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+def _normalize_header(header):
+    return [str(name or '').strip().lower() for name in header]
+
+def _max_lengths(spec):
+    # Độ dài tối đa của các cột chuỗi, lấy từ models.py
+    columns = {'username': User.username, 'password': User.password}
+    columns.update((field, getattr(spec['model'], field)) for field in spec['fields'] if field not in columns)
+    return {field: column.type.length for field, column in columns.items()
+            if getattr(column.type, 'length', None)}
+
+def _clean(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return str(value).strip()
+
+def import_accounts(account_type, rows, dry_run=False, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    # rows: iterable (số dòng, dict) từ iter_account_rows; progress(result) được gọi sau mỗi lô
+    spec = ACCOUNT_TYPES[account_type]
+    code_field = spec['code_field']
+    code_column = getattr(spec['model'], code_field)
+    max_lengths = _max_lengths(spec)
+
+    # Lấy trước username và mã đã có để kiểm tra trùng mà không cần SELECT từng dòng
+    usernames = {username.lower() for (username,) in db.session.query(User.username).yield_per(5000)}
+    codes = {code.lower() for (code,) in db.session.query(code_column).yield_per(5000)}
+
+    result = ImportResult(dry_run)
+    batch = []
+    for line, raw in rows:
+        result.processed += 1
+        record = {field: _clean(raw.get(field)) for field in spec['fields']}
+
+        missing = [field for field in ('username', 'password', 'full_name', code_field) if not record[field]]
+        if missing:
+            result.add_error(line, f'Thiếu thông tin bắt buộc: {", ".join(missing)}')
+            continue
+        too_long = [f'{field} (tối đa {length} ký tự)' for field, length in max_lengths.items()
+                    if len(record[field]) > length]
+        if too_long:
+            result.add_error(line, f'Giá trị quá dài: {", ".join(too_long)}')
+            continue
+        record['email'] = record['email'].lower()
+        if record['username'].lower() in usernames:
+            result.add_error(line, f'Tên đăng nhập {record["username"]} đã tồn tại')
+            continue
+        if record[code_field].lower() in codes:
+            result.add_error(line, f'Mã {record[code_field]} đã tồn tại')
+            continue
+        if record.get('date_of_birth'):
+            try:
+                record['date_of_birth'] = datetime.strptime(record['date_of_birth'], '%Y-%m-%d').date()
+            except ValueError:
+                result.add_error(line, 'Ngày sinh phải có dạng YYYY-MM-DD')
+                continue
+
+        usernames.add(record['username'].lower())
+        codes.add(record[code_field].lower())
+        batch.append((line, record))
+
+        if len(batch) >= batch_size:
+            _write_batch(spec, batch, result)
+            batch = []
+            if progress:
+                progress(result)
+
+    if batch:
+        _write_batch(spec, batch, result)
+    if progress:
+        progress(result)
+    return result
+
+def _write_batch(spec, batch, result):
+    # batch: danh sách (số dòng, record)
+    if result.dry_run:
+        result.created += len(batch)
+        return
+
+    try:
+        _insert_records(spec, [record for _, record in batch])
+        db.session.commit()
+        result.created += len(batch)
+        return
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    # Lô bị CSDL từ chối: ghi lại từng dòng để chỉ ra đúng dòng lỗi
+    for line, record in batch:
+        try:
+            _insert_records(spec, [record])
+            db.session.commit()
+            result.created += 1
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            result.add_error(line, f'CSDL từ chối dòng này: {getattr(e, "orig", None) or e}')
+
+def _insert_records(spec, batch):
+    db.session.execute(insert(User), [
+        {'username': record['username'], 'password': record['password'], 'role': spec['role']}
+        for record in batch
+    ])
+    user_ids = dict(db.session.query(User.username, User.id).filter(
+        User.username.in_([record['username'] for record in batch])
+    ))
+
+    profile_fields = [field for field in spec['fields'] if field not in ('username', 'password')]
+    db.session.execute(insert(spec['model']), [
+        dict({field: record[field] or None for field in profile_fields},
+             user_id=user_ids[record['username']], is_active=True)
+        for record in batch
+    ])
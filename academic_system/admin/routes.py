@@ -1,6 +1,21 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
 from functools import wraps
-from academic_system.models import db, User, Student, Instructor, Course, Section, Enrollment, Grade, Semester, Attendance
+from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import contains_eager
+from academic_system.models import db, User, Student, Instructor, Course, Section, Enrollment, Grade, Semester, Attendance, SectionAttendanceSummary
+from academic_system.summaries import get_grade_report, invalidate_grade_report, refresh_grade_summaries
+from academic_system.accounts_import import ACCOUNT_TYPES, iter_account_rows, import_accounts
+from academic_system.pagination import keyset_paginate, prefix_pattern
+from academic_system.pool_metrics import pool_status
+from academic_system.fragments import SEATS, cached_fragment, fragment_cache_status
+from academic_system.db_routing import replica_reads
+from academic_system.principals import invalidate_principal
+from academic_system.versions import STUDENT, SECTION, bump_versions, bump_catalog
+from academic_system.timetable import (apply_schedule, invalidate_timetables, assignment_clashes, clash_message,
+                                      semester_clashes, weekday_label)
+from academic_system.exports import (export_response, export_filename, attendance_matrix_header,
+                                     max_total_sessions, iter_attendance_matrix, GRADE_HEADER, iter_grades)
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -33,12 +48,33 @@ def dashboard():
                          total_courses=total_courses,
                          total_sections=total_sections)
 
+def _departments():
+    # Danh sách khoa cho bộ lọc (dùng index ix_instructors_department)
+    rows = db.session.query(Instructor.department).filter(Instructor.department.isnot(None))\
+        .distinct().order_by(Instructor.department)
+    return [department for (department,) in rows]
+
 # ========== QUẢN LÝ SINH VIÊN ==========
 @admin_bp.route('/students')
 @admin_required
 def students():
-    students_list = Student.query.join(User).all()
-    return render_template('admin/students.html', students=students_list)
+    query = Student.query
+    
+    # Lọc phía server: tìm theo tiền tố mã / tên, trạng thái
+    q = request.args.get('q', '').strip()
+    if q:
+        pattern = prefix_pattern(q)
+        query = query.filter(or_(Student.student_code.like(pattern, escape='\\'),
+                                 Student.full_name.like(pattern, escape='\\')))
+    status = request.args.get('status')
+    if status in ('active', 'inactive'):
+        query = query.filter(Student.is_active == (status == 'active'))
+    
+    sort = request.args.get('sort', 'code')
+    sort_columns = [Student.full_name, Student.id] if sort == 'name' else [Student.student_code, Student.id]
+    page = keyset_paginate(query, sort_columns)
+    
+    return render_template('admin/students.html', students=page.items, page=page)
 
 @admin_bp.route('/students/add', methods=['GET', 'POST'])
 @admin_required
@@ -103,7 +139,9 @@ def edit_student(student_id):
             flash('Mã sinh viên đã tồn tại', 'danger')
             return render_template('admin/edit_student.html', student=student)
         
+        _bump_student_pages(student_id)
         db.session.commit()
+        invalidate_principal(student.user_id)
         flash('Cập nhật thông tin sinh viên thành công', 'success')
         return redirect(url_for('admin.students'))
     
@@ -114,18 +152,48 @@ def edit_student(student_id):
 def toggle_student(student_id):
     student = Student.query.get_or_404(student_id)
     student.is_active = not student.is_active
+    _bump_student_pages(student_id)
     db.session.commit()
+    invalidate_principal(student.user_id)
     
     status = 'kích hoạt' if student.is_active else 'vô hiệu hóa'
     flash(f'Đã {status} sinh viên thành công', 'success')
     return redirect(url_for('admin.students'))
 
+def _bump_student_pages(student_id):
+    # Hồ sơ sinh viên hiển thị ở trang của sinh viên và danh sách sinh viên các lớp đã đăng ký
+    bump_versions(STUDENT, [student_id])
+    bump_versions(SECTION, [
+        section_id for section_id, in db.session.query(Enrollment.section_id).filter_by(student_id=student_id)
+    ])
+
 # ========== QUẢN LÝ GIẢNG VIÊN ==========
 @admin_bp.route('/instructors')
 @admin_required
 def instructors():
-    instructors_list = Instructor.query.join(User).all()
-    return render_template('admin/instructors.html', instructors=instructors_list)
+    query = Instructor.query
+    
+    # Lọc phía server: tìm theo tiền tố mã / tên, trạng thái, khoa
+    q = request.args.get('q', '').strip()
+    if q:
+        pattern = prefix_pattern(q)
+        query = query.filter(or_(Instructor.instructor_code.like(pattern, escape='\\'),
+                                 Instructor.full_name.like(pattern, escape='\\')))
+    status = request.args.get('status')
+    if status in ('active', 'inactive'):
+        query = query.filter(Instructor.is_active == (status == 'active'))
+    department = request.args.get('department')
+    if department:
+        query = query.filter(Instructor.department == department)
+    
+    sort = request.args.get('sort', 'code')
+    sort_columns = [Instructor.full_name, Instructor.id] if sort == 'name' else [Instructor.instructor_code, Instructor.id]
+    page = keyset_paginate(query, sort_columns)
+    
+    return render_template('admin/instructors.html',
+                         instructors=page.items,
+                         page=page,
+                         departments=_departments())
 
 @admin_bp.route('/instructors/add', methods=['GET', 'POST'])
 @admin_required
@@ -186,7 +254,9 @@ def edit_instructor(instructor_id):
             flash('Mã giảng viên đã tồn tại', 'danger')
             return render_template('admin/edit_instructor.html', instructor=instructor)
         
+        bump_catalog()  # Tên giảng viên hiển thị ở thời khóa biểu của sinh viên
         db.session.commit()
+        invalidate_principal(instructor.user_id)
         flash('Cập nhật thông tin giảng viên thành công', 'success')
         return redirect(url_for('admin.instructors'))
     
@@ -198,17 +268,67 @@ def toggle_instructor(instructor_id):
     instructor = Instructor.query.get_or_404(instructor_id)
     instructor.is_active = not instructor.is_active
     db.session.commit()
+    invalidate_principal(instructor.user_id)
     
     status = 'kích hoạt' if instructor.is_active else 'vô hiệu hóa'
     flash(f'Đã {status} giảng viên thành công', 'success')
     return redirect(url_for('admin.instructors'))
 
+# ========== NHẬP HÀNG LOẠT TÀI KHOẢN ==========
+@admin_bp.route('/<any(students, instructors):account_type>/import', methods=['GET', 'POST'])
+@admin_required
+def import_accounts_view(account_type):
+    spec = ACCOUNT_TYPES[account_type]
+    result = None
+    
+    if request.method == 'POST':
+        accounts_file = request.files.get('accounts_file')
+        if not accounts_file or not accounts_file.filename:
+            flash('Vui lòng chọn file CSV hoặc XLSX', 'danger')
+            return redirect(url_for('admin.import_accounts_view', account_type=account_type))
+        
+        dry_run = request.form.get('dry_run') == '1'
+        try:
+            result = import_accounts(account_type,
+                                     iter_account_rows(accounts_file.stream, accounts_file.filename),
+                                     dry_run=dry_run)
+        except (ValueError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            flash(f'Không đọc được file: {e}', 'danger')
+            return redirect(url_for('admin.import_accounts_view', account_type=account_type))
+        except SQLAlchemyError:
+            # Lỗi CSDL ngoài từng dòng (mất kết nối...): các lô đã ghi trước đó vẫn được giữ
+            db.session.rollback()
+            flash('Lỗi CSDL khi nhập file, các dòng đã ghi trước đó được giữ nguyên. Vui lòng thử lại', 'danger')
+            return redirect(url_for('admin.import_accounts_view', account_type=account_type))
+        
+        if dry_run:
+            flash(f'Kiểm tra xong: {result.created} dòng hợp lệ, {result.error_count} dòng lỗi (chưa ghi dữ liệu)', 'info')
+        else:
+            flash(f'Đã tạo {result.created} tài khoản, {result.error_count} dòng lỗi', 'success' if not result.error_count else 'warning')
+    
+    return render_template('admin/import_accounts.html',
+                         account_type=account_type,
+                         fields=spec['fields'],
+                         result=result)
+
 # ========== QUẢN LÝ MÔN HỌC ==========
 @admin_bp.route('/courses')
 @admin_required
 def courses():
-    courses_list = Course.query.all()
-    return render_template('admin/courses.html', courses=courses_list)
+    query = Course.query
+    
+    q = request.args.get('q', '').strip()
+    if q:
+        pattern = prefix_pattern(q)
+        query = query.filter(or_(Course.course_code.like(pattern, escape='\\'),
+                                 Course.name.like(pattern, escape='\\')))
+    
+    sort = request.args.get('sort', 'code')
+    sort_columns = [Course.name, Course.id] if sort == 'name' else [Course.course_code, Course.id]
+    page = keyset_paginate(query, sort_columns)
+    
+    return render_template('admin/courses.html', courses=page.items, page=page)
 
 @admin_bp.route('/courses/add', methods=['GET', 'POST'])
 @admin_required
@@ -253,6 +373,7 @@ def edit_course(course_id):
     course = Course.query.get_or_404(course_id)
     
     if request.method == 'POST':
+        old_credits = course.credits
         course.course_code = request.form.get('course_code')
         course.name = request.form.get('name')
         course.credits = int(request.form.get('credits'))
@@ -263,6 +384,10 @@ def edit_course(course_id):
             flash('Mã môn học đã tồn tại', 'danger')
             return render_template('admin/edit_course.html', course=course)
         
+        if course.credits != old_credits:
+            # Số tín chỉ thay đổi: tính lại điểm trung bình của các sinh viên đã học môn này
+            refresh_grade_summaries(_enrolled_student_ids(Section.course_id == course_id))
+        bump_catalog()
         db.session.commit()
         flash('Cập nhật môn học thành công', 'success')
         return redirect(url_for('admin.courses'))
@@ -288,8 +413,40 @@ def delete_course(course_id):
 @admin_bp.route('/sections')
 @admin_required
 def sections():
-    sections_list = Section.query.join(Course).join(Instructor).join(Semester).all()
-    return render_template('admin/sections.html', sections=sections_list)
+    # Bộ lọc, bảng và phân trang giống nhau với mọi quản trị viên: giữ trong fragment cache theo URL,
+    # chỉ truy vấn khi chưa có. Sĩ số (tag SEATS) không hiển thị ở đây nên đăng ký mới không làm mới trang
+    sections_table = cached_fragment(
+        'admin-sections', (request.full_path,), ('sections', 'courses', 'instructors', 'semesters'),
+        _render_sections_table
+    )
+    return render_template('admin/sections.html', sections_table=sections_table)
+
+def _render_sections_table():
+    # Môn học và học kỳ được nạp bằng JOIN (xem models.py), giảng viên nạp cùng phép JOIN lọc
+    query = Section.query.join(Section.instructor).options(contains_eager(Section.instructor))
+    
+    q = request.args.get('q', '').strip()
+    if q:
+        query = query.filter(Section.section_code.like(prefix_pattern(q), escape='\\'))
+    semester_id = request.args.get('semester_id', type=int)
+    if semester_id:
+        query = query.filter(Section.semester_id == semester_id)
+    department = request.args.get('department')
+    if department:
+        query = query.filter(Instructor.department == department)
+    
+    sort = request.args.get('sort', 'code')
+    if sort == 'semester':
+        sort_columns = [Section.semester_id, Section.section_code, Section.id]
+    else:
+        sort_columns = [Section.section_code, Section.id]
+    page = keyset_paginate(query, sort_columns)
+    
+    return render_template('admin/_sections_table.html',
+                         sections=page.items,
+                         page=page,
+                         semesters=Semester.query.order_by(Semester.start_date.desc()).all(),
+                         departments=_departments())
 
 @admin_bp.route('/sections/add', methods=['GET', 'POST'])
 @admin_required
@@ -346,9 +503,20 @@ def add_section():
             instructor_id=int(instructor_id),
             semester_id=int(semester_id),
             section_code=section_code,
-            schedule_info=schedule_info if schedule_info else None,
             max_capacity=max_capacity_int
         )
+        errors = _schedule_errors(section, schedule_info)
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            courses = Course.query.all()
+            instructors = Instructor.query.filter_by(is_active=True).all()
+            semesters = Semester.query.all()
+            return render_template('admin/add_section.html',
+                                 courses=courses,
+                                 instructors=instructors,
+                                 semesters=semesters)
+        section.attendance_summary = SectionAttendanceSummary()
         db.session.add(section)
         db.session.commit()
         
@@ -363,18 +531,47 @@ def add_section():
                          instructors=instructors,
                          semesters=semesters)
 
+def _schedule_errors(section, schedule_info):
+    # Gán lịch học cho lớp; trả về các lỗi định dạng hoặc trùng lịch giảng viên / phòng học
+    try:
+        apply_schedule(section, schedule_info)
+    except ValueError as e:
+        return [str(e)]
+    return [clash_message(clash, section) for clash in assignment_clashes(section)]
+
+def _enrolled_student_ids(condition):
+    return [
+        student_id for student_id, in db.session.query(Enrollment.student_id)
+        .join(Section, Enrollment.section_id == Section.id)
+        .filter(condition)
+        .distinct()
+    ]
+
 @admin_bp.route('/sections/<int:section_id>/edit', methods=['GET', 'POST'])
 @admin_required
 def edit_section(section_id):
     section = Section.query.get_or_404(section_id)
     
     if request.method == 'POST':
+        old_placement = (section.course_id, section.semester_id)
+        old_timing = (section.semester_id, section.schedule_info)
         section.course_id = int(request.form.get('course_id'))
         section.instructor_id = int(request.form.get('instructor_id'))
         section.semester_id = int(request.form.get('semester_id'))
         section.section_code = request.form.get('section_code')
-        section.schedule_info = request.form.get('schedule_info') or None
         section.max_capacity = int(request.form.get('max_capacity'))
+        errors = _schedule_errors(section, request.form.get('schedule_info'))
+        if errors:
+            for error in errors:
+                flash(error, 'danger')
+            courses = Course.query.all()
+            instructors = Instructor.query.filter_by(is_active=True).all()
+            semesters = Semester.query.all()
+            return render_template('admin/edit_section.html',
+                                 section=section,
+                                 courses=courses,
+                                 instructors=instructors,
+                                 semesters=semesters)
         
         # Kiểm tra section_code trùng
         existing = Section.query.filter_by(
@@ -394,6 +591,12 @@ def edit_section(section_id):
                                  instructors=instructors,
                                  semesters=semesters)
         
+        if (section.course_id, section.semester_id) != old_placement:
+            refresh_grade_summaries(_enrolled_student_ids(Section.id == section_id))
+        if (section.semester_id, section.schedule_info) != old_timing:
+            # Các ô đã bận của sinh viên đang học lớp này được tính lại ở lần đăng ký sau
+            invalidate_timetables(_enrolled_student_ids(Section.id == section_id))
+        bump_catalog()
         db.session.commit()
         flash('Cập nhật lớp học phần thành công', 'success')
         return redirect(url_for('admin.sections'))
@@ -417,14 +620,33 @@ def delete_section(section_id):
         flash('Không thể xóa lớp học phần vì đang có sinh viên đăng ký', 'danger')
         return redirect(url_for('admin.sections'))
     
+    # Điểm của các đăng ký đã hủy bị xóa theo lớp: tính lại tổng hợp điểm của các sinh viên đó
+    student_ids = _enrolled_student_ids(Section.id == section_id)
     db.session.delete(section)
+    refresh_grade_summaries(student_ids)
+    invalidate_grade_report()
+    bump_catalog()
     db.session.commit()
     flash('Xóa lớp học phần thành công', 'success')
     return redirect(url_for('admin.sections'))
 
+@admin_bp.route('/sections/conflicts')
+@admin_required
+@replica_reads
+def section_conflicts():
+    semesters = Semester.query.order_by(Semester.start_date.desc()).all()
+    semester_id = request.args.get('semester_id', type=int) or (semesters[0].id if semesters else None)
+    clashes = semester_clashes(semester_id) if semester_id else []
+    return render_template('admin/section_conflicts.html',
+                         clashes=clashes,
+                         semesters=semesters,
+                         semester_id=semester_id,
+                         weekday_label=weekday_label)
+
 # ========== BÁO CÁO TỔNG HỢP ==========
 @admin_bp.route('/reports')
 @admin_required
+@replica_reads
 def reports():
     # Thống kê tổng hợp
     total_students = Student.query.count()
@@ -433,18 +655,8 @@ def reports():
     total_sections = Section.query.count()
     total_enrollments = Enrollment.query.filter_by(status='active').count()
     
-    # Điểm trung bình toàn trường
-    grades = Grade.query.all()
-    avg_score = 0
-    if grades:
-        total = sum(float(g.score) for g in grades if g.score)
-        avg_score = total / len(grades)
-    
-    # Phân bố điểm
-    grade_distribution = {'A': 0, 'B+': 0, 'B': 0, 'C+': 0, 'C': 0, 'D': 0, 'F': 0}
-    for grade in grades:
-        if grade.grade_letter:
-            grade_distribution[grade.grade_letter] = grade_distribution.get(grade.grade_letter, 0) + 1
+    # Điểm trung bình và phân bố điểm (lấy từ ảnh chụp đã tính sẵn)
+    grade_report, generated_at = get_grade_report()
     
     return render_template('admin/reports.html',
                          total_students=total_students,
@@ -452,31 +664,46 @@ def reports():
                          total_courses=total_courses,
                          total_sections=total_sections,
                          total_enrollments=total_enrollments,
-                         avg_score=round(avg_score, 2),
-                         grade_distribution=grade_distribution)
+                         avg_score=grade_report['avg_score'],
+                         graded_count=grade_report['graded_count'],
+                         grade_distribution=grade_report['grade_distribution'],
+                         generated_at=generated_at,
+                         semesters=Semester.query.order_by(Semester.start_date.desc()).all())
 
 @admin_bp.route('/attendance')
 @admin_required
+@replica_reads
 def attendance():
-    # Lấy tất cả các lớp học phần
-    sections = Section.query.join(Course).join(Semester).join(Instructor).all()
+    # Bảng thống kê giống nhau với mọi quản trị viên: giữ trong fragment cache, chỉ truy vấn khi chưa có
+    attendance_table = cached_fragment(
+        'admin-attendance', (),
+        ('sections', SEATS, 'courses', 'semesters', 'instructors', 'section_attendance_summary'),
+        lambda: render_template('admin/_attendance_table.html', sections_attendance=_sections_attendance())
+    )
+    return render_template('admin/attendance.html',
+                         attendance_table=attendance_table,
+                         semesters=Semester.query.order_by(Semester.start_date.desc()).all())
+
+def _sections_attendance():
+    # Lấy tất cả các lớp học phần kèm số liệu tổng hợp trong một truy vấn
+    rows = db.session.query(Section, SectionAttendanceSummary)\
+        .join(Course).join(Semester).join(Instructor)\
+        .outerjoin(SectionAttendanceSummary, SectionAttendanceSummary.section_id == Section.id)\
+        .options(contains_eager(Section.course),
+                 contains_eager(Section.semester),
+                 contains_eager(Section.instructor))\
+        .all()
     
     # Thống kê điểm danh cho mỗi lớp
     sections_attendance = []
-    for section in sections:
-        # Lấy số sinh viên đã đăng ký
-        enrollments_count = Enrollment.query.filter_by(
-            section_id=section.id,
-            status='active'
-        ).count()
-        
-        # Lấy số buổi đã điểm danh
-        attendances = Attendance.query.filter_by(section_id=section.id).all()
-        sessions_marked = len(set((att.session_number for att in attendances)))
+    for section, summary in rows:
+        enrollments_count = section.enrolled_count
+        # Lớp chưa có dòng tổng hợp: chạy "flask rebuild-attendance-summary" để đối soát
+        sessions_marked = summary.sessions_marked if summary else 0
+        total_marked = summary.total_marked if summary else 0
         
         # Tính tỷ lệ điểm danh
         total_possible = enrollments_count * section.total_sessions
-        total_marked = len(attendances)
         attendance_percentage = (total_marked / total_possible * 100) if total_possible > 0 else 0
         
         sections_attendance.append({
@@ -487,12 +714,11 @@ def attendance():
             'attendance_percentage': round(attendance_percentage, 1),
             'total_marked': total_marked
         })
-    
-    return render_template('admin/attendance.html',
-                         sections_attendance=sections_attendance)
+    return sections_attendance
 
 @admin_bp.route('/attendance/section/<int:section_id>')
 @admin_required
+@replica_reads
 def section_attendance_detail(section_id):
     section = Section.query.get_or_404(section_id)
     
@@ -565,3 +791,61 @@ def section_attendance_detail(section_id):
                          students_attendance=students_attendance,
                          total_sessions=section.total_sessions)
 
+# ========== XUẤT FILE ==========
+def _export(filename, fmt, header, rows, fallback):
+    try:
+        return export_response(filename, fmt, header, rows)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(fallback)
+
+@admin_bp.route('/attendance/section/<int:section_id>/export.<any(csv, xlsx):fmt>')
+@admin_required
+@replica_reads
+def export_section_attendance(section_id, fmt):
+    section = Section.query.get_or_404(section_id)
+    total_sessions = section.total_sessions
+    return _export(export_filename('diem_danh', section.course.course_code, section.section_code), fmt,
+                   attendance_matrix_header(total_sessions),
+                   iter_attendance_matrix(total_sessions, section_id=section_id),
+                   url_for('admin.section_attendance_detail', section_id=section_id))
+
+@admin_bp.route('/attendance/export.<any(csv, xlsx):fmt>')
+@admin_required
+@replica_reads
+def export_semester_attendance(fmt):
+    # Ma trận điểm danh của tất cả lớp trong học kỳ (?semester_id=) trong một file
+    semester_id = request.args.get('semester_id', type=int)
+    if not semester_id:
+        flash('Vui lòng chọn học kỳ cần xuất điểm danh', 'warning')
+        return redirect(url_for('admin.attendance'))
+    semester = Semester.query.get_or_404(semester_id)
+    total_sessions = max_total_sessions(semester_id=semester_id)
+    return _export(export_filename('diem_danh', semester.name), fmt,
+                   attendance_matrix_header(total_sessions),
+                   iter_attendance_matrix(total_sessions, semester_id=semester_id),
+                   url_for('admin.attendance'))
+
+@admin_bp.route('/reports/grades/export.<any(csv, xlsx):fmt>')
+@admin_required
+@replica_reads
+def export_grades(fmt):
+    # Điểm toàn trường, hoặc một học kỳ nếu có ?semester_id=
+    semester_id = request.args.get('semester_id', type=int)
+    semester = Semester.query.get_or_404(semester_id) if semester_id else None
+    return _export(export_filename('diem', semester.name if semester else 'toan_truong'), fmt,
+                   GRADE_HEADER, iter_grades(semester_id=semester_id),
+                   url_for('admin.reports'))
+
+# ========== GIÁM SÁT HỆ THỐNG ==========
+@admin_bp.route('/system/db-pool')
+@admin_required
+def db_pool_status():
+    # Số liệu connection pool của tiến trình worker đang xử lý request này
+    return jsonify(pool_status(db.engines))
+
+@admin_bp.route('/system/fragment-cache')
+@admin_required
+def fragment_cache_stats():
+    # Số lần trúng / trượt fragment cache theo từng đoạn của tiến trình worker này
+    return jsonify(fragment_cache_status())
@@ -0,0 +1,186 @@
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import shutil
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+# ========== TÀI NGUYÊN TĨNH ĐÃ ĐÁNH DẤU NỘI DUNG ==========
+# "flask build-assets" chép mỗi file trong static/ sang static/dist/ với tên kèm mã băm nội dung
+# (images/logo.jpg -> dist/images/logo.1a2b3c4d5e6f.jpg), nén sẵn .gz / .br cho file văn bản,
+# tạo các bản WebP đã thu nhỏ cho ảnh và ghi static/dist/manifest.json. Khi có manifest,
+# url_for('static', filename=...) tự trả về tên đã băm; nội dung của một tên đã băm không bao
+# giờ đổi nên được gửi với Cache-Control immutable một năm và lần xem sau không tải lại byte nào.
+# Sửa file tĩnh thì chạy lại build-assets rồi khởi động lại worker; file của bản build cũ được
+# giữ lại (trừ khi --clean) cho các trang đã mở trước khi triển khai.
+# Nén brotli cần pip install brotli, WebP cần pip install Pillow; thiếu thì bỏ qua bước đó.
+
+BUILD_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+RESIZABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MIN_COMPRESS_SIZE = 256  # byte; file nhỏ hơn nén không đáng
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # thứ tự ưu tiên khi trình duyệt nhận cả hai
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def _hashed_name(logical, data, ext=None):
+    root, original_ext = os.path.splitext(logical)
+    return f'{BUILD_DIR}/{root}.{_digest(data)}{ext or original_ext}'
+
+def _write(static_dir, name, data):
+    path = os.path.join(static_dir, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def _iter_sources(static_dir):
+    # (tên logic dạng images/logo.jpg, đường dẫn) của các file nguồn, bỏ qua thư mục build
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir and BUILD_DIR in dirs:
+            dirs.remove(BUILD_DIR)
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if not name.startswith('.'):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_dir).replace(os.sep, '/'), path
+
+def _webp_variants(Image, data, widths):
+    # [(chiều rộng, bytes WebP)], chỉ thu nhỏ, không phóng to ảnh
+    variants = []
+    with Image.open(io.BytesIO(data)) as image:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for width in sorted(set(widths)):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            buffer = io.BytesIO()
+            image.resize((width, height), Image.LANCZOS).save(buffer, 'WEBP', quality=80, method=6)
+            variants.append((width, buffer.getvalue()))
+    return variants
+
+def build_assets(static_dir, widths, clean=False):
+    # Trả về (manifest, số lượng theo loại, danh sách bước bị bỏ qua do thiếu thư viện)
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    skipped = []
+    if brotli is None:
+        skipped.append('nén brotli (pip install brotli)')
+    if Image is None and widths:
+        skipped.append('ảnh WebP (pip install Pillow)')
+
+    if clean:
+        shutil.rmtree(os.path.join(static_dir, BUILD_DIR), ignore_errors=True)
+
+    files = {}
+    webp = {}
+    counts = {'files': 0, 'gzip': 0, 'brotli': 0, 'webp': 0}
+    for logical, path in _iter_sources(static_dir):
+        with open(path, 'rb') as f:
+            data = f.read()
+        hashed = _hashed_name(logical, data)
+        _write(static_dir, hashed, data)
+        files[logical] = hashed
+        counts['files'] += 1
+
+        mimetype = mimetypes.guess_type(logical)[0] or ''
+        if mimetype.startswith(COMPRESSIBLE_TYPES) and len(data) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                _write(static_dir, hashed + '.gz', compressed)
+                counts['gzip'] += 1
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    _write(static_dir, hashed + '.br', compressed)
+                    counts['brotli'] += 1
+
+        if Image is not None and logical.lower().endswith(RESIZABLE_EXTENSIONS):
+            variants = {}
+            for width, variant in _webp_variants(Image, data, widths):
+                name = _hashed_name(f'{os.path.splitext(logical)[0]}.{width}w.webp', variant)
+                _write(static_dir, name, variant)
+                variants[str(width)] = name
+                counts['webp'] += 1
+            if variants:
+                webp[logical] = variants
+
+    content = json.dumps({'files': files, 'webp': webp}, sort_keys=True).encode('utf-8')
+    manifest = {'version': _digest(content), 'files': files, 'webp': webp}
+    # Ghi manifest sau cùng, qua file tạm, để không worker nào đọc phải bản build dở
+    manifest_path = os.path.join(static_dir, BUILD_DIR, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest, counts, skipped
+
+def load_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, BUILD_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def asset_version():
+    # Mã của bản build tài nguyên đang dùng ('' nếu không dùng manifest), đưa vào ETag của trang
+    manifest = current_app.extensions.get('asset_manifest')
+    return manifest['version'] if manifest else ''
+
+def webp_srcset(filename):
+    # Giá trị srcset cho <source type="image/webp">, chuỗi rỗng nếu ảnh chưa có bản WebP
+    manifest = current_app.extensions.get('asset_manifest')
+    variants = manifest['webp'].get(filename) if manifest else None
+    if not variants:
+        return ''
+    return ', '.join(f"{url_for('static', filename=name)} {width}w"
+                     for width, name in sorted(variants.items(), key=lambda item: int(item[0])))
+
+def _hashed_static_url(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        files = current_app.extensions['asset_manifest']['files']
+        values['filename'] = files.get(values['filename'], values['filename'])
+
+def serve_static(filename):
+    # Thay view 'static' của Flask: file đã băm được gửi kèm bản nén sẵn phù hợp và cache vĩnh viễn
+    if not filename.startswith(BUILD_DIR + '/') or filename.endswith(MANIFEST_NAME):
+        return current_app.send_static_file(filename)
+
+    static_dir = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in ENCODINGS:
+        path = safe_join(static_dir, filename + suffix)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            response = send_from_directory(static_dir, filename + suffix, mimetype=mimetype,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(static_dir, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def init_assets(app):
+    app.jinja_env.globals['webp_srcset'] = webp_srcset
+    if not app.config['STATIC_MANIFEST_ENABLED'] or not app.static_folder:
+        return
+    manifest = load_manifest(app.static_folder)
+    if manifest is None:
+        return
+    app.extensions['asset_manifest'] = manifest
+    app.url_defaults(_hashed_static_url)
+    app.view_functions['static'] = serve_static
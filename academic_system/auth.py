@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from werkzeug.security import check_password_hash
-from academic_system.models import db, User, Student, Instructor
+from academic_system.principals import authenticate
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -14,27 +14,26 @@ def login():
             flash('Vui lòng nhập đầy đủ thông tin', 'danger')
             return render_template('auth/login.html')
         
-        user = User.query.filter_by(username=username).first()
+        # Tài khoản và hồ sơ sinh viên / giảng viên được lấy trong một câu truy vấn
+        principal = authenticate(username, password)
         
-        if user and user.password == password:  # Đơn giản hóa, trong thực tế nên hash password
-            session['user_id'] = user.id
-            session['username'] = user.username
-            session['role'] = user.role
+        if principal:
+            session['user_id'] = principal.user_id
+            session['username'] = principal.username
+            session['role'] = principal.role
             
             # Lấy thông tin bổ sung theo role
-            if user.role == 'student':
-                student = Student.query.filter_by(user_id=user.id).first()
-                if student:
-                    session['student_id'] = student.id
-                    session['full_name'] = student.full_name
+            if principal.role == 'student':
+                if principal.profile:
+                    session['student_id'] = principal.profile.id
+                    session['full_name'] = principal.profile.full_name
                 return redirect(url_for('student.dashboard'))
-            elif user.role == 'lecturer':
-                instructor = Instructor.query.filter_by(user_id=user.id).first()
-                if instructor:
-                    session['instructor_id'] = instructor.id
-                    session['full_name'] = instructor.full_name
+            elif principal.role == 'lecturer':
+                if principal.profile:
+                    session['instructor_id'] = principal.profile.id
+                    session['full_name'] = principal.profile.full_name
                 return redirect(url_for('lecturer.dashboard'))
-            elif user.role == 'admin':
+            elif principal.role == 'admin':
                 session['full_name'] = 'Administrator'
                 return redirect(url_for('admin.dashboard'))
         else:
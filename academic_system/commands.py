@@ -0,0 +1,138 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from academic_system.models import db
+from academic_system.summaries import rebuild_attendance_summaries, rebuild_grade_summaries
+from academic_system.registration import recount_enrollments
+from academic_system.accounts_import import ACCOUNT_TYPES, IMPORT_BATCH_SIZE, iter_account_rows, import_accounts
+from academic_system.seeding import SEED_BATCH_SIZE, SeedOptions, seed_scale
+from academic_system.timetable import rebuild_timetables
+from academic_system.templating import precompile_templates, template_cache_dir
+from academic_system.assets import build_assets
+
+@click.command('create-schema')
+@click.option('--drop', is_flag=True, help='Xóa toàn bộ bảng trước khi tạo lại.')
+@with_appcontext
+def create_schema_command(drop):
+    """Tạo các bảng từ models.py (dùng cho SQLite / CSDL trống)."""
+    if drop:
+        db.drop_all()
+    db.create_all()
+    click.echo(f'Đã tạo schema trên {db.engine.url.render_as_string(hide_password=True)}')
+
+@click.command('rebuild-attendance-summary')
+@with_appcontext
+def rebuild_attendance_summary_command():
+    """Tính lại bảng tổng hợp điểm danh từ bảng attendance."""
+    count = rebuild_attendance_summaries()
+    click.echo(f'Đã tính lại tổng hợp điểm danh cho {count} lớp học phần')
+
+@click.command('rebuild-grade-summary')
+@with_appcontext
+def rebuild_grade_summary_command():
+    """Tính lại bảng tổng hợp điểm theo sinh viên / học kỳ từ bảng grades."""
+    count = rebuild_grade_summaries()
+    click.echo(f'Đã tính lại tổng hợp điểm cho {count} sinh viên')
+
+@click.command('rebuild-timetables')
+@with_appcontext
+def rebuild_timetables_command():
+    """Phân tích lại lịch học của các lớp (section_meetings) và tính lại các ô đã bận của sinh viên."""
+    count, errors = rebuild_timetables()
+    for section, error in errors:
+        click.echo(f'Lớp {section.section_code} (id={section.id}): {error}', err=True)
+    click.echo(f'Đã phân tích lịch học của {count} lớp học phần, {len(errors)} lịch sai định dạng')
+
+@click.command('precompile-templates')
+@with_appcontext
+def precompile_templates_command():
+    """Biên dịch sẵn toàn bộ template vào TEMPLATE_CACHE_DIR (chạy lúc build / deploy)."""
+    app = current_app._get_current_object()
+    cache_dir = template_cache_dir(app)
+    if cache_dir is None:
+        raise click.ClickException('Bộ nhớ đệm template đang tắt (TEMPLATE_CACHE_ENABLED=False)')
+    count, errors = precompile_templates(app)
+    for name, error in errors:
+        click.echo(f'{name}: {error}', err=True)
+    click.echo(f'Đã biên dịch {count - len(errors)}/{count} template vào {cache_dir}')
+    if errors:
+        raise click.ClickException(f'{len(errors)} template bị lỗi')
+
+@click.command('build-assets')
+@click.option('--clean', is_flag=True, help='Xóa các file của những lần build trước.')
+@with_appcontext
+def build_assets_command(clean):
+    """Tạo static/dist: tên file kèm mã băm nội dung, bản nén .gz / .br và ảnh WebP thu nhỏ."""
+    manifest, counts, skipped = build_assets(current_app.static_folder, current_app.config['ASSET_WEBP_WIDTHS'],
+                                             clean=clean)
+    for step in skipped:
+        click.echo(f'Bỏ qua {step}', err=True)
+    click.echo(f'Đã build {counts["files"]} file tĩnh (bản {manifest["version"]}): {counts["gzip"]} gzip, '
+               f'{counts["brotli"]} brotli, {counts["webp"]} ảnh WebP. Khởi động lại worker để dùng bản mới.')
+
+@click.command('recount-enrollments')
+@with_appcontext
+def recount_enrollments_command():
+    """Đối soát sĩ số lớp (sections.enrolled_count) với bảng enrollments."""
+    mismatches = recount_enrollments()
+    for section_id, stored, actual in mismatches:
+        click.echo(f'Lớp {section_id}: {stored} -> {actual}')
+    click.echo(f'Đã sửa sĩ số cho {len(mismatches)} lớp học phần')
+
+@click.command('import-accounts')
+@click.argument('account_type', type=click.Choice(sorted(ACCOUNT_TYPES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Chỉ kiểm tra dữ liệu, không ghi vào CSDL.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Số dòng ghi mỗi lô.')
+@with_appcontext
+def import_accounts_command(account_type, path, dry_run, batch_size):
+    """Nhập hàng loạt sinh viên / giảng viên từ file CSV hoặc XLSX."""
+    def progress(result):
+        click.echo(f'  đã đọc {result.processed} dòng, hợp lệ {result.created}, lỗi {result.error_count}')
+    
+    with open(path, 'rb') as stream:
+        try:
+            result = import_accounts(account_type, iter_account_rows(stream, path),
+                                     dry_run=dry_run, batch_size=batch_size, progress=progress)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    
+    for line, message in result.errors:
+        click.echo(f'Dòng {line}: {message}')
+    action = 'Có thể tạo' if dry_run else 'Đã tạo'
+    click.echo(f'{action} {result.created} tài khoản, {result.error_count} dòng lỗi')
+
+@click.command('seed-scale')
+@click.option('--students', default=1000, show_default=True, help='Số sinh viên.')
+@click.option('--instructors', default=50, show_default=True, help='Số giảng viên.')
+@click.option('--courses', default=100, show_default=True, help='Số môn học.')
+@click.option('--semesters', default=3, show_default=True, help='Số học kỳ (học kỳ cuối chưa có điểm).')
+@click.option('--sections-per-semester', default=150, show_default=True, help='Số lớp học phần mỗi học kỳ.')
+@click.option('--enrollments-per-student', default=5, show_default=True, help='Số lớp tối đa mỗi sinh viên đăng ký mỗi học kỳ (không chọn lớp trùng lịch).')
+@click.option('--attendance-sessions', default=10, show_default=True, help='Số buổi đã điểm danh của mỗi lớp.')
+@click.option('--seed', default=42, show_default=True, help='Seed ngẫu nhiên (cùng seed -> cùng dữ liệu).')
+@click.option('--prefix', default='Z', show_default=True, help='Tiền tố mã / username của dữ liệu sinh ra.')
+@click.option('--batch-size', default=SEED_BATCH_SIZE, show_default=True, help='Số dòng ghi mỗi lô.')
+@with_appcontext
+def seed_scale_command(**kwargs):
+    """Sinh dữ liệu lớn (sinh viên, lớp, đăng ký, điểm, điểm danh) để kiểm thử tải."""
+    def progress(table, count):
+        click.echo(f'  {table}: {count}')
+    
+    try:
+        counts = seed_scale(SeedOptions(**kwargs), progress=progress)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    click.echo('Đã sinh: ' + ', '.join(f'{table} {count}' for table, count in counts.items()))
+
+def register_commands(app):
+    app.cli.add_command(create_schema_command)
+    app.cli.add_command(rebuild_attendance_summary_command)
+    app.cli.add_command(rebuild_grade_summary_command)
+    app.cli.add_command(rebuild_timetables_command)
+    app.cli.add_command(precompile_templates_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(recount_enrollments_command)
+    app.cli.add_command(import_accounts_command)
+    app.cli.add_command(seed_scale_command)
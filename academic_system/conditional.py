@@ -0,0 +1,56 @@
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request, session
+from sqlalchemy import select
+from academic_system.models import db
+from academic_system.assets import asset_version
+from academic_system.principals import get_principal
+from academic_system.versions import version_of
+
+# ========== CONDITIONAL GET (ETag) ==========
+# Trang xem của sinh viên / giảng viên được gắn ETag tính từ phiên bản dữ liệu (versions.py)
+# mà trang phụ thuộc, người đang xem và hồ sơ của họ trong bộ nhớ đệm (principals.py).
+# Trình duyệt gửi lại If-None-Match: nếu không có gì đổi, trả 304 sau đúng một câu truy vấn
+# đọc phiên bản, không chạy các truy vấn của trang và không render template.
+# Phiên bản được đọc trước khi chạy trang, nên ghi xen giữa chỉ làm ETag cũ hơn nội dung
+# (lần sau render lại), không bao giờ khiến trình duyệt giữ nội dung cũ.
+
+def current_versions(scopes):
+    # scopes: danh sách (scope, scope_id) -> tuple phiên bản, trong một câu truy vấn
+    return tuple(db.session.execute(select(*[version_of(scope, scope_id) for scope, scope_id in scopes])).one())
+
+def _etag(scopes):
+    principal = get_principal(session.get('user_id'))
+    parts = (
+        current_app.config['RELEASE_ID'],
+        asset_version(),  # trang cũ trỏ tới tên file tĩnh của bản build trước
+        request.full_path,
+        principal,
+        tuple(scopes),
+        current_versions(scopes)
+    )
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def versioned_page(scopes):
+    # scopes(**view_args) trả về danh sách (scope, scope_id) mà nội dung trang phụ thuộc.
+    # Đặt sau decorator kiểm tra đăng nhập / vai trò
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Còn thông báo flash chưa hiển thị thì phải render lại trang
+            if (request.method != 'GET' or not current_app.config['CONDITIONAL_GET_ENABLED']
+                    or session.get('_flashes')):
+                return view(*args, **kwargs)
+
+            etag = _etag(scopes(**kwargs))
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'  # Luôn hỏi lại máy chủ trước khi dùng bản đã lưu
+            return response
+        return wrapper
+    return decorator
@@ -5,7 +5,8 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = (
+    # DATABASE_URL (tùy chọn) thay cho MySQL, vd sqlite:///local.db hoặc sqlite:// (trong bộ nhớ)
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or (
         f"mysql+pymysql://{os.environ.get('DB_USER', 'root')}:"
         f"{os.environ.get('DB_PASSWORD', '')}@"
         f"{os.environ.get('DB_HOST', 'localhost')}:"
@@ -14,4 +15,53 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
-
+    
+    # Connection pool cho mỗi tiến trình worker (số liệu pool: /admin/system/db-pool)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),  # giây chờ lấy kết nối
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),  # giây, nhỏ hơn wait_timeout của MySQL
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'True').lower() in ('1', 'true', 'yes')
+    }
+    
+    # CSDL replica (tùy chọn) cho các trang chỉ đọc (xem db_routing.py)
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DB_REPLICA_URI')
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))  # đọc từ primary sau khi ghi
+    
+    # Thống kê SQL theo request: header X-DB-Queries / Server-Timing, log và cảnh báo N+1 (xem sql_metrics.py).
+    # Tắt mặc định vì thêm chi phí cho mỗi câu SQL; bật khi cần tìm truy vấn chậm / N+1
+    SQL_METRICS_ENABLED = os.environ.get('SQL_METRICS_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+    SQL_METRICS_LOG_LEVEL = os.environ.get('SQL_METRICS_LOG_LEVEL', 'INFO')  # WARNING: chỉ ghi cảnh báo N+1
+    SQL_METRICS_SLOW_LIMIT = int(os.environ.get('SQL_METRICS_SLOW_LIMIT', '3'))  # số câu chậm nhất ghi vào log
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', '5'))  # số lần lặp cùng dạng câu lệnh
+    
+    # Bộ nhớ đệm hồ sơ người đăng nhập theo tiến trình (xem principals.py)
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', '300'))  # giây, giới hạn dữ liệu cũ giữa các worker
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))  # số người dùng tối đa
+    
+    # ETag cho các trang xem của sinh viên / giảng viên, trả 304 khi dữ liệu chưa đổi (xem conditional.py)
+    CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    RELEASE_ID = os.environ.get('RELEASE_ID', '')  # đổi khi triển khai giao diện mới để ETag cũ hết hiệu lực
+    
+    # Lưu bytecode đã biên dịch của template để worker mới không phải biên dịch lại (xem templating.py)
+    TEMPLATE_CACHE_ENABLED = os.environ.get('TEMPLATE_CACHE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', '')  # để trống: thư mục instance/jinja_cache
+    
+    # Dùng static/dist/manifest.json do "flask build-assets" tạo (tên file kèm mã băm, cache vĩnh viễn; xem assets.py)
+    STATIC_MANIFEST_ENABLED = os.environ.get('STATIC_MANIFEST_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    ASSET_WEBP_WIDTHS = [int(w) for w in os.environ.get('ASSET_WEBP_WIDTHS', '64,128,256').split(',') if w.strip()]  # px
+    
+    # Bộ nhớ đệm đoạn HTML dùng chung (bảng lớp học phần, thống kê điểm danh; xem fragments.py)
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'memory')  # memory | filesystem | redis
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', '300'))  # giây
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '2000'))  # số đoạn tối đa (memory / filesystem)
+    FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR', '')  # filesystem; để trống: thư mục instance/fragments
+    FRAGMENT_CACHE_REDIS_URL = os.environ.get('FRAGMENT_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Hàng đợi đăng ký tín chỉ cho giờ cao điểm (xem registration_queue.py)
+    REGISTRATION_QUEUE_ENABLED = os.environ.get('REGISTRATION_QUEUE_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+    REGISTRATION_QUEUE_SIZE = int(os.environ.get('REGISTRATION_QUEUE_SIZE', '5000'))
+    REGISTRATION_BATCH_SIZE = int(os.environ.get('REGISTRATION_BATCH_SIZE', '200'))
+    REGISTRATION_RESULT_TTL = int(os.environ.get('REGISTRATION_RESULT_TTL', '600'))  # giây
@@ -0,0 +1,94 @@
+import time
+from contextlib import contextmanager
+from flask import Blueprint, current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# ========== ĐỌC TỪ CSDL REPLICA ==========
+# Khi có DB_REPLICA_URI, các request GET của view / blueprint được đánh dấu bằng
+# @replica_reads đọc (SELECT) từ replica. Mọi câu ghi, SELECT ... FOR UPDATE và mọi
+# câu đọc sau khi request đã ghi đều chạy trên primary. Sau một request có ghi, trình
+# duyệt đó đọc từ primary thêm REPLICA_STICKY_SECONDS giây (đọc-sau-ghi, vd trang
+# được redirect tới sau khi nhập điểm) để không thấy dữ liệu cũ do replica trễ.
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_KEY = '_primary_until'
+
+_replica_blueprints = set()
+
+def replica_reads(target):
+    # Dùng làm decorator cho view, hoặc gọi với Blueprint để áp dụng cho mọi view của nó
+    if isinstance(target, Blueprint):
+        _replica_blueprints.add(target.name)
+    else:
+        target.replica_reads = True
+    return target
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _route_to_replica(clause) and not self._flushing:
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _route_to_replica(clause):
+    if not has_request_context() or not g.get('use_replica') or g.get('db_wrote'):
+        return False
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+def _mark_write():
+    if has_request_context():
+        g.db_wrote = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _on_flush(db_session, flush_context):
+    _mark_write()
+
+def use_primary():
+    # Các câu đọc còn lại của request chạy trên primary. Gọi trước khi tính dữ liệu sẽ được lưu
+    # lại vào CSDL (ảnh chụp báo cáo...), để không ghi số liệu cũ của replica vào primary
+    if has_request_context():
+        g.use_replica = False
+
+@contextmanager
+def derived_write():
+    # Ghi dữ liệu dẫn xuất (ảnh chụp, bảng điểm dựng sẵn) trong request đọc: không tính là
+    # thao tác ghi của người dùng, nên trình duyệt không bị chuyển sang đọc từ primary
+    wrote = g.get('db_wrote') if has_request_context() else None
+    try:
+        yield
+    finally:
+        if has_request_context():
+            g.db_wrote = wrote
+
+def configure_replica(app):
+    # Gọi trước db.init_app: thêm bind 'replica' dùng cùng cấu hình pool với primary
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not replica_uri:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[REPLICA_BIND] = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}, url=replica_uri)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    @app.before_request
+    def choose_database():
+        g.use_replica = _replica_allowed()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+        return response
+
+def _replica_allowed():
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if session.get(PRIMARY_UNTIL_KEY, 0) > time.time():
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'replica_reads', False) or request.blueprint in _replica_blueprints
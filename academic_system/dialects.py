@@ -0,0 +1,98 @@
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from academic_system.models import db
+
+# ========== CÂU LỆNH PHỤ THUỘC HỆ QUẢN TRỊ CSDL ==========
+# Các câu lệnh chỉ có ở MySQL được gom về đây, kèm phương án tương đương cho SQLite.
+# SQLite (file hoặc trong bộ nhớ) dùng để chạy thử / benchmark cục bộ không cần MySQL:
+# schema được tạo từ models.py, khóa ngoại được bật như InnoDB.
+
+UPSERT_CHUNK_SIZE = 500
+SQLITE_BUSY_TIMEOUT = 30  # giây chờ khi file SQLite đang bị ghi
+
+# Tham số chỉ dùng cho QueuePool, không áp dụng cho SQLite trong bộ nhớ (StaticPool)
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'poolclass')
+
+def dialect_name():
+    return db.engine.dialect.name
+
+def is_sqlite_memory(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def configure_backend(app):
+    # Gọi trước db.init_app: điều chỉnh tùy chọn engine theo loại CSDL
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if make_url(uri).get_backend_name() != 'sqlite':
+        return
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    connect_args = dict(options.get('connect_args') or {})
+    connect_args.setdefault('timeout', SQLITE_BUSY_TIMEOUT)
+    options['connect_args'] = connect_args
+    if is_sqlite_memory(uri):
+        # CSDL trong bộ nhớ chỉ sống cùng một kết nối dùng chung: tạo schema khi khởi động
+        for key in QUEUE_POOL_OPTIONS:
+            options.pop(key, None)
+        app.config.setdefault('CREATE_SCHEMA_ON_START', True)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # SQLite mặc định không kiểm tra khóa ngoại (ON DELETE CASCADE / RESTRICT)
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+def upsert(model, rows, conflict_columns, update_columns, chunk_size=UPSERT_CHUNK_SIZE):
+    # Ghi nhiều dòng, dòng trùng ràng buộc unique (conflict_columns) thì cập nhật update_columns.
+    # MySQL: INSERT ... ON DUPLICATE KEY UPDATE; SQLite: INSERT ... ON CONFLICT DO UPDATE.
+    # Mỗi lô chunk_size dòng là một câu lệnh INSERT nhiều VALUES.
+    if not rows:
+        return
+    name = dialect_name()
+    table = model.__table__
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if name == 'mysql':
+            stmt = mysql.insert(table).values(chunk)
+            stmt = stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in update_columns})
+        elif name == 'sqlite':
+            stmt = sqlite.insert(table).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={column: stmt.excluded[column] for column in update_columns}
+            )
+        else:
+            raise NotImplementedError(f'Chưa hỗ trợ upsert cho CSDL {name}')
+        db.session.execute(stmt)
+
+def upsert_increment(model, rows, conflict_columns, columns, update_columns=(), chunk_size=UPSERT_CHUNK_SIZE):
+    # Chèn các dòng mới, dòng đã tồn tại (trùng conflict_columns) thì cộng giá trị của dòng mới
+    # vào các cột columns (và ghi đè update_columns) trong cùng câu lệnh, nên không bị mất lượt
+    # cộng khi nhiều request ghi đồng thời. Caller sắp xếp rows để các transaction khóa theo cùng thứ tự
+    if not rows:
+        return
+    name = dialect_name()
+    table = model.__table__
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if name == 'mysql':
+            stmt = mysql.insert(table).values(chunk)
+            new = stmt.inserted
+        elif name == 'sqlite':
+            stmt = sqlite.insert(table).values(chunk)
+            new = stmt.excluded
+        else:
+            raise NotImplementedError(f'Chưa hỗ trợ upsert cho CSDL {name}')
+        values = {column: table.c[column] + new[column] for column in columns}
+        values.update({column: new[column] for column in update_columns})
+        if name == 'mysql':
+            stmt = stmt.on_duplicate_key_update(values)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=values)
+        db.session.execute(stmt)
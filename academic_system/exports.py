@@ -0,0 +1,157 @@
+import csv
+import io
+import tempfile
+from itertools import groupby
+from flask import Response, stream_with_context
+from sqlalchemy import and_, func
+from academic_system.models import db, Student, Course, Section, Semester, Enrollment, Grade, Attendance
+
+# ========== XUẤT FILE CSV / XLSX DẠNG LUỒNG ==========
+# Dữ liệu được đọc bằng con trỏ phía server (yield_per / stream_results) và ghi ra
+# response từng khối, nên bộ nhớ chỉ phụ thuộc EXPORT_CHUNK_SIZE chứ không phụ thuộc
+# số dòng (kể cả ma trận điểm danh của cả học kỳ).
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+ATTENDANCE_LABELS = {'present': 'Có mặt', 'absent': 'Vắng', 'late': 'Muộn', 'excused': 'Có phép'}
+
+def _stream(query):
+    # Chỉ lấy cột (không tạo đối tượng ORM) để identity map không phình theo số dòng
+    return query.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+def _iter_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM để Excel nhận đúng tiếng Việt (UTF-8)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _iter_xlsx(header, rows):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError('Cần cài thư viện openpyxl để xuất file .xlsx (pip install openpyxl)')
+
+    # Chế độ write_only ghi từng dòng ra file tạm; file zip hoàn chỉnh được gửi theo khối
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+def export_response(filename, fmt, header, rows):
+    # rows: iterable các dòng (list/tuple), được tiêu thụ dần trong lúc gửi response
+    if fmt == 'xlsx':
+        body = _iter_xlsx(header, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = _iter_csv(header, rows)
+        mimetype = 'text/csv; charset=utf-8'
+
+    # Lấy khối đầu tiên ngay trong view để lỗi (vd thiếu openpyxl) được báo trước khi gửi header
+    first = next(body)
+
+    def generate():
+        yield first
+        yield from body
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+# ========== MA TRẬN ĐIỂM DANH ==========
+def attendance_matrix_header(total_sessions):
+    return (['Học kỳ', 'Mã lớp', 'Mã môn', 'Mã SV', 'Họ và tên']
+            + [f'Buổi {number}' for number in range(1, total_sessions + 1)]
+            + ['Có mặt', 'Vắng', 'Muộn', 'Có phép', 'Tỷ lệ có mặt (%)'])
+
+def max_total_sessions(section_id=None, semester_id=None):
+    # Số cột buổi học của file = số buổi lớn nhất trong các lớp được xuất
+    query = db.session.query(func.max(Section.total_sessions))
+    if section_id is not None:
+        query = query.filter(Section.id == section_id)
+    if semester_id is not None:
+        query = query.filter(Section.semester_id == semester_id)
+    return query.scalar() or 0
+
+def iter_attendance_matrix(total_sessions, section_id=None, semester_id=None):
+    # Một dòng cho mỗi sinh viên (đăng ký active) của lớp / học kỳ, mỗi buổi một cột
+    query = db.session.query(
+        Semester.name, Section.section_code, Course.course_code, Section.total_sessions,
+        Student.student_code, Student.full_name, Enrollment.id,
+        Attendance.session_number, Attendance.status
+    ).select_from(Enrollment)\
+        .join(Section, Enrollment.section_id == Section.id)\
+        .join(Course, Section.course_id == Course.id)\
+        .join(Semester, Section.semester_id == Semester.id)\
+        .join(Student, Enrollment.student_id == Student.id)\
+        .outerjoin(Attendance, and_(Attendance.enrollment_id == Enrollment.id,
+                                    Attendance.section_id == Enrollment.section_id))\
+        .filter(Enrollment.status == 'active')
+    if section_id is not None:
+        query = query.filter(Section.id == section_id)
+    if semester_id is not None:
+        query = query.filter(Section.semester_id == semester_id)
+    query = query.order_by(Section.section_code, Section.id, Student.student_code,
+                           Enrollment.id, Attendance.session_number)
+
+    # Các dòng của cùng một đăng ký nằm liền nhau nên gom được mà không giữ cả kết quả
+    for _, marks in groupby(_stream(query), key=lambda row: row[6]):
+        marks = list(marks)
+        semester_name, section_code, course_code, section_sessions, student_code, full_name = marks[0][:6]
+        statuses = {row.session_number: row.status for row in marks if row.session_number is not None}
+
+        cells = [ATTENDANCE_LABELS.get(statuses.get(number), '') if number <= section_sessions else ''
+                 for number in range(1, total_sessions + 1)]
+        counts = [sum(1 for status in statuses.values() if status == key) for key in ATTENDANCE_LABELS]
+        rate = round(counts[0] / section_sessions * 100, 1) if section_sessions else 0
+        yield [semester_name, section_code, course_code, student_code, full_name] + cells + counts + [rate]
+
+# ========== ĐIỂM ==========
+GRADE_HEADER = ['Học kỳ', 'Mã lớp', 'Mã môn', 'Tên môn', 'Mã SV', 'Họ và tên',
+                'Trạng thái', 'Điểm số', 'Điểm chữ', 'Ngày nhập điểm']
+
+def iter_grades(section_id=None, semester_id=None):
+    # Một dòng cho mỗi đăng ký (kể cả chưa có điểm) theo lớp / học kỳ / toàn trường
+    query = db.session.query(
+        Semester.name, Section.section_code, Course.course_code, Course.name,
+        Student.student_code, Student.full_name, Enrollment.status,
+        Grade.score, Grade.grade_letter, Grade.submitted_at
+    ).select_from(Enrollment)\
+        .join(Section, Enrollment.section_id == Section.id)\
+        .join(Course, Section.course_id == Course.id)\
+        .join(Semester, Section.semester_id == Semester.id)\
+        .join(Student, Enrollment.student_id == Student.id)\
+        .outerjoin(Grade, Grade.enrollment_id == Enrollment.id)
+    if section_id is not None:
+        query = query.filter(Section.id == section_id)
+    if semester_id is not None:
+        query = query.filter(Section.semester_id == semester_id)
+    query = query.order_by(Semester.start_date, Section.section_code, Section.id, Student.student_code)
+
+    for row in _stream(query):
+        semester_name, section_code, course_code, course_name, student_code, full_name, status, score, letter, submitted_at = row
+        yield [semester_name, section_code, course_code, course_name, student_code, full_name, status,
+               float(score) if score is not None else '', letter or '',
+               submitted_at.strftime('%Y-%m-%d %H:%M') if submitted_at else '']
+
+def export_filename(*parts):
+    # Tên file an toàn cho header Content-Disposition
+    name = '_'.join(str(part) for part in parts if part)
+    return ''.join(char if char.isascii() and char.isalnum() or char in '-_' else '_' for char in name).strip('_') or 'export'
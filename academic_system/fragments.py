@@ -0,0 +1,298 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from itertools import chain
+from flask import current_app, has_app_context
+from markupsafe import Markup
+from sqlalchemy import event
+from academic_system.db_routing import RoutingSession
+
+# ========== BỘ NHỚ ĐỆM ĐOẠN HTML (FRAGMENT CACHE) ==========
+# Các bảng dùng chung cho mọi người xem (danh sách lớp, thống kê điểm danh) được render một
+# lần rồi giữ lại theo tên + khóa. Mỗi đoạn khai báo các bảng CSDL mà nó phụ thuộc (tag);
+# khóa lưu kèm "mã" hiện tại của từng tag, nên vô hiệu hóa một tag chỉ là đổi mã của nó.
+# Mọi câu ghi qua db.session (ORM hoặc insert / update / delete) được ghi nhận theo tên bảng
+# và tag tương ứng được vô hiệu hóa ngay sau khi commit, không cần gọi tay ở từng route.
+# Câu lệnh có execution option fragment_tags chỉ vô hiệu hóa các tag đó thay cho tên bảng:
+# cập nhật sĩ số (registration.py) đổi tag SEATS, nên mỗi lượt đăng ký không làm mới các
+# đoạn chỉ hiển thị thông tin lớp (tag 'sections').
+#
+# FRAGMENT_CACHE_BACKEND:
+#   memory     - LRU trong tiến trình (mặc định); worker khác thấy dữ liệu cũ tối đa FRAGMENT_CACHE_TTL
+#   filesystem - thư mục dùng chung FRAGMENT_CACHE_DIR (mặc định instance/fragments, chỉ chủ sở hữu
+#                đọc / ghi được vì nội dung được trả về như HTML đã an toàn) cho các worker trên cùng máy
+#   redis      - FRAGMENT_CACHE_REDIS_URL, dùng chung giữa nhiều máy (cần pip install redis)
+# Đoạn render từ dữ liệu đã đọc trước khi tra cache (hoặc đọc từ replica còn trễ) có thể
+# được lưu dưới mã tag mới; dữ liệu cũ như vậy tồn tại tối đa FRAGMENT_CACHE_TTL.
+
+class MemoryBackend:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()  # khóa -> (hết hạn lúc, html), theo thứ tự dùng gần nhất
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._items[key] = (time.time() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def tag_tokens(self, tags):
+        with self._lock:
+            return [self._tags.get(tag, '0') for tag in tags]
+
+    def set_tag_token(self, tag, token):
+        with self._lock:
+            self._tags[tag] = token
+
+    def size(self):
+        return len(self._items)
+
+class FileSystemBackend:
+    # Mỗi đoạn một file (dòng đầu là thời điểm hết hạn), ghi qua file tạm + os.replace.
+    # Đổi mã tag làm các file mang mã cũ không bao giờ được đọc lại, nên khi ghi, tối đa mỗi
+    # SWEEP_INTERVAL giây một lần, thư mục được dọn: xóa file hết hạn, rồi xóa file ghi lâu nhất
+    # nếu còn nhiều hơn max_size file
+    SWEEP_INTERVAL = 60  # giây
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self._next_sweep = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.makedirs(os.path.join(directory, 'tags'), mode=0o700, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _tag_path(self, tag):
+        return os.path.join(self.directory, 'tags', tag)
+
+    def _write(self, path, content):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                expires_at = float(f.readline())
+                value = f.read()
+        except (OSError, ValueError):
+            return None
+        if expires_at <= time.time():
+            self._remove(path)
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        self._write(self._path(key), f'{now + ttl}\n{value}')
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.SWEEP_INTERVAL
+        self.sweep(now)
+
+    def sweep(self, now=None):
+        # Trả về số file đã xóa; file tạm đang ghi dở (không phải tên băm) được bỏ qua
+        now = now or time.time()
+        kept = []
+        removed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if len(entry.name) != 40 or not entry.is_file():
+                    continue
+                try:
+                    with open(entry.path, encoding='utf-8') as f:
+                        expires_at = float(f.readline())
+                    written_at = entry.stat().st_mtime
+                except (OSError, ValueError):
+                    continue
+                if expires_at <= now:
+                    removed += self._remove(entry.path)
+                else:
+                    kept.append((written_at, entry.path))
+        kept.sort()
+        for _, path in kept[:max(0, len(kept) - self.max_size)]:
+            removed += self._remove(path)
+        return removed
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def tag_tokens(self, tags):
+        tokens = []
+        for tag in tags:
+            try:
+                with open(self._tag_path(tag), encoding='utf-8') as f:
+                    tokens.append(f.read())
+            except OSError:
+                tokens.append('0')
+        return tokens
+
+    def set_tag_token(self, tag, token):
+        self._write(self._tag_path(tag), token)
+
+    def size(self):
+        return None
+
+class RedisBackend:
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Cần cài thư viện redis để dùng FRAGMENT_CACHE_BACKEND=redis (pip install redis)')
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._redis.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._redis.set(key, value.encode('utf-8'), ex=ttl)
+
+    def tag_tokens(self, tags):
+        return [token.decode('utf-8') if token else '0' for token in self._redis.mget([f'tag:{tag}' for tag in tags])]
+
+    def set_tag_token(self, tag, token):
+        self._redis.set(f'tag:{tag}', token)
+
+    def size(self):
+        return None
+
+class FragmentCache:
+    def __init__(self, backend, ttl, prefix=''):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self.invalidations = 0
+
+    def _key(self, name, key, tags):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        tokens = self.backend.tag_tokens(tags)
+        return f'fragment:{self.prefix}:{name}:{digest}:' + ','.join(tokens)
+
+    def get_or_render(self, name, key, tags, render, ttl=None):
+        full_key = self._key(name, key, tags)
+        value = self.backend.get(full_key)
+        with self._lock:
+            self._stats[name]['hits' if value is not None else 'misses'] += 1
+        if value is None:
+            value = str(render())
+            self.backend.set(full_key, value, ttl or self.ttl)
+        return Markup(value)
+
+    def invalidate(self, tags):
+        for tag in tags:
+            self.backend.set_tag_token(tag, uuid.uuid4().hex)
+        with self._lock:
+            self.invalidations += len(tags)
+
+    def snapshot(self):
+        with self._lock:
+            fragments = {name: dict(counts) for name, counts in self._stats.items()}
+            invalidations = self.invalidations
+        hits = sum(counts['hits'] for counts in fragments.values())
+        misses = sum(counts['misses'] for counts in fragments.values())
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': self.backend.size(),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0,
+            'invalidations': invalidations,
+            'fragments': fragments
+        }
+
+def cached_fragment(name, key, tags, render, ttl=None):
+    # Dùng trong view: render() chỉ được gọi (kể cả các truy vấn bên trong) khi chưa có trong cache
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        return Markup(render())
+    return cache.get_or_render(name, key, tags, render, ttl)
+
+def cache_fragment(name, *key, tags=(), ttl=None, caller=None):
+    # Dùng trong template:
+    #   {% call cache_fragment('admin-sections', request.full_path, tags=('sections', 'courses')) %}...{% endcall %}
+    return cached_fragment(name, key, tags, caller, ttl)
+
+def fragment_cache_status():
+    cache = current_app.extensions.get('fragment_cache')
+    return cache.snapshot() if cache else {'enabled': False}
+
+# ========== VÔ HIỆU HÓA THEO BẢNG ĐƯỢC GHI ==========
+SEATS = 'seats'  # sĩ số lớp (sections.enrolled_count)
+
+def _written_tables(db_session):
+    return db_session.info.setdefault('written_tables', set())
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tags = orm_execute_state.execution_options.get('fragment_tags')
+        if tags is None:
+            tags = (orm_execute_state.statement.table.name,)
+        _written_tables(orm_execute_state.session).update(tags)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _on_flush(db_session, flush_context):
+    tables = _written_tables(db_session)
+    for obj in chain(db_session.new, db_session.dirty, db_session.deleted):
+        tables.add(obj.__table__.name)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _on_commit(db_session):
+    tables = db_session.info.pop('written_tables', None)
+    if tables and has_app_context():
+        cache = current_app.extensions.get('fragment_cache')
+        if cache is not None:
+            cache.invalidate(sorted(tables))
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _on_transaction_end(db_session, transaction):
+    # Transaction ngoài cùng kết thúc mà không commit (rollback): bỏ các bảng đã ghi nhận
+    if transaction.parent is None:
+        db_session.info.pop('written_tables', None)
+
+def init_fragment_cache(app):
+    app.jinja_env.globals['cache_fragment'] = cache_fragment
+    if not app.config['FRAGMENT_CACHE_ENABLED']:
+        return
+
+    backend_name = app.config['FRAGMENT_CACHE_BACKEND']
+    if backend_name == 'filesystem':
+        backend = FileSystemBackend(app.config['FRAGMENT_CACHE_DIR'] or os.path.join(app.instance_path, 'fragments'),
+                                    app.config['FRAGMENT_CACHE_SIZE'])
+    elif backend_name == 'redis':
+        backend = RedisBackend(app.config['FRAGMENT_CACHE_REDIS_URL'])
+    else:
+        backend = MemoryBackend(app.config['FRAGMENT_CACHE_SIZE'])
+    app.extensions['fragment_cache'] = FragmentCache(backend, app.config['FRAGMENT_CACHE_TTL'],
+                                                     prefix=app.config['RELEASE_ID'])
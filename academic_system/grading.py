@@ -0,0 +1,103 @@
+import csv
+import io
+from datetime import datetime
+from academic_system.models import db, Enrollment, Student, Grade
+from academic_system.dialects import upsert
+from academic_system.versions import STUDENT, SECTION, bump_versions
+from academic_system.summaries import GRADE_LETTERS, invalidate_grade_report, snapshot_grades, record_grade_changes
+
+# Thang điểm chữ (điểm tối thiểu của từng mức), giống hướng dẫn trên form nhập điểm
+GRADE_SCALE = [(8.5, 'A'), (8.0, 'B+'), (7.0, 'B'), (6.5, 'C+'), (5.5, 'C'), (4.0, 'D'), (0, 'F')]
+
+def grade_letter_for(score):
+    for minimum, letter in GRADE_SCALE:
+        if score >= minimum:
+            return letter
+    return 'F'
+
+# ========== NHẬP ĐIỂM CẢ LỚP ==========
+def validate_grade_rows(section_id, raw_rows):
+    # raw_rows: danh sách dict {'line', 'enrollment_id' hoặc 'student_code', 'score', 'grade_letter'}
+    # Trả về (rows hợp lệ để ghi, danh sách lỗi (line, thông báo))
+    enrollments = db.session.query(Enrollment.id, Student.student_code)\
+        .join(Student, Enrollment.student_id == Student.id)\
+        .filter(Enrollment.section_id == section_id)\
+        .all()
+    enrollment_ids = {enrollment_id for enrollment_id, _ in enrollments}
+    by_student_code = {code: enrollment_id for enrollment_id, code in enrollments}
+
+    rows = {}
+    errors = []
+    for raw in raw_rows:
+        line = raw['line']
+        enrollment_id = raw.get('enrollment_id')
+        student_code = (raw.get('student_code') or '').strip()
+
+        if enrollment_id:
+            try:
+                enrollment_id = int(enrollment_id)
+            except (TypeError, ValueError):
+                enrollment_id = None
+            if enrollment_id not in enrollment_ids:
+                errors.append((line, 'Sinh viên không thuộc lớp học phần này'))
+                continue
+        elif student_code:
+            enrollment_id = by_student_code.get(student_code)
+            if enrollment_id is None:
+                errors.append((line, f'Mã sinh viên {student_code} không thuộc lớp học phần này'))
+                continue
+        else:
+            errors.append((line, 'Thiếu mã sinh viên'))
+            continue
+
+        try:
+            score = round(float(str(raw.get('score', '')).strip().replace(',', '.')), 2)
+        except ValueError:
+            errors.append((line, 'Điểm số không hợp lệ'))
+            continue
+        if not 0 <= score <= 10:
+            errors.append((line, 'Điểm số phải từ 0 đến 10'))
+            continue
+
+        grade_letter = (raw.get('grade_letter') or '').strip().upper() or grade_letter_for(score)
+        if grade_letter not in GRADE_LETTERS:
+            errors.append((line, f'Điểm chữ {grade_letter} không hợp lệ'))
+            continue
+
+        if enrollment_id in rows:
+            errors.append((line, 'Sinh viên bị lặp lại trong danh sách'))
+            continue
+        rows[enrollment_id] = {'enrollment_id': enrollment_id, 'score': score, 'grade_letter': grade_letter}
+
+    return list(rows.values()), errors
+
+def save_grades(section_id, rows, instructor_id):
+    # Ghi toàn bộ điểm của lớp (rows từ validate_grade_rows) bằng upsert theo grades.enrollment_id; caller commit
+    submitted_at = datetime.utcnow()
+    previous = snapshot_grades(row['enrollment_id'] for row in rows)
+    upsert(Grade, [
+        dict(row, submitted_by=instructor_id, submitted_at=submitted_at) for row in rows
+    ], conflict_columns=['enrollment_id'],
+       update_columns=['score', 'grade_letter', 'submitted_by', 'submitted_at'])
+    record_grade_changes(previous)
+    bump_versions(STUDENT, [student_id for student_id, _, _ in previous.values()])
+    bump_versions(SECTION, [section_id])
+    invalidate_grade_report()
+
+def read_grade_csv(file_storage):
+    # Đọc file CSV (UTF-8, có dòng tiêu đề) với các cột: student_code hoặc enrollment_id, score, grade_letter
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(stream)
+    fieldnames = {name.strip().lower() for name in (reader.fieldnames or [])}
+    if 'score' not in fieldnames or not fieldnames & {'student_code', 'enrollment_id'}:
+        raise ValueError('File CSV cần có cột score và student_code (hoặc enrollment_id)')
+
+    for line, record in enumerate(reader, start=2):
+        record = {(key or '').strip().lower(): value for key, value in record.items()}
+        yield {
+            'line': line,
+            'enrollment_id': record.get('enrollment_id'),
+            'student_code': record.get('student_code'),
+            'score': record.get('score') or '',
+            'grade_letter': record.get('grade_letter')
+        }
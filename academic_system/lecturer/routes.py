@@ -1,10 +1,25 @@
 from flask import Blueprint, render_template, session, redirect, url_for, flash, request
 from functools import wraps
-from academic_system.models import db, Instructor, Section, Enrollment, Student, Course, Semester, Grade, Attendance
+from sqlalchemy.orm import joinedload
+from academic_system.models import db, Section, Enrollment, Student, Course, Semester, Grade, Attendance
+from academic_system.summaries import record_attendance_marks, invalidate_grade_report, snapshot_grades, record_grade_changes
+from academic_system.dialects import upsert
+from academic_system.versions import STUDENT, SECTION, CATALOG, bump_versions
+from academic_system.conditional import versioned_page
+from academic_system.fragments import cached_fragment
+from academic_system.grading import validate_grade_rows, save_grades, read_grade_csv
+from academic_system.exports import export_response, export_filename, GRADE_HEADER, iter_grades
+from academic_system.db_routing import replica_reads
+from academic_system.principals import current_profile
 from datetime import datetime
 
 lecturer_bp = Blueprint('lecturer', __name__)
 
+# Các trang GET chỉ đọc: đọc từ replica nếu có cấu hình
+replica_reads(lecturer_bp)
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late', 'excused')
+
 def lecturer_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -23,7 +38,7 @@ def dashboard():
         flash('Không tìm thấy thông tin giảng viên', 'danger')
         return redirect(url_for('auth.login'))
     
-    instructor = Instructor.query.get_or_404(instructor_id)
+    instructor = current_profile()
     
     # Lấy số lớp đang dạy
     sections_count = Section.query.filter_by(instructor_id=instructor_id).count()
@@ -53,6 +68,7 @@ def sections():
 
 @lecturer_bp.route('/section/<int:section_id>/students')
 @lecturer_required
+@versioned_page(lambda section_id: [(SECTION, section_id), (CATALOG, 0)])
 def section_students(section_id):
     instructor_id = session.get('instructor_id')
     section = Section.query.get_or_404(section_id)
@@ -62,15 +78,17 @@ def section_students(section_id):
         flash('Bạn không có quyền truy cập lớp này', 'danger')
         return redirect(url_for('lecturer.sections'))
     
-    enrollments = Enrollment.query.filter_by(section_id=section_id).all()
+    # Nạp sinh viên và điểm cùng lúc với danh sách đăng ký (tránh N+1 truy vấn)
+    enrollments = Enrollment.query.filter_by(section_id=section_id)\
+        .options(joinedload(Enrollment.student), joinedload(Enrollment.grade))\
+        .all()
     
     students_data = []
     for enrollment in enrollments:
-        grade = Grade.query.filter_by(enrollment_id=enrollment.id).first()
         students_data.append({
             'enrollment': enrollment,
             'student': enrollment.student,
-            'grade': grade
+            'grade': enrollment.grade
         })
     
     return render_template('lecturer/section_students.html',
@@ -108,6 +126,7 @@ def grade_student(section_id, enrollment_id):
                                      enrollment=enrollment)
             
             # Tìm hoặc tạo grade
+            previous = snapshot_grades([enrollment_id])
             grade = Grade.query.filter_by(enrollment_id=enrollment_id).first()
             if grade:
                 grade.score = score_float
@@ -122,6 +141,10 @@ def grade_student(section_id, enrollment_id):
                 )
                 db.session.add(grade)
             
+            record_grade_changes(previous)
+            bump_versions(STUDENT, [enrollment.student_id])
+            bump_versions(SECTION, [section_id])
+            invalidate_grade_report()
             db.session.commit()
             flash('Nhập điểm thành công', 'success')
             return redirect(url_for('lecturer.section_students', section_id=section_id))
@@ -134,6 +157,90 @@ def grade_student(section_id, enrollment_id):
                          enrollment=enrollment,
                          grade=grade)
 
+def _render_grade_grid(section, errors=None, form_values=None):
+    enrollments = Enrollment.query.filter_by(section_id=section.id)\
+        .options(joinedload(Enrollment.student), joinedload(Enrollment.grade))\
+        .all()
+    return render_template('lecturer/grade_section.html',
+                         section=section,
+                         enrollments=enrollments,
+                         errors=errors or [],
+                         form_values=form_values)
+
+def _save_section_grades(section, raw_rows, instructor_id):
+    rows, errors = validate_grade_rows(section.id, raw_rows)
+    if errors:
+        # Có lỗi thì không ghi dòng nào, báo lỗi theo từng dòng để sửa lại
+        flash(f'Có {len(errors)} dòng không hợp lệ, chưa lưu điểm nào', 'danger')
+        return None, errors
+    if not rows:
+        flash('Không có điểm nào để lưu', 'warning')
+        return None, errors
+    
+    save_grades(section.id, rows, instructor_id)
+    db.session.commit()
+    flash(f'Đã lưu điểm cho {len(rows)} sinh viên', 'success')
+    return redirect(url_for('lecturer.section_students', section_id=section.id)), errors
+
+@lecturer_bp.route('/section/<int:section_id>/grades', methods=['GET', 'POST'])
+@lecturer_required
+def grade_section(section_id):
+    instructor_id = session.get('instructor_id')
+    section = Section.query.get_or_404(section_id)
+    
+    # Kiểm tra quyền
+    if section.instructor_id != instructor_id:
+        flash('Bạn không có quyền truy cập lớp này', 'danger')
+        return redirect(url_for('lecturer.sections'))
+    
+    if request.method == 'POST':
+        # Ô điểm để trống thì bỏ qua (giữ nguyên điểm cũ nếu có)
+        raw_rows = []
+        for key, score in request.form.items():
+            if not key.startswith('score_') or not score.strip():
+                continue
+            enrollment_id = key[len('score_'):]
+            raw_rows.append({
+                'line': request.form.get(f'student_code_{enrollment_id}', enrollment_id),
+                'enrollment_id': enrollment_id,
+                'score': score,
+                'grade_letter': request.form.get(f'grade_letter_{enrollment_id}')
+            })
+        
+        response, errors = _save_section_grades(section, raw_rows, instructor_id)
+        if response:
+            return response
+        return _render_grade_grid(section, errors, request.form)
+    
+    return _render_grade_grid(section)
+
+@lecturer_bp.route('/section/<int:section_id>/grades/import', methods=['POST'])
+@lecturer_required
+def import_grades(section_id):
+    instructor_id = session.get('instructor_id')
+    section = Section.query.get_or_404(section_id)
+    
+    # Kiểm tra quyền
+    if section.instructor_id != instructor_id:
+        flash('Bạn không có quyền truy cập lớp này', 'danger')
+        return redirect(url_for('lecturer.sections'))
+    
+    grades_file = request.files.get('grades_file')
+    if not grades_file or not grades_file.filename:
+        flash('Vui lòng chọn file CSV', 'danger')
+        return redirect(url_for('lecturer.grade_section', section_id=section_id))
+    
+    try:
+        raw_rows = list(read_grade_csv(grades_file))
+    except (ValueError, UnicodeDecodeError) as e:
+        flash(f'Không đọc được file CSV: {e}', 'danger')
+        return redirect(url_for('lecturer.grade_section', section_id=section_id))
+    
+    response, errors = _save_section_grades(section, raw_rows, instructor_id)
+    if response:
+        return response
+    return _render_grade_grid(section, errors)
+
 @lecturer_bp.route('/section/<int:section_id>/report')
 @lecturer_required
 def section_report(section_id):
@@ -145,7 +252,9 @@ def section_report(section_id):
         flash('Bạn không có quyền truy cập lớp này', 'danger')
         return redirect(url_for('lecturer.sections'))
     
-    enrollments = Enrollment.query.filter_by(section_id=section_id).all()
+    enrollments = Enrollment.query.filter_by(section_id=section_id)\
+        .options(joinedload(Enrollment.student), joinedload(Enrollment.grade))\
+        .all()
     
     # Thống kê
     total_students = len(enrollments)
@@ -154,7 +263,7 @@ def section_report(section_id):
     grade_distribution = {'A': 0, 'B+': 0, 'B': 0, 'C+': 0, 'C': 0, 'D': 0, 'F': 0}
     
     for enrollment in enrollments:
-        grade = Grade.query.filter_by(enrollment_id=enrollment.id).first()
+        grade = enrollment.grade
         if grade and grade.score:
             graded_count += 1
             total_score += float(grade.score)
@@ -171,20 +280,40 @@ def section_report(section_id):
                          avg_score=round(avg_score, 2),
                          grade_distribution=grade_distribution)
 
+@lecturer_bp.route('/section/<int:section_id>/report/export.<any(csv, xlsx):fmt>')
+@lecturer_required
+def export_section_report(section_id, fmt):
+    instructor_id = session.get('instructor_id')
+    section = Section.query.get_or_404(section_id)
+    
+    # Kiểm tra quyền
+    if section.instructor_id != instructor_id:
+        flash('Bạn không có quyền truy cập lớp này', 'danger')
+        return redirect(url_for('lecturer.sections'))
+    
+    try:
+        return export_response(export_filename('bao_cao', section.course.course_code, section.section_code), fmt,
+                               GRADE_HEADER, iter_grades(section_id=section_id))
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('lecturer.section_report', section_id=section_id))
+
 @lecturer_bp.route('/student/<int:student_id>/profile')
 @lecturer_required
 def view_student_profile(student_id):
     student = Student.query.get_or_404(student_id)
     
     # Lấy tất cả điểm của sinh viên
-    enrollments = Enrollment.query.filter_by(student_id=student_id).all()
+    # Lớp học phần được nạp kèm môn học và học kỳ (xem quan hệ trong models.py)
+    enrollments = Enrollment.query.filter_by(student_id=student_id)\
+        .options(joinedload(Enrollment.section), joinedload(Enrollment.grade))\
+        .all()
     
     grades_data = []
     for enrollment in enrollments:
-        grade = Grade.query.filter_by(enrollment_id=enrollment.id).first()
         grades_data.append({
             'enrollment': enrollment,
-            'grade': grade,
+            'grade': enrollment.grade,
             'course': enrollment.section.course,
             'section': enrollment.section,
             'semester': enrollment.section.semester
@@ -205,11 +334,25 @@ def section_attendance(section_id):
         flash('Bạn không có quyền truy cập lớp này', 'danger')
         return redirect(url_for('lecturer.sections'))
     
+    # Bảng thống kê chỉ đổi khi có điểm danh / đăng ký mới: giữ trong fragment cache theo lớp
+    attendance_table = cached_fragment(
+        'lecturer-attendance', (section_id,), ('sections', 'enrollments', 'attendance', 'students'),
+        lambda: render_template('lecturer/_attendance_table.html',
+                                students_attendance=_students_attendance(section))
+    )
+    return render_template('lecturer/section_attendance.html',
+                         section=section,
+                         attendance_table=attendance_table,
+                         total_sessions=section.total_sessions)
+
+def _students_attendance(section):
+    section_id = section.id
+    
     # Lấy tất cả sinh viên đã đăng ký
     enrollments = Enrollment.query.filter_by(
         section_id=section_id,
         status='active'
-    ).all()
+    ).options(joinedload(Enrollment.student)).all()
     
     # Lấy tất cả điểm danh đã có
     attendances = Attendance.query.filter_by(section_id=section_id).all()
@@ -252,11 +395,7 @@ def section_attendance(section_id):
             'excused_count': excused_count,
             'attendance_rate': round(attendance_rate, 1)
         })
-    
-    return render_template('lecturer/section_attendance.html',
-                         section=section,
-                         students_attendance=students_attendance,
-                         total_sessions=section.total_sessions)
+    return students_attendance
 
 @lecturer_bp.route('/section/<int:section_id>/attendance/session/<int:session_number>', methods=['GET', 'POST'])
 @lecturer_required
@@ -278,7 +417,13 @@ def mark_attendance(section_id, session_number):
     enrollments = Enrollment.query.filter_by(
         section_id=section_id,
         status='active'
-    ).all()
+    ).options(joinedload(Enrollment.student)).all()
+    
+    # Điểm danh hiện có của buổi học này, lấy trong một truy vấn
+    session_attendances = Attendance.query.filter_by(
+        section_id=section_id,
+        session_number=session_number
+    )
     
     if request.method == 'POST':
         attendance_date = request.form.get('attendance_date')
@@ -287,56 +432,45 @@ def mark_attendance(section_id, session_number):
         else:
             attendance_date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
         
-        # Xử lý điểm danh cho từng sinh viên
+        # Khóa dòng lớp học: các lần lưu đồng thời của lớp (hai giảng viên, form gửi hai lần) chạy
+        # lần lượt, nên không cùng đếm một bản ghi là mới và cộng hai lần vào bảng tổng hợp
+        db.session.query(Section.id).filter(Section.id == section_id).with_for_update().one()
+        
+        # Các sinh viên đã có bản ghi của buổi này (để cập nhật bảng tổng hợp); đọc có khóa để
+        # thấy cả bản ghi của lần lưu vừa commit trước khi có khóa
+        marked_ids = {row[0] for row in session_attendances.with_entities(Attendance.enrollment_id).with_for_update()}
+        
+        # Ghi điểm danh cả buổi bằng một câu upsert theo ràng buộc unique_attendance
+        rows = []
         for enrollment in enrollments:
-            status_key = f'status_{enrollment.id}'
-            notes_key = f'notes_{enrollment.id}'
-            
-            status = request.form.get(status_key, 'absent')
-            notes = request.form.get(notes_key, '')
-            
-            # Tìm hoặc tạo bản ghi điểm danh
-            attendance = Attendance.query.filter_by(
-                enrollment_id=enrollment.id,
-                section_id=section_id,
-                session_number=session_number
-            ).first()
-            
-            if attendance:
-                attendance.status = status
-                attendance.attendance_date = attendance_date
-                attendance.notes = notes
-                attendance.marked_by = instructor_id
-            else:
-                attendance = Attendance(
-                    enrollment_id=enrollment.id,
-                    section_id=section_id,
-                    session_number=session_number,
-                    attendance_date=attendance_date,
-                    status=status,
-                    marked_by=instructor_id,
-                    notes=notes
-                )
-                db.session.add(attendance)
+            status = request.form.get(f'status_{enrollment.id}', 'absent')
+            if status not in ATTENDANCE_STATUSES:
+                status = 'absent'
+            rows.append({
+                'enrollment_id': enrollment.id,
+                'section_id': section_id,
+                'session_number': session_number,
+                'attendance_date': attendance_date,
+                'status': status,
+                'marked_by': instructor_id,
+                'notes': request.form.get(f'notes_{enrollment.id}', '')
+            })
+        upsert(Attendance, rows,
+               conflict_columns=['enrollment_id', 'section_id', 'session_number'],
+               update_columns=['attendance_date', 'status', 'marked_by', 'notes'])
         
+        inserted_count = sum(1 for row in rows if row['enrollment_id'] not in marked_ids)
+        record_attendance_marks(section_id, inserted_count,
+                                new_session=inserted_count > 0 and not marked_ids)
+        bump_versions(SECTION, [section_id])
         db.session.commit()
         flash(f'Điểm danh buổi {session_number} thành công!', 'success')
         return redirect(url_for('lecturer.section_attendance', section_id=section_id))
     
-    # Lấy điểm danh hiện tại của buổi học này (nếu có)
-    current_attendances = {}
-    for enrollment in enrollments:
-        att = Attendance.query.filter_by(
-            enrollment_id=enrollment.id,
-            section_id=section_id,
-            session_number=session_number
-        ).first()
-        if att:
-            current_attendances[enrollment.id] = att
+    current_attendances = {att.enrollment_id: att for att in session_attendances}
     
     return render_template('lecturer/mark_attendance.html',
                          section=section,
                          enrollments=enrollments,
                          session_number=session_number,
                          current_attendances=current_attendances)
-
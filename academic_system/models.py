@@ -1,7 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from academic_system.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Khóa ngoại (ondelete), unique, index và CHECK của Enum khai báo giống Database/data.sql,
+# để schema tạo bằng db.create_all() (vd "flask create-schema" trên SQLite) có cùng ràng buộc
+
+class SlotMask(db.TypeDecorator):
+    # Mặt nạ bit các ô thời gian trong tuần (số nguyên Python, xem timetable.py), lưu dạng nhị phân
+    impl = db.LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big')
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return int.from_bytes(value, 'big')
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -9,7 +28,7 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(100), nullable=False)
-    role = db.Column(db.Enum('student', 'lecturer', 'admin'), nullable=False)
+    role = db.Column(db.Enum('student', 'lecturer', 'admin', create_constraint=True), nullable=False)
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     
     # Relationships
@@ -27,7 +46,8 @@ class Semester(db.Model):
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     
-    sections = db.relationship('Section', backref='semester', lazy=True)
+    # Lớp học phần hầu như luôn được hiển thị kèm học kỳ -> nạp bằng JOIN
+    sections = db.relationship('Section', backref=db.backref('semester', lazy='joined', innerjoin=True), lazy=True)
     
     def __repr__(self):
         return f'<Semester {self.name}>'
@@ -41,7 +61,12 @@ class Course(db.Model):
     credits = db.Column(db.Integer, nullable=False)
     description = db.Column(db.Text)
     
-    sections = db.relationship('Section', backref='course', lazy=True)
+    # Lớp học phần hầu như luôn được hiển thị kèm môn học -> nạp bằng JOIN
+    sections = db.relationship('Section', backref=db.backref('course', lazy='joined', innerjoin=True), lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_courses_name', 'name'),
+    )
     
     def __repr__(self):
         return f'<Course {self.course_code}>'
@@ -50,7 +75,7 @@ class Student(db.Model):
     __tablename__ = 'students'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), unique=True, nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     student_code = db.Column(db.String(20), unique=True, nullable=False)
     date_of_birth = db.Column(db.Date)
@@ -59,6 +84,13 @@ class Student(db.Model):
     
     enrollments = db.relationship('Enrollment', backref='student', lazy=True)
     
+    # Index cho lọc / sắp xếp / phân trang trang quản lý sinh viên
+    __table_args__ = (
+        db.Index('ix_students_full_name', 'full_name'),
+        db.Index('ix_students_active_code', 'is_active', 'student_code'),
+        db.Index('ix_students_active_name', 'is_active', 'full_name'),
+    )
+    
     def __repr__(self):
         return f'<Student {self.student_code}>'
 
@@ -66,7 +98,7 @@ class Instructor(db.Model):
     __tablename__ = 'instructors'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), unique=True, nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     instructor_code = db.Column(db.String(20), unique=True, nullable=False)
     department = db.Column(db.String(100))
@@ -75,6 +107,12 @@ class Instructor(db.Model):
     
     sections = db.relationship('Section', backref='instructor', lazy=True)
     
+    # Index cho lọc / sắp xếp / phân trang trang quản lý giảng viên
+    __table_args__ = (
+        db.Index('ix_instructors_full_name', 'full_name'),
+        db.Index('ix_instructors_department', 'department'),
+    )
+    
     def __repr__(self):
         return f'<Instructor {self.instructor_code}>'
 
@@ -82,32 +120,61 @@ class Section(db.Model):
     __tablename__ = 'sections'
     
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
-    instructor_id = db.Column(db.Integer, db.ForeignKey('instructors.id'), nullable=False)
-    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
+    instructor_id = db.Column(db.Integer, db.ForeignKey('instructors.id', ondelete='RESTRICT'), nullable=False)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), nullable=False)
     section_code = db.Column(db.String(10), nullable=False)
     schedule_info = db.Column(db.String(255))
     max_capacity = db.Column(db.Integer, default=50)
     total_sessions = db.Column(db.Integer, default=15)  # Tổng số buổi học
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0)  # Số SV đang học, chỉ cập nhật qua registration.py
+    schedule_mask = db.Column(SlotMask)  # Các ô thời gian của lịch học, NULL = chưa phân tích schedule_info
+    
+    meetings = db.relationship('SectionMeeting', backref='section', cascade='all, delete-orphan',
+                               passive_deletes=True, order_by='SectionMeeting.weekday, SectionMeeting.start_time')
     
-    enrollments = db.relationship('Enrollment', backref='section', lazy=True)
-    attendances = db.relationship('Attendance', backref='section', lazy=True)
+    # Xóa lớp: CSDL tự xóa đăng ký / điểm danh theo khóa ngoại (ON DELETE CASCADE)
+    enrollments = db.relationship('Enrollment', backref='section', lazy=True, passive_deletes=True)
+    attendances = db.relationship('Attendance', backref='section', lazy=True, passive_deletes=True)
+    attendance_summary = db.relationship('SectionAttendanceSummary', backref='section', uselist=False, cascade='all, delete-orphan')
     
     __table_args__ = (
         db.UniqueConstraint('course_id', 'section_code', 'semester_id', name='unique_section'),
+        db.Index('ix_sections_section_code', 'section_code'),
+        db.Index('ix_sections_semester_code', 'semester_id', 'section_code'),
+        db.Index('ix_sections_instructor_semester', 'instructor_id', 'semester_id'),  # Kiểm tra trùng lịch giảng viên
     )
     
     def __repr__(self):
         return f'<Section {self.section_code}>'
 
+class SectionMeeting(db.Model):
+    # Buổi học trong tuần của lớp, phân tích từ schedule_info (vd "Thứ 2,4 - 7h-9h - Phòng A101")
+    __tablename__ = 'section_meetings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    section_id = db.Column(db.Integer, db.ForeignKey('sections.id', ondelete='CASCADE'), nullable=False)
+    weekday = db.Column(db.SmallInteger, nullable=False)  # 2..7 = Thứ 2..Thứ 7, 8 = Chủ nhật
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    room = db.Column(db.String(20))
+    
+    __table_args__ = (
+        db.Index('ix_section_meetings_section', 'section_id'),
+        db.Index('ix_section_meetings_room', 'room', 'weekday'),
+    )
+    
+    def __repr__(self):
+        return f'<SectionMeeting {self.section_id} - Thứ {self.weekday}>'
+
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
     
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
-    section_id = db.Column(db.Integer, db.ForeignKey('sections.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
+    section_id = db.Column(db.Integer, db.ForeignKey('sections.id', ondelete='CASCADE'), nullable=False)
     enroll_date = db.Column(db.Date, default=datetime.utcnow)
-    status = db.Column(db.Enum('active', 'dropped', 'completed'), default='active')
+    status = db.Column(db.Enum('active', 'dropped', 'completed', create_constraint=True), default='active')
     
     grade = db.relationship('Grade', backref='enrollment', uselist=False, cascade='all, delete-orphan')
     attendances = db.relationship('Attendance', backref='enrollment', lazy=True)
@@ -123,10 +190,10 @@ class Grade(db.Model):
     __tablename__ = 'grades'
     
     id = db.Column(db.Integer, primary_key=True)
-    enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.id'), unique=True, nullable=False)
+    enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.id', ondelete='CASCADE'), unique=True, nullable=False)
     score = db.Column(db.Numeric(4, 2))
     grade_letter = db.Column(db.String(3))
-    submitted_by = db.Column(db.Integer, db.ForeignKey('instructors.id'), nullable=False)
+    submitted_by = db.Column(db.Integer, db.ForeignKey('instructors.id', ondelete='RESTRICT'), nullable=False)
     submitted_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     
     def __repr__(self):
@@ -136,12 +203,12 @@ class Attendance(db.Model):
     __tablename__ = 'attendance'
     
     id = db.Column(db.Integer, primary_key=True)
-    enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.id'), nullable=False)
-    section_id = db.Column(db.Integer, db.ForeignKey('sections.id'), nullable=False)
+    enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.id', ondelete='CASCADE'), nullable=False)
+    section_id = db.Column(db.Integer, db.ForeignKey('sections.id', ondelete='CASCADE'), nullable=False)
     session_number = db.Column(db.Integer, nullable=False)  # Số buổi học: 1, 2, 3, ...
     attendance_date = db.Column(db.Date, nullable=False)
-    status = db.Column(db.Enum('present', 'absent', 'late', 'excused'), default='absent')
-    marked_by = db.Column(db.Integer, db.ForeignKey('instructors.id'), nullable=False)
+    status = db.Column(db.Enum('present', 'absent', 'late', 'excused', create_constraint=True), default='absent')
+    marked_by = db.Column(db.Integer, db.ForeignKey('instructors.id', ondelete='RESTRICT'), nullable=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     
@@ -154,3 +221,105 @@ class Attendance(db.Model):
     def __repr__(self):
         return f'<Attendance {self.id} - Session {self.session_number}>'
 
+
+class SectionAttendanceSummary(db.Model):
+    # Bảng tổng hợp điểm danh theo lớp, được cập nhật khi điểm danh
+    # để trang tổng quan điểm danh chỉ cần một truy vấn
+    __tablename__ = 'section_attendance_summary'
+    
+    section_id = db.Column(db.Integer, db.ForeignKey('sections.id', ondelete='CASCADE'), primary_key=True)
+    sessions_marked = db.Column(db.Integer, nullable=False, default=0)  # Số buổi đã điểm danh
+    total_marked = db.Column(db.Integer, nullable=False, default=0)  # Tổng số bản ghi điểm danh
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SectionAttendanceSummary {self.section_id}>'
+
+class StudentGradeSummary(db.Model):
+    # Tổng hợp điểm theo sinh viên (toàn khóa), được cập nhật khi nhập điểm
+    # để trang chủ / bảng điểm chỉ cần đọc một dòng
+    __tablename__ = 'student_grade_summary'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    credits_attempted = db.Column(db.Integer, nullable=False, default=0)  # Số tín chỉ đã có điểm
+    credits_earned = db.Column(db.Integer, nullable=False, default=0)  # Số tín chỉ đạt (điểm chữ khác F)
+    weighted_score_sum = db.Column(db.Numeric(10, 2), nullable=False, default=0)  # Tổng (tín chỉ × điểm)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def average(self):
+        # Điểm trung bình có trọng số tín chỉ (thang 10)
+        if not self.credits_attempted:
+            return None
+        return round(float(self.weighted_score_sum) / self.credits_attempted, 2)
+    
+    def __repr__(self):
+        return f'<StudentGradeSummary {self.student_id}>'
+
+class StudentSemesterGradeSummary(db.Model):
+    # Tổng hợp điểm theo sinh viên trong từng học kỳ
+    __tablename__ = 'student_semester_grade_summary'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True)
+    credits_attempted = db.Column(db.Integer, nullable=False, default=0)
+    credits_earned = db.Column(db.Integer, nullable=False, default=0)
+    weighted_score_sum = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    semester = db.relationship('Semester')
+    
+    average = StudentGradeSummary.average
+    
+    def __repr__(self):
+        return f'<StudentSemesterGradeSummary {self.student_id} - {self.semester_id}>'
+
+class StudentTimetable(db.Model):
+    # Các ô thời gian sinh viên đã bận trong học kỳ (OR mặt nạ lịch của các lớp đang học),
+    # dùng kiểm tra trùng lịch khi đăng ký bằng một phép AND
+    __tablename__ = 'student_timetables'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    semester_id = db.Column(db.Integer, db.ForeignKey('semesters.id', ondelete='CASCADE'), primary_key=True)
+    occupied_mask = db.Column(SlotMask, nullable=False)
+    
+    def __repr__(self):
+        return f'<StudentTimetable {self.student_id} - {self.semester_id}>'
+
+class DataVersion(db.Model):
+    # Số phiên bản dữ liệu theo phạm vi (vd điểm / đăng ký của một sinh viên), tăng trong
+    # cùng transaction với thao tác ghi; dữ liệu tính sẵn so với số này để biết còn mới không
+    __tablename__ = 'data_versions'
+    
+    scope = db.Column(db.String(20), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.scope}:{self.scope_id} v{self.version}>'
+
+class StudentTranscript(db.Model):
+    # Bảng điểm đã dựng sẵn của sinh viên (JSON gọn), kèm phiên bản dữ liệu lúc dựng
+    __tablename__ = 'student_transcripts'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    student_version = db.Column(db.Integer, nullable=False)
+    catalog_version = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StudentTranscript {self.student_id}>'
+
+class ReportSnapshot(db.Model):
+    # Ảnh chụp kết quả báo cáo đã tính sẵn (JSON) kèm phiên bản dữ liệu lúc tính (xem versions.py),
+    # được tính lại khi phiên bản hiện tại đã mới hơn
+    __tablename__ = 'report_snapshots'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    payload = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ReportSnapshot {self.name}>'
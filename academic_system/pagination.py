@@ -0,0 +1,93 @@
+import base64
+import json
+from flask import request, url_for
+from sqlalchemy import and_, or_
+
+# ========== PHÂN TRANG KEYSET (SEEK) ==========
+# Thay vì OFFSET, trang sau được lấy bằng điều kiện "lớn hơn khóa sắp xếp của dòng cuối",
+# nên thời gian truy vấn không tăng theo số trang và dùng được index (cột sắp xếp, id).
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, prev_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def next_url(self):
+        return _page_url(after=self.next_cursor) if self.next_cursor else None
+
+    @property
+    def prev_url(self):
+        return _page_url(before=self.prev_cursor) if self.prev_cursor else None
+
+    @property
+    def first_url(self):
+        return _page_url() if self.prev_cursor else None
+
+def _page_url(**cursor):
+    args = {key: value for key, value in request.args.items() if key not in ('after', 'before')}
+    args.update(cursor)
+    return url_for(request.endpoint, **request.view_args, **args)
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    # Danh sách size giá trị đơn (chuỗi / số / NULL) hoặc None nếu cursor sai / bị sửa tay
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        return None
+    return values
+
+def _seek_condition(columns, values, forward):
+    # (c1, c2, ..., id) > (v1, v2, ..., vid) viết dạng OR/AND để MySQL dùng được index
+    conditions = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column > values[i] if forward else column < values[i]
+        conditions.append(and_(*equal_prefix, step))
+    return or_(*conditions)
+
+def keyset_paginate(query, sort_columns, per_page=None):
+    # sort_columns: các cột sắp xếp (cột cuối phải là khóa duy nhất, thường là id)
+    per_page = min(max(request.args.get('per_page', DEFAULT_PER_PAGE, type=int), 1), MAX_PER_PAGE) \
+        if per_page is None else per_page
+    after = decode_cursor(request.args.get('after', ''), len(sort_columns))
+    before = decode_cursor(request.args.get('before', ''), len(sort_columns)) if not after else None
+
+    if before:
+        query = query.filter(_seek_condition(sort_columns, before, forward=False))\
+            .order_by(*[column.desc() for column in sort_columns])
+        rows = query.limit(per_page + 1).all()
+        has_more_before = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        next_cursor = _cursor_for(items[-1], sort_columns) if items else None
+        prev_cursor = _cursor_for(items[0], sort_columns) if items and has_more_before else None
+        return KeysetPage(items, next_cursor, prev_cursor)
+
+    if after:
+        query = query.filter(_seek_condition(sort_columns, after, forward=True))
+    query = query.order_by(*sort_columns)
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = _cursor_for(items[-1], sort_columns) if len(rows) > per_page else None
+    prev_cursor = _cursor_for(items[0], sort_columns) if items and after else None
+    return KeysetPage(items, next_cursor, prev_cursor)
+
+def _cursor_for(item, sort_columns):
+    return encode_cursor([getattr(item, column.key) for column in sort_columns])
+
+def prefix_pattern(text):
+    # Mẫu LIKE 'text%' (tìm theo tiền tố để dùng được index), escape ký tự đặc biệt
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
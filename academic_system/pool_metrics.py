@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# ========== CONNECTION POOL: CẤU HÌNH & SỐ LIỆU ==========
+# Pool được cấu hình qua SQLALCHEMY_ENGINE_OPTIONS (biến môi trường DB_POOL_*, xem config.py).
+# InstrumentedQueuePool đo thời gian chờ lấy kết nối (checkout) để biết pool có bị
+# thiếu hay không; số liệu tính riêng cho từng tiến trình worker.
+
+logger = logging.getLogger(__name__)
+
+# Ngưỡng (ms) của các nhóm thời gian chờ checkout
+WAIT_BUCKETS_MS = (1, 10, 100, 1000)
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_in_use = 0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_checkout(self, waited, in_use, timed_out=False):
+        waited_ms = waited * 1000
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.peak_in_use = max(self.peak_in_use, in_use)
+            self.max_wait = max(self.max_wait, waited)
+            bucket = next((i for i, limit in enumerate(WAIT_BUCKETS_MS) if waited_ms < limit), len(WAIT_BUCKETS_MS))
+            self.wait_buckets[bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f'<{limit}ms' for limit in WAIT_BUCKETS_MS] + [f'>={WAIT_BUCKETS_MS[-1]}ms']
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'peak_in_use': self.peak_in_use,
+                'wait_histogram': dict(zip(labels, self.wait_buckets))
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_checkout(time.perf_counter() - started, self.checkedout(), timed_out=True)
+            logger.warning('Hết thời gian chờ kết nối CSDL: %s', self.status())
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started, self.checkedout())
+        return record
+
+    def recreate(self):
+        # Pool được tạo lại khi dispose / mất kết nối: giữ nguyên số liệu đã đo
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+def init_pool_metrics(app):
+    # Gọi trước db.init_app: dùng pool có đo đạc cho engine mặc định
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('poolclass', InstrumentedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def pool_status(engines):
+    # engines: dict bind key -> Engine (db.engines)
+    pools = {}
+    for key, engine in engines.items():
+        pool = engine.pool
+        item = {'class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            item.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0)
+            })
+        metrics = getattr(pool, 'metrics', None)
+        if metrics:
+            item.update(metrics.snapshot())
+        pools[key or 'default'] = item
+    return {'pid': os.getpid(), 'pools': pools}
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import abort, current_app, session
+from sqlalchemy import select
+from academic_system.models import db, User, Student, Instructor
+
+# ========== THÔNG TIN NGƯỜI DÙNG ĐĂNG NHẬP (PRINCIPAL) ==========
+# Đăng nhập lấy tài khoản kèm hồ sơ sinh viên / giảng viên trong một câu JOIN. Hồ sơ
+# được giữ trong bộ nhớ tiến trình theo user_id (bản sao bất biến, không gắn session
+# SQLAlchemy) để các trang chỉ hiển thị tên / mã không phải truy vấn lại ở mỗi request.
+# Quản trị viên sửa hoặc khóa / mở hồ sơ sẽ xóa mục tương ứng (invalidate_principal);
+# với nhiều tiến trình worker, PRINCIPAL_CACHE_TTL giới hạn thời gian một tiến trình
+# khác còn thấy dữ liệu cũ.
+
+Principal = namedtuple('Principal', 'user_id username role profile')
+StudentProfile = namedtuple('StudentProfile', 'id user_id username full_name student_code date_of_birth email is_active')
+InstructorProfile = namedtuple('InstructorProfile', 'id user_id username full_name instructor_code department email is_active')
+
+class PrincipalCache:
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items = OrderedDict()  # user_id -> (hết hạn lúc, principal), theo thứ tự dùng gần nhất
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return item[1]
+
+    def put(self, principal):
+        with self._lock:
+            self._items[principal.user_id] = (time.monotonic() + self.ttl, principal)
+            self._items.move_to_end(principal.user_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+def _principal_query():
+    return select(User, Student, Instructor)\
+        .outerjoin(Student, Student.user_id == User.id)\
+        .outerjoin(Instructor, Instructor.user_id == User.id)
+
+def _build_principal(user, student, instructor):
+    profile = None
+    if user.role == 'student' and student is not None:
+        profile = StudentProfile(student.id, user.id, user.username, student.full_name, student.student_code,
+                                 student.date_of_birth, student.email, student.is_active)
+    elif user.role == 'lecturer' and instructor is not None:
+        profile = InstructorProfile(instructor.id, user.id, user.username, instructor.full_name,
+                                    instructor.instructor_code, instructor.department, instructor.email,
+                                    instructor.is_active)
+    return Principal(user.id, user.username, user.role, profile)
+
+def authenticate(username, password):
+    # Trả về Principal nếu đúng tên đăng nhập / mật khẩu, ngược lại None (một câu truy vấn)
+    row = db.session.execute(_principal_query().where(User.username == username)).first()
+    if row is None or row.User.password != password:  # Đơn giản hóa, trong thực tế nên hash password
+        return None
+    principal = _build_principal(*row)
+    _cache().put(principal)
+    return principal
+
+def get_principal(user_id):
+    cache = _cache()
+    principal = cache.get(user_id)
+    if principal is None:
+        row = db.session.execute(_principal_query().where(User.id == user_id)).first()
+        if row is None:
+            return None
+        principal = _build_principal(*row)
+        cache.put(principal)
+    return principal
+
+def current_profile():
+    # Hồ sơ sinh viên / giảng viên của người đang đăng nhập (404 nếu hồ sơ không còn)
+    principal = get_principal(session.get('user_id'))
+    if principal is None or principal.profile is None:
+        abort(404)
+    return principal.profile
+
+def invalidate_principal(user_id):
+    # Gọi sau khi commit thay đổi hồ sơ sinh viên / giảng viên
+    _cache().invalidate(user_id)
+
+def _cache():
+    return current_app.extensions['principal_cache']
+
+def init_principal_cache(app):
+    app.extensions['principal_cache'] = PrincipalCache(
+        ttl=app.config['PRINCIPAL_CACHE_TTL'],
+        max_size=app.config['PRINCIPAL_CACHE_SIZE']
+    )
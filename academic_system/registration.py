@@ -0,0 +1,212 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from academic_system.models import db, Section, Enrollment
+from academic_system.fragments import SEATS
+from academic_system.versions import STUDENT, SECTION, bump_versions
+from academic_system.timetable import section_mask, lock_timetables, release_timetable
+
+# ========== GIỮ CHỖ LỚP HỌC PHẦN ==========
+# Section.enrolled_count chỉ được thay đổi bằng các câu UPDATE có điều kiện dưới đây,
+# nên kiểm tra sức chứa và tăng bộ đếm là một thao tác nguyên tử trong CSDL. Các câu này
+# chỉ làm mới fragment cache có tag SEATS (xem fragments.py), không phải mọi đoạn tag 'sections'.
+
+def reserve_seat(section_id):
+    # Trả về True nếu giữ được chỗ (lớp chưa đầy); gọi trong cùng transaction với việc tạo đăng ký
+    result = db.session.execute(
+        update(Section)
+        .where(Section.id == section_id, Section.enrolled_count < Section.max_capacity)
+        .values(enrolled_count=Section.enrolled_count + 1)
+        .execution_options(synchronize_session=False, fragment_tags=(SEATS,))
+    )
+    return result.rowcount == 1
+
+def release_seat(section_id):
+    db.session.execute(
+        update(Section)
+        .where(Section.id == section_id, Section.enrolled_count > 0)
+        .values(enrolled_count=Section.enrolled_count - 1)
+        .execution_options(synchronize_session=False, fragment_tags=(SEATS,))
+    )
+
+def activate_enrollment(enrollment_id, enroll_date):
+    # Đăng ký lại một lớp đã hủy; False nếu đăng ký đã active (request khác đã xử lý trước)
+    result = db.session.execute(
+        update(Enrollment)
+        .where(Enrollment.id == enrollment_id, Enrollment.status != 'active')
+        .values(status='active', enroll_date=enroll_date)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def drop_enrollment(enrollment):
+    # Hủy đăng ký và trả chỗ; False nếu đăng ký không còn active (request khác đã hủy trước)
+    result = db.session.execute(
+        update(Enrollment)
+        .where(Enrollment.id == enrollment.id, Enrollment.status == 'active')
+        .values(status='dropped')
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    release_seat(enrollment.section_id)
+    release_timetable(enrollment.student_id, enrollment.section_id)
+    bump_versions(STUDENT, [enrollment.student_id])
+    bump_versions(SECTION, [enrollment.section_id])
+    return True
+
+def claim_timeslots(student_id, section):
+    # Kiểm tra trùng lịch và đánh dấu các ô thời gian của lớp là đã bận; False nếu trùng lịch.
+    # Gọi trong transaction đăng ký, trước khi tạo / kích hoạt đăng ký
+    mask = section_mask(section)
+    if not mask:
+        return True
+    timetable = lock_timetables([student_id], section.semester_id)[student_id]
+    if timetable.occupied_mask & mask:
+        return False
+    timetable.occupied_mask |= mask
+    return True
+
+def admit_batch(section_id, student_ids, enroll_date):
+    # Xử lý một lô yêu cầu đăng ký vào cùng một lớp theo thứ tự đến (hàng đợi đăng ký).
+    # Trả về dict student_id -> 'enrolled' | 'already' | 'conflict' | 'full' | 'not_found'.
+    # Hàm tự commit; trên MySQL dòng section bị khóa (SELECT ... FOR UPDATE) trong suốt lô.
+    section = db.session.query(Section).filter_by(id=section_id)\
+        .populate_existing().with_for_update().first()
+    if not section:
+        db.session.rollback()
+        return dict.fromkeys(student_ids, 'not_found')
+
+    existing = {
+        e.student_id: e for e in Enrollment.query.filter(
+            Enrollment.section_id == section_id,
+            Enrollment.student_id.in_(student_ids)
+        )
+    }
+
+    # Các ô thời gian đã bận của cả lô (khóa dòng), trùng lịch không chiếm chỗ trong lớp
+    mask = section_mask(section)
+    timetables = {}
+    if mask:
+        timetables = lock_timetables([
+            student_id for student_id in student_ids
+            if not (student_id in existing and existing[student_id].status == 'active')
+        ], section.semester_id)
+
+    outcomes = {}
+    admitted = []
+    available = section.max_capacity - section.enrolled_count
+    for student_id in student_ids:
+        if student_id in outcomes:
+            continue
+        enrollment = existing.get(student_id)
+        if enrollment and enrollment.status == 'active':
+            outcomes[student_id] = 'already'
+        elif mask and timetables[student_id].occupied_mask & mask:
+            outcomes[student_id] = 'conflict'
+        elif len(admitted) >= available:
+            outcomes[student_id] = 'full'
+        else:
+            outcomes[student_id] = 'enrolled'
+            admitted.append(student_id)
+
+    if not admitted:
+        db.session.rollback()
+        return outcomes
+
+    # Tăng sĩ số một lần cho cả lô, vẫn có điều kiện để an toàn với
+    # các tiến trình khác không dùng hàng đợi
+    result = db.session.execute(
+        update(Section)
+        .where(Section.id == section_id,
+               Section.enrolled_count + len(admitted) <= Section.max_capacity)
+        .values(enrolled_count=Section.enrolled_count + len(admitted))
+        .execution_options(synchronize_session=False, fragment_tags=(SEATS,))
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return _admit_one_by_one(section_id, student_ids, enroll_date)
+
+    for student_id in admitted:
+        if mask:
+            timetables[student_id].occupied_mask |= mask
+        enrollment = existing.get(student_id)
+        if enrollment:
+            enrollment.status = 'active'
+            enrollment.enroll_date = enroll_date
+        else:
+            db.session.add(Enrollment(
+                student_id=student_id,
+                section_id=section_id,
+                status='active',
+                enroll_date=enroll_date
+            ))
+    bump_versions(STUDENT, admitted)
+    bump_versions(SECTION, [section_id])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Có sinh viên vừa đăng ký trực tiếp lớp này trong lúc xử lý lô
+        db.session.rollback()
+        return _admit_one_by_one(section_id, student_ids, enroll_date)
+    return outcomes
+
+def _admit_one_by_one(section_id, student_ids, enroll_date):
+    # Đường dự phòng khi xử lý theo lô bị xung đột: giữ chỗ từng sinh viên
+    outcomes = {}
+    for student_id in student_ids:
+        if student_id in outcomes:
+            continue
+        existing = Enrollment.query.filter_by(student_id=student_id, section_id=section_id).first()
+        if existing and existing.status == 'active':
+            outcomes[student_id] = 'already'
+            continue
+        if not reserve_seat(section_id):
+            db.session.rollback()
+            outcomes[student_id] = 'full'
+            continue
+        if not claim_timeslots(student_id, db.session.get(Section, section_id)):
+            db.session.rollback()
+            outcomes[student_id] = 'conflict'
+            continue
+        if existing:
+            if not activate_enrollment(existing.id, enroll_date):
+                db.session.rollback()
+                outcomes[student_id] = 'already'
+                continue
+        else:
+            db.session.add(Enrollment(
+                student_id=student_id,
+                section_id=section_id,
+                status='active',
+                enroll_date=enroll_date
+            ))
+        bump_versions(STUDENT, [student_id])
+        bump_versions(SECTION, [section_id])
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            outcomes[student_id] = 'already'
+            continue
+        outcomes[student_id] = 'enrolled'
+    return outcomes
+
+def recount_enrollments():
+    # Đối soát Section.enrolled_count với bảng enrollments, trả về danh sách
+    # (section_id, giá trị cũ, giá trị đúng) của các lớp bị lệch
+    actual = select(func.count(Enrollment.id))\
+        .where(Enrollment.section_id == Section.id, Enrollment.status == 'active')\
+        .scalar_subquery()
+
+    mismatches = db.session.query(Section.id, Section.enrolled_count, actual)\
+        .filter(Section.enrolled_count != actual)\
+        .all()
+
+    if mismatches:
+        db.session.execute(
+            update(Section)
+            .values(enrolled_count=actual)
+            .execution_options(synchronize_session=False, fragment_tags=(SEATS,))
+        )
+    db.session.commit()
+    return mismatches
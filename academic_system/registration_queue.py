@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from academic_system.models import db
+from academic_system.registration import admit_batch
+
+# ========== HÀNG ĐỢI ĐĂNG KÝ (CAO ĐIỂM) ==========
+# Khi bật REGISTRATION_QUEUE_ENABLED, POST /student/enroll/<section_id> chỉ đưa yêu cầu
+# vào hàng đợi có giới hạn trong tiến trình và trả về mã theo dõi (token) ngay lập tức.
+# Một luồng nền lấy yêu cầu theo lô, gom theo lớp và xử lý mỗi lớp trong một transaction.
+# Kết quả được giữ trong bộ nhớ của tiến trình, nên chế độ này cần chạy một tiến trình
+# (nhiều luồng) hoặc sticky session để sinh viên hỏi lại đúng tiến trình đã nhận yêu cầu.
+
+PENDING = 'pending'
+
+class RegistrationQueue:
+    def __init__(self, app, maxsize, batch_size, result_ttl):
+        self.app = app
+        self.batch_size = batch_size
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._results = OrderedDict()  # token -> kết quả, theo thứ tự tạo
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, student_id, section_id):
+        # Trả về token, hoặc None nếu hàng đợi đã đầy (hệ thống quá tải)
+        self._ensure_worker()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self._results[token] = {
+                'student_id': student_id,
+                'section_id': section_id,
+                'status': PENDING,
+                'created_at': time.monotonic()
+            }
+        try:
+            self._queue.put_nowait((token, student_id, section_id))
+        except queue.Full:
+            with self._lock:
+                self._results.pop(token, None)
+            return None
+        return token
+
+    def result(self, token, student_id):
+        # Chỉ trả kết quả cho đúng sinh viên đã gửi yêu cầu
+        with self._lock:
+            item = self._results.get(token)
+            if not item or item['student_id'] != student_id:
+                return None
+            return {'section_id': item['section_id'], 'status': item['status']}
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _prune(self):
+        expired_before = time.monotonic() - self.result_ttl
+        while self._results:
+            token, item = next(iter(self._results.items()))
+            if item['created_at'] >= expired_before:
+                break
+            self._results.popitem(last=False)
+
+    def _ensure_worker(self):
+        # Khởi động luồng xử lý ở yêu cầu đầu tiên (không chạy khi dùng lệnh CLI)
+        if self._worker and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name='registration-queue', daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            by_section = defaultdict(list)
+            for token, student_id, section_id in batch:
+                by_section[section_id].append((token, student_id))
+
+            with self.app.app_context():
+                for section_id, requests in by_section.items():
+                    self._process_section(section_id, requests)
+                db.session.remove()
+
+    def _process_section(self, section_id, requests):
+        try:
+            outcomes = admit_batch(section_id, [student_id for _, student_id in requests],
+                                   datetime.utcnow().date())
+        except Exception:
+            db.session.rollback()
+            self.app.logger.exception('Lỗi xử lý hàng đợi đăng ký cho lớp %s', section_id)
+            outcomes = {}
+
+        with self._lock:
+            for token, student_id in requests:
+                item = self._results.get(token)
+                if item:
+                    item['status'] = outcomes.get(student_id, 'error')
+
+def init_registration_queue(app):
+    app.extensions['registration_queue'] = RegistrationQueue(
+        app,
+        maxsize=app.config['REGISTRATION_QUEUE_SIZE'],
+        batch_size=app.config['REGISTRATION_BATCH_SIZE'],
+        result_ttl=app.config['REGISTRATION_RESULT_TTL']
+    )
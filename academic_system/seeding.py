@@ -0,0 +1,302 @@
+import math
+import random
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert
+from academic_system.models import (db, User, Student, Instructor, Course, Semester, Section, SectionMeeting,
+                                    Enrollment, Grade, Attendance)
+from academic_system.grading import grade_letter_for
+from academic_system.registration import recount_enrollments
+from academic_system.summaries import rebuild_attendance_summaries, rebuild_grade_summaries, invalidate_grade_report
+from academic_system.timetable import parse_schedule, meetings_mask
+
+# ========== SINH DỮ LIỆU LỚN ĐỂ KIỂM THỬ TẢI ==========
+# Dữ liệu được sinh tất định từ seed (cùng tham số -> cùng dữ liệu) và ghi bằng
+# executemany theo lô qua bảng Core, với id gán sẵn để không phải đọc lại sau mỗi lô.
+# Mọi mã / username mang tiền tố riêng nên không đụng dữ liệu có sẵn; các ràng buộc
+# unique (mã lớp theo môn + học kỳ, đăng ký, điểm, điểm danh theo buổi) được bảo đảm
+# ngay khi sinh.
+
+SEED_BATCH_SIZE = 5000
+SEED_PASSWORD = '123456'
+
+LAST_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng',
+              'Bùi', 'Đỗ', 'Hồ', 'Ngô', 'Dương', 'Lý']
+MIDDLE_NAMES = ['Văn', 'Thị', 'Minh', 'Ngọc', 'Thanh', 'Quốc', 'Gia', 'Hoài', 'Đức', 'Thu', 'Hữu', 'Khánh']
+FIRST_NAMES = ['An', 'Bình', 'Chi', 'Dũng', 'Giang', 'Hà', 'Hải', 'Hùng', 'Khoa', 'Lan', 'Linh', 'Long',
+               'Mai', 'Nam', 'Phong', 'Quân', 'Sơn', 'Thảo', 'Trang', 'Tuấn', 'Vy', 'Yến']
+DEPARTMENTS = ['Công nghệ thông tin', 'Kinh tế', 'Ngoại ngữ', 'Điện - Điện tử', 'Cơ khí', 'Toán - Tin']
+SUBJECTS = ['Lập trình', 'Cơ sở dữ liệu', 'Giải tích', 'Đại số', 'Kinh tế vi mô', 'Tiếng Anh',
+            'Vật lý', 'Mạng máy tính', 'Hệ điều hành', 'Kế toán', 'Xác suất thống kê', 'Điện tử số']
+SCHEDULE_DAYS = ['2,4', '3,5', '4,6', '2,6', '7']
+SCHEDULE_HOURS = ['7h-9h', '9h-11h', '13h-15h', '15h-17h']
+BUILDINGS = ['A', 'B', 'C', 'D']
+ROOMS = [f'{building}{floor}{number:02d}' for building in BUILDINGS for floor in range(1, 6) for number in range(1, 21)]
+
+# Các khung giờ có thể xếp: (lịch học, mặt nạ). Một giảng viên / phòng có tối đa
+# MAX_SECTIONS_PER_RESOURCE lớp không trùng giờ trong một học kỳ (mọi cách xếp tham lam đều đạt số này)
+SCHEDULE_SLOTS = [(f'Thứ {days} - {hours}', meetings_mask(parse_schedule(f'Thứ {days} - {hours}')))
+                  for days in SCHEDULE_DAYS for hours in SCHEDULE_HOURS]
+
+def _greedy_slot_count():
+    busy = count = 0
+    for _, mask in SCHEDULE_SLOTS:
+        if not busy & mask:
+            busy |= mask
+            count += 1
+    return count
+
+MAX_SECTIONS_PER_RESOURCE = _greedy_slot_count()
+
+ATTENDANCE_WEIGHTS = (('present', 80), ('absent', 8), ('late', 8), ('excused', 4))
+DROP_RATE = 0.03
+
+class SeedOptions:
+    def __init__(self, students=1000, instructors=50, courses=100, semesters=3, sections_per_semester=150,
+                 enrollments_per_student=5, attendance_sessions=10, seed=42, prefix='Z',
+                 batch_size=SEED_BATCH_SIZE):
+        self.students = students
+        self.instructors = instructors
+        self.courses = courses
+        self.semesters = semesters
+        self.sections_per_semester = sections_per_semester
+        self.enrollments_per_student = enrollments_per_student
+        self.attendance_sessions = attendance_sessions
+        self.seed = seed
+        self.prefix = prefix
+        self.batch_size = batch_size
+
+    def validate(self):
+        if not (self.prefix.isascii() and self.prefix.isalnum() and 1 <= len(self.prefix) <= 3):
+            raise ValueError('Tiền tố phải gồm 1-3 chữ cái / chữ số')
+        if self.courses > 9999:
+            raise ValueError('Tối đa 9999 môn học')
+        if min(self.students, self.instructors, self.courses, self.semesters, self.sections_per_semester) < 1:
+            raise ValueError('Số sinh viên, giảng viên, môn học, học kỳ và lớp mỗi học kỳ phải lớn hơn 0')
+        if self.sections_per_semester > self.courses * 99:
+            raise ValueError('Mỗi môn có tối đa 99 lớp trong một học kỳ')
+        if self.sections_per_semester > self.instructors * MAX_SECTIONS_PER_RESOURCE:
+            raise ValueError(f'Mỗi giảng viên dạy tối đa {MAX_SECTIONS_PER_RESOURCE} lớp không trùng giờ '
+                             f'trong một học kỳ, hãy tăng số giảng viên')
+        if self.sections_per_semester > len(ROOMS) * MAX_SECTIONS_PER_RESOURCE:
+            raise ValueError(f'Tối đa {len(ROOMS) * MAX_SECTIONS_PER_RESOURCE} lớp mỗi học kỳ '
+                             f'({len(ROOMS)} phòng học)')
+
+# Thứ tự ghi theo khóa ngoại: bảng cha luôn được ghi trước bảng con
+WRITE_ORDER = [User, Instructor, Student, Course, Semester, Section, SectionMeeting, Enrollment, Grade, Attendance]
+
+class _BatchWriter:
+    # Gom dòng theo bảng và ghi executemany khi đủ lô
+    def __init__(self, batch_size, progress):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.pending = {model: [] for model in WRITE_ORDER}
+        self.counts = {}
+
+    def add(self, model, row):
+        rows = self.pending[model]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        # Ghi bảng được yêu cầu cùng mọi bảng cha còn dòng chờ (mặc định: tất cả)
+        last = WRITE_ORDER.index(model) if model else len(WRITE_ORDER) - 1
+        for current in WRITE_ORDER[:last + 1]:
+            rows = self.pending[current]
+            if not rows:
+                continue
+            db.session.execute(insert(current.__table__), rows)
+            db.session.commit()
+            table = current.__tablename__
+            self.counts[table] = self.counts.get(table, 0) + len(rows)
+            self.pending[current] = []
+            if self.progress:
+                self.progress(table, self.counts[table])
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+def _pick_free(rng, owners, busy, mask, attempts=20):
+    # Chọn ngẫu nhiên giảng viên / phòng chưa bận trong các ô của mask; thử vài lần rồi mới
+    # quét toàn bộ (khi gần kín lịch). None nếu không còn ai rảnh
+    for _ in range(attempts):
+        owner = rng.choice(owners)
+        if not busy.get(owner, 0) & mask:
+            return owner
+    free = [owner for owner in owners if not busy.get(owner, 0) & mask]
+    return rng.choice(free) if free else None
+
+def _full_name(rng):
+    return f'{rng.choice(LAST_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(FIRST_NAMES)}'
+
+def seed_scale(options, progress=None):
+    # progress(tên bảng, số dòng đã ghi) được gọi sau mỗi lô; trả về dict bảng -> số dòng
+    options.validate()
+    rng = random.Random(options.seed)
+    prefix = options.prefix.upper()
+    username_prefix = f'{prefix.lower()}_'
+
+    # Các mẫu mã sinh ra (dấu _ của LIKE khớp đúng một ký tự số)
+    taken = [
+        db.session.query(User.id).filter(User.username.like(f'{username_prefix}%')),
+        db.session.query(Student.id).filter(Student.student_code.like(f'{prefix}SV_______')),
+        db.session.query(Instructor.id).filter(Instructor.instructor_code.like(f'{prefix}GV_____')),
+        db.session.query(Course.id).filter(Course.course_code.like(f'{prefix}____'))
+    ]
+    if any(query.first() for query in taken):
+        raise ValueError(f'Đã có dữ liệu sinh với tiền tố {prefix}, hãy xóa hoặc chọn tiền tố khác')
+
+    writer = _BatchWriter(options.batch_size, progress)
+    now = datetime.utcnow()
+
+    # Giảng viên và sinh viên (mỗi người một tài khoản)
+    user_id = _next_id(User)
+    first_instructor_id = _next_id(Instructor)
+    instructor_ids = list(range(first_instructor_id, first_instructor_id + options.instructors))
+    for number, instructor_id in enumerate(instructor_ids, start=1):
+        writer.add(User, {'id': user_id, 'username': f'{username_prefix}gv{number:05d}',
+                          'password': SEED_PASSWORD, 'role': 'lecturer', 'created_at': now})
+        writer.add(Instructor, {'id': instructor_id, 'user_id': user_id, 'full_name': _full_name(rng),
+                                'instructor_code': f'{prefix}GV{number:05d}',
+                                'department': rng.choice(DEPARTMENTS),
+                                'email': f'{username_prefix}gv{number:05d}@example.edu.vn', 'is_active': True})
+        user_id += 1
+
+    first_student_id = _next_id(Student)
+    student_ids = list(range(first_student_id, first_student_id + options.students))
+    for number, student_id in enumerate(student_ids, start=1):
+        writer.add(User, {'id': user_id, 'username': f'{username_prefix}sv{number:07d}',
+                          'password': SEED_PASSWORD, 'role': 'student', 'created_at': now})
+        writer.add(Student, {'id': student_id, 'user_id': user_id, 'full_name': _full_name(rng),
+                             'student_code': f'{prefix}SV{number:07d}',
+                             'date_of_birth': date(2000, 1, 1) + timedelta(days=rng.randrange(6 * 365)),
+                             'email': f'{username_prefix}sv{number:07d}@example.edu.vn',
+                             'is_active': rng.random() > 0.02})
+        user_id += 1
+    writer.flush()
+
+    # Môn học, học kỳ, lớp học phần
+    first_course_id = _next_id(Course)
+    course_ids = list(range(first_course_id, first_course_id + options.courses))
+    course_codes = {}
+    for number, course_id in enumerate(course_ids, start=1):
+        course_codes[course_id] = f'{prefix}{number:04d}'
+        writer.add(Course, {'id': course_id, 'course_code': course_codes[course_id],
+                            'name': f'{rng.choice(SUBJECTS)} {number}', 'credits': rng.choice((2, 3, 3, 4)),
+                            'description': None})
+    writer.flush()
+
+    semesters = []
+    first_semester_id = _next_id(Semester)
+    for index in range(options.semesters):
+        # Học kỳ 1 bắt đầu tháng 8, học kỳ 2 tháng 1 năm sau (giống cách đặt tên 2025_1, 2025_2)
+        academic_year = 2020 + index // 2
+        term_start = date(academic_year + 1, 1, 10) if index % 2 else date(academic_year, 8, 1)
+        semester = {'id': first_semester_id + index,
+                    'name': f'{prefix}-{academic_year}_{index % 2 + 1}',
+                    'start_date': term_start, 'end_date': term_start + timedelta(weeks=20)}
+        semesters.append(semester)
+        writer.add(Semester, semester)
+    writer.flush()
+
+    # Sức chứa đủ cho số đăng ký dự kiến của mỗi học kỳ (dư 25%)
+    capacity = max(40, math.ceil(options.students * options.enrollments_per_student
+                                 / options.sections_per_semester * 1.25))
+    section_id = _next_id(Section)
+    sections_by_semester = {}
+    section_info = {}  # id -> (giảng viên, ngày bắt đầu học kỳ, số buổi)
+    section_masks = {}  # id -> mặt nạ lịch học (xem timetable.py)
+    for semester in semesters:
+        ids = []
+        # Ô đã bận của từng giảng viên / phòng trong học kỳ: không xếp trùng giờ (như assignment_clashes)
+        instructor_busy = {}
+        room_busy = {}
+        for index in range(options.sections_per_semester):
+            course_id = course_ids[index % options.courses]
+            total_sessions = rng.choice((10, 15, 15, 15))
+            for slot, mask in rng.sample(SCHEDULE_SLOTS, len(SCHEDULE_SLOTS)):
+                instructor_id = _pick_free(rng, instructor_ids, instructor_busy, mask)
+                room = _pick_free(rng, ROOMS, room_busy, mask) if instructor_id is not None else None
+                if room is not None:
+                    break
+            else:
+                raise ValueError('Không đủ giảng viên / phòng học để xếp lịch không trùng, hãy giảm số lớp')
+            instructor_busy[instructor_id] = instructor_busy.get(instructor_id, 0) | mask
+            room_busy[room] = room_busy.get(room, 0) | mask
+            schedule_info = f'{slot} - Phòng {room}'
+            meetings = parse_schedule(schedule_info)
+            section_masks[section_id] = meetings_mask(meetings)
+            writer.add(Section, {
+                'id': section_id, 'course_id': course_id, 'instructor_id': instructor_id,
+                'semester_id': semester['id'],
+                'section_code': f'{course_codes[course_id]}-{index // options.courses + 1:02d}',
+                'schedule_info': schedule_info, 'schedule_mask': section_masks[section_id],
+                'max_capacity': capacity, 'total_sessions': total_sessions, 'enrolled_count': 0
+            })
+            for meeting in meetings:
+                writer.add(SectionMeeting, {'section_id': section_id, **meeting._asdict()})
+            section_info[section_id] = (instructor_id, semester['start_date'], total_sessions)
+            ids.append(section_id)
+            section_id += 1
+        sections_by_semester[semester['id']] = ids
+    writer.flush()
+
+    # Đăng ký, điểm (các học kỳ đã kết thúc) và điểm danh
+    statuses = [status for status, _ in ATTENDANCE_WEIGHTS]
+    weights = [weight for _, weight in ATTENDANCE_WEIGHTS]
+    enrollment_id = _next_id(Enrollment)
+    last_semester_id = semesters[-1]['id']
+    for semester in semesters:
+        # Lớp còn chỗ nhóm theo mặt nạ lịch học: mỗi sinh viên chỉ chọn các lớp không trùng giờ
+        # với lớp đã chọn (cùng phép AND như khi đăng ký), nên có thể ít hơn enrollments_per_student
+        open_sections = {}
+        for candidate in sections_by_semester[semester['id']]:
+            open_sections.setdefault(section_masks[candidate], []).append(candidate)
+        seats = dict.fromkeys(sections_by_semester[semester['id']], capacity)
+        graded = semester['id'] != last_semester_id
+        for student_id in student_ids:
+            picked = []
+            busy = 0
+            for mask in rng.sample(list(open_sections), len(open_sections)):
+                if len(picked) == options.enrollments_per_student:
+                    break
+                if not mask & busy:
+                    picked.append(rng.choice(open_sections[mask]))
+                    busy |= mask
+            for chosen in picked:
+                seats[chosen] -= 1
+                if not seats[chosen]:
+                    same_schedule = open_sections[section_masks[chosen]]
+                    same_schedule.remove(chosen)
+                    if not same_schedule:
+                        del open_sections[section_masks[chosen]]
+
+                instructor_id, semester_start, total_sessions = section_info[chosen]
+                dropped = rng.random() < DROP_RATE
+                writer.add(Enrollment, {'id': enrollment_id, 'student_id': student_id, 'section_id': chosen,
+                                        'enroll_date': semester_start - timedelta(days=rng.randint(1, 20)),
+                                        'status': 'dropped' if dropped else 'active'})
+                if not dropped:
+                    if graded:
+                        score = round(min(10, max(0, rng.gauss(7, 1.5))), 1)
+                        writer.add(Grade, {'enrollment_id': enrollment_id, 'score': score,
+                                           'grade_letter': grade_letter_for(score), 'submitted_by': instructor_id,
+                                           'submitted_at': now})
+                    for session_number in range(1, min(options.attendance_sessions, total_sessions) + 1):
+                        writer.add(Attendance, {
+                            'enrollment_id': enrollment_id, 'section_id': chosen,
+                            'session_number': session_number,
+                            'attendance_date': semester_start + timedelta(weeks=session_number - 1),
+                            'status': rng.choices(statuses, weights)[0],
+                            'marked_by': instructor_id, 'notes': None, 'created_at': now
+                        })
+                enrollment_id += 1
+    writer.flush()
+
+    # Cập nhật sĩ số, các bảng tổng hợp và báo cáo điểm
+    recount_enrollments()
+    rebuild_attendance_summaries()
+    rebuild_grade_summaries()
+    invalidate_grade_report()
+    db.session.commit()
+    return writer.counts
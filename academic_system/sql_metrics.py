@@ -0,0 +1,116 @@
+import heapq
+import json
+import logging
+import re
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ========== THỐNG KÊ SQL THEO REQUEST ==========
+# Mỗi request đếm số câu SQL, tổng thời gian CSDL và các câu chậm nhất (qua sự kiện
+# của mọi Engine, kể cả replica), trả về trong header X-DB-Queries / Server-Timing và
+# ghi một dòng log JSON. Câu lệnh cùng "dạng" (chỉ khác tham số) chạy lặp lại nhiều lần
+# trong một request được cảnh báo là nghi vấn N+1.
+# Tắt mặc định (SQL_METRICS_ENABLED). Với response dạng luồng (xuất file), header chỉ tính
+# các câu chạy trước khi gửi body; dòng log được ghi khi response đóng và tính đủ mọi câu.
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_PREVIEW = 200
+
+# Danh sách tham số IN (?, ?, ...) có độ dài khác nhau vẫn coi là cùng một dạng
+_PARAM_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    return _PARAM_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+class RequestSqlStats:
+    def __init__(self, slow_limit):
+        self.slow_limit = slow_limit
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []  # heap (thời gian, thứ tự, câu lệnh)
+        self.statements = Counter()  # chỉ chuẩn hóa thành dạng lúc báo cáo, không phải mỗi câu
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total += duration
+        self.statements[statement] += 1
+        item = (duration, self.count, statement)
+        if len(self.slowest) < self.slow_limit:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+    def repeated(self, threshold):
+        shapes = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get('sql_stats') is not None:
+        context.sql_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'sql_started', None)
+    if started is not None and has_request_context() and g.get('sql_stats') is not None:
+        g.sql_stats.record(statement, time.perf_counter() - started)
+
+def _log_stats(stats, info, threshold):
+    repeated = stats.repeated(threshold)
+    for shape, count in repeated:
+        logger.warning('Nghi vấn N+1 tại %s: %d lần câu lệnh %s', info['endpoint'], count, shape[:STATEMENT_PREVIEW])
+
+    logger.info(json.dumps(dict(
+        info,
+        queries=stats.count,
+        db_ms=round(stats.total * 1000, 2),
+        slowest=[
+            {'ms': round(duration * 1000, 2), 'sql': _WHITESPACE.sub(' ', statement)[:STATEMENT_PREVIEW]}
+            for duration, _, statement in sorted(stats.slowest, reverse=True)
+        ],
+        n_plus_one=[{'count': count, 'sql': shape[:STATEMENT_PREVIEW]} for shape, count in repeated]
+    ), ensure_ascii=False))
+
+def init_sql_metrics(app):
+    if not app.config.get('SQL_METRICS_ENABLED'):
+        return
+
+    # Lấy logger của module qua app.logger ("academic_system.sql_metrics" là con của "academic_system"):
+    # Flask tạo logger cha và gắn handler mặc định ở lần đầu truy cập app.logger, nên log thống kê
+    # xuất hiện cả khi ứng dụng không tự cấu hình logging
+    metrics_logger = app.logger.getChild('sql_metrics')
+    if metrics_logger.level == logging.NOTSET:
+        metrics_logger.setLevel(app.config['SQL_METRICS_LOG_LEVEL'])
+
+    @app.before_request
+    def start_sql_stats():
+        g.sql_stats = RequestSqlStats(app.config['SQL_METRICS_SLOW_LIMIT'])
+
+    @app.after_request
+    def report_sql_stats(response):
+        stats = g.get('sql_stats')
+        if stats is None:
+            return response
+
+        db_ms = round(stats.total * 1000, 2)
+        response.headers['X-DB-Queries'] = str(stats.count)
+        response.headers.add('Server-Timing', f'db;dur={db_ms};desc="{stats.count} queries"')
+
+        info = {'endpoint': request.endpoint, 'method': request.method,
+                'path': request.path, 'status': response.status_code}
+        threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        if response.is_streamed:
+            # Body còn chạy truy vấn trong lúc gửi (stream_with_context giữ g.sql_stats):
+            # ghi log khi response đóng
+            response.call_on_close(lambda: _log_stats(stats, info, threshold))
+        else:
+            g.pop('sql_stats')
+            _log_stats(stats, info, threshold)
+        return response
@@ -1,10 +1,22 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, current_app, jsonify
 from functools import wraps
-from academic_system.models import db, Student, Enrollment, Section, Course, Semester, Grade
+from academic_system.models import db, Enrollment, Section, Course, Semester, StudentGradeSummary
+from academic_system.registration import reserve_seat, activate_enrollment, drop_enrollment, claim_timeslots
+from academic_system.db_routing import replica_reads
+from academic_system.principals import current_profile
+from academic_system.transcripts import get_transcript
+from academic_system.versions import STUDENT, SECTION, CATALOG, bump_versions
+from academic_system.conditional import versioned_page
+from academic_system.timetable import section_mask, weekly_grid, weekday_label
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 from datetime import datetime
 
 student_bp = Blueprint('student', __name__)
 
+# Các trang GET chỉ đọc: đọc từ replica nếu có cấu hình
+replica_reads(student_bp)
+
 def student_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -14,16 +26,21 @@ def student_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _student_pages():
+    # Trang chủ, thời khóa biểu, điểm: đăng ký / điểm của sinh viên và thông tin môn / lớp
+    return [(STUDENT, session.get('student_id')), (CATALOG, 0)]
+
 @student_bp.route('/')
 @student_bp.route('/dashboard')
 @student_required
+@versioned_page(_student_pages)
 def dashboard():
     student_id = session.get('student_id')
     if not student_id:
         flash('Không tìm thấy thông tin sinh viên', 'danger')
         return redirect(url_for('auth.login'))
     
-    student = Student.query.get_or_404(student_id)
+    student = current_profile()
     
     # Lấy số lớp đang học
     active_enrollments = Enrollment.query.filter_by(
@@ -31,23 +48,17 @@ def dashboard():
         status='active'
     ).count()
     
-    # Lấy điểm trung bình
-    grades = db.session.query(Grade).join(Enrollment).filter(
-        Enrollment.student_id == student_id
-    ).all()
-    
-    avg_score = 0
-    if grades:
-        total = sum(float(g.score) for g in grades if g.score)
-        avg_score = total / len(grades)
+    # Điểm trung bình có trọng số tín chỉ, đọc từ bảng tổng hợp (xem summaries.py)
+    grade_summary = db.session.get(StudentGradeSummary, student_id)
     
     return render_template('student/dashboard.html', 
                          student=student,
                          active_enrollments=active_enrollments,
-                         avg_score=round(avg_score, 2))
+                         grade_summary=grade_summary)
 
 @student_bp.route('/schedule')
 @student_required
+@versioned_page(_student_pages)
 def schedule():
     student_id = session.get('student_id')
     if not student_id:
@@ -57,32 +68,33 @@ def schedule():
     enrollments = Enrollment.query.filter_by(
         student_id=student_id,
         status='active'
-    ).join(Section).join(Course).join(Semester).all()
+    ).join(Section).join(Course).join(Semester)\
+        .options(contains_eager(Enrollment.section).contains_eager(Section.course),
+                 contains_eager(Enrollment.section).contains_eager(Section.semester),
+                 contains_eager(Enrollment.section).joinedload(Section.instructor),
+                 contains_eager(Enrollment.section).selectinload(Section.meetings))\
+        .order_by(Semester.start_date.desc(), Section.section_code).all()
     
-    return render_template('student/schedule.html', enrollments=enrollments)
+    # Lịch theo tuần của từng học kỳ, học kỳ gần nhất trước
+    semesters = {}
+    for enrollment in enrollments:
+        semesters.setdefault(enrollment.section.semester, []).append(enrollment.section)
+    weekly = [(semester, weekly_grid(sections)) for semester, sections in semesters.items()]
+    
+    return render_template('student/schedule.html', enrollments=enrollments,
+                         weekly=weekly, weekday_label=weekday_label)
 
 @student_bp.route('/grades')
 @student_required
+@versioned_page(_student_pages)
 def grades():
     student_id = session.get('student_id')
     if not student_id:
         return redirect(url_for('auth.login'))
     
-    # Lấy tất cả điểm số
-    enrollments = Enrollment.query.filter_by(student_id=student_id).all()
-    
-    grades_data = []
-    for enrollment in enrollments:
-        grade = Grade.query.filter_by(enrollment_id=enrollment.id).first()
-        grades_data.append({
-            'enrollment': enrollment,
-            'grade': grade,
-            'course': enrollment.section.course,
-            'section': enrollment.section,
-            'semester': enrollment.section.semester
-        })
-    
-    return render_template('student/grades.html', grades_data=grades_data)
+    # Bảng điểm dựng sẵn, chỉ dựng lại khi điểm / đăng ký thay đổi (xem transcripts.py)
+    transcript = get_transcript(student_id)
+    return render_template('student/grades.html', transcript=transcript)
 
 @student_bp.route('/profile')
 @student_required
@@ -91,7 +103,7 @@ def profile():
     if not student_id:
         return redirect(url_for('auth.login'))
     
-    student = Student.query.get_or_404(student_id)
+    student = current_profile()
     return render_template('student/profile.html', student=student)
 
 @student_bp.route('/enroll')
@@ -134,13 +146,16 @@ def enroll():
         status='active'
     ).all()]
     
+    # Các ô thời gian đã bận trong học kỳ, tính từ chính các lớp vừa lấy
+    occupied = 0
+    for section in sections:
+        if section.id in enrolled_section_ids:
+            occupied |= section_mask(section)
+    
     # Thêm thông tin số lượng đã đăng ký và còn trống
     sections_data = []
     for section in sections:
-        enrolled_count = Enrollment.query.filter_by(
-            section_id=section.id,
-            status='active'
-        ).count()
+        enrolled_count = section.enrolled_count
         is_enrolled = section.id in enrolled_section_ids
         available = section.max_capacity - enrolled_count
         
@@ -149,7 +164,8 @@ def enroll():
             'enrolled_count': enrolled_count,
             'available': available,
             'is_enrolled': is_enrolled,
-            'is_full': available <= 0
+            'is_full': available <= 0,
+            'is_conflict': not is_enrolled and bool(occupied & section_mask(section))
         })
     
     return render_template('student/enroll.html',
@@ -163,8 +179,12 @@ def enroll_section(section_id):
     if not student_id:
         return redirect(url_for('auth.login'))
     
+    # Chế độ cao điểm: đưa yêu cầu vào hàng đợi và trả về mã theo dõi ngay
+    registration_queue = current_app.extensions.get('registration_queue')
+    if registration_queue:
+        return _enqueue_enrollment(registration_queue, student_id, section_id)
+    
     section = Section.query.get_or_404(section_id)
-    student = Student.query.get_or_404(student_id)
     
     # Kiểm tra đã đăng ký chưa
     existing = Enrollment.query.filter_by(
@@ -172,39 +192,109 @@ def enroll_section(section_id):
         section_id=section_id
     ).first()
     
-    if existing:
-        if existing.status == 'active':
-            flash('Bạn đã đăng ký lớp này rồi', 'warning')
-        else:
-            existing.status = 'active'
-            existing.enroll_date = datetime.utcnow().date()
-            db.session.commit()
-            flash('Đăng ký lại thành công', 'success')
+    if existing and existing.status == 'active':
+        flash('Bạn đã đăng ký lớp này rồi', 'warning')
         return redirect(url_for('student.enroll'))
     
-    # Kiểm tra lớp còn chỗ không
-    enrolled_count = Enrollment.query.filter_by(
-        section_id=section_id,
-        status='active'
-    ).count()
-    
-    if enrolled_count >= section.max_capacity:
+    # Giữ chỗ: kiểm tra sức chứa và tăng sĩ số trong một câu UPDATE có điều kiện
+    if not reserve_seat(section_id):
+        db.session.rollback()
         flash('Lớp học đã đầy, không thể đăng ký', 'danger')
         return redirect(url_for('student.enroll'))
     
+    # Trùng lịch: một phép AND với các ô đã bận của sinh viên trong học kỳ
+    if not claim_timeslots(student_id, section):
+        db.session.rollback()
+        flash('Lớp học bị trùng lịch với lớp bạn đã đăng ký', 'danger')
+        return redirect(url_for('student.enroll'))
+    
+    today = datetime.utcnow().date()
+    if existing:
+        if not activate_enrollment(existing.id, today):
+            db.session.rollback()
+            flash('Bạn đã đăng ký lớp này rồi', 'warning')
+            return redirect(url_for('student.enroll'))
+        bump_versions(STUDENT, [student_id])
+        bump_versions(SECTION, [section_id])
+        db.session.commit()
+        flash('Đăng ký lại thành công', 'success')
+        return redirect(url_for('student.enroll'))
+    
     # Tạo enrollment mới
     enrollment = Enrollment(
         student_id=student_id,
         section_id=section_id,
         status='active',
-        enroll_date=datetime.utcnow().date()
+        enroll_date=today
     )
     db.session.add(enrollment)
-    db.session.commit()
+    bump_versions(STUDENT, [student_id])
+    bump_versions(SECTION, [section_id])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Request khác của cùng sinh viên vừa đăng ký lớp này (unique_enrollment),
+        # rollback trả lại chỗ vừa giữ
+        db.session.rollback()
+        flash('Bạn đã đăng ký lớp này rồi', 'warning')
+        return redirect(url_for('student.enroll'))
     
     flash(f'Đăng ký lớp {section.section_code} thành công!', 'success')
     return redirect(url_for('student.enroll'))
 
+ENROLL_RESULT_MESSAGES = {
+    'enrolled': ('Đăng ký lớp học phần thành công!', 'success'),
+    'already': ('Bạn đã đăng ký lớp này rồi', 'warning'),
+    'conflict': ('Lớp học bị trùng lịch với lớp bạn đã đăng ký', 'danger'),
+    'full': ('Lớp học đã đầy, không thể đăng ký', 'danger'),
+    'not_found': ('Không tìm thấy lớp học phần', 'danger'),
+    'error': ('Có lỗi khi xử lý đăng ký, vui lòng thử lại', 'danger')
+}
+
+def _wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def _enqueue_enrollment(registration_queue, student_id, section_id):
+    token = registration_queue.submit(student_id, section_id)
+    if token is None:
+        # Hàng đợi đầy: từ chối ngay thay vì để request chờ đến timeout
+        if _wants_json():
+            response = jsonify(status='busy')
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        flash('Hệ thống đăng ký đang quá tải, vui lòng thử lại sau ít phút', 'warning')
+        return redirect(url_for('student.enroll'))
+    
+    status_url = url_for('student.enroll_status', token=token)
+    if _wants_json():
+        return jsonify(token=token, status='pending', status_url=status_url), 202
+    return redirect(status_url)
+
+@student_bp.route('/enroll/status/<token>')
+@student_required
+def enroll_status(token):
+    student_id = session.get('student_id')
+    registration_queue = current_app.extensions.get('registration_queue')
+    result = registration_queue.result(token, student_id) if registration_queue else None
+    
+    if _wants_json():
+        if not result:
+            return jsonify(status='unknown'), 404
+        return jsonify(token=token, **result)
+    
+    if not result:
+        flash('Yêu cầu đăng ký không tồn tại hoặc đã hết hạn', 'warning')
+        return redirect(url_for('student.enroll'))
+    
+    if result['status'] == 'pending':
+        return render_template('student/enroll_status.html',
+                             queue_size=registration_queue.qsize())
+    
+    message, category = ENROLL_RESULT_MESSAGES.get(result['status'], ENROLL_RESULT_MESSAGES['error'])
+    flash(message, category)
+    return redirect(url_for('student.enroll'))
+
 @student_bp.route('/enroll/<int:section_id>/drop', methods=['POST'])
 @student_required
 def drop_section(section_id):
@@ -218,13 +308,12 @@ def drop_section(section_id):
         status='active'
     ).first()
     
-    if not enrollment:
+    if not enrollment or not drop_enrollment(enrollment):
+        db.session.rollback()
         flash('Không tìm thấy đăng ký này', 'danger')
         return redirect(url_for('student.enroll'))
     
-    enrollment.status = 'dropped'
     db.session.commit()
     
     flash('Hủy đăng ký thành công', 'success')
     return redirect(url_for('student.enroll'))
-
@@ -0,0 +1,260 @@
+import json
+from datetime import datetime
+from collections import defaultdict
+from sqlalchemy import func, distinct, select, update, insert, delete, case, or_, and_
+from academic_system.versions import GRADES, bump_catalog, bump_versions, version_of
+from academic_system.dialects import upsert, upsert_increment
+from academic_system.db_routing import use_primary, derived_write
+from academic_system.models import (db, Section, Course, Enrollment, Attendance, Grade, SectionAttendanceSummary,
+                                    ReportSnapshot, StudentGradeSummary, StudentSemesterGradeSummary)
+
+GRADE_LETTERS = ['A', 'B+', 'B', 'C+', 'C', 'D', 'F']
+GRADE_REPORT = 'school_grades'
+PASSING_SCORE = 4.0  # Điểm tối thiểu để đạt khi chưa có điểm chữ (dưới mức này là F)
+
+# ========== TỔNG HỢP ĐIỂM DANH THEO LỚP ==========
+def _compute_attendance_summary(section_id):
+    # Tính lại số liệu của một lớp từ bảng gốc attendance
+    sessions_marked, total_marked = db.session.query(
+        func.count(distinct(Attendance.session_number)),
+        func.count(Attendance.id)
+    ).filter(Attendance.section_id == section_id).one()
+
+    return {
+        'sessions_marked': sessions_marked or 0,
+        'total_marked': total_marked or 0
+    }
+
+def _adjust_attendance_summary(section_id, **deltas):
+    values = {
+        column: getattr(SectionAttendanceSummary, column) + delta
+        for column, delta in deltas.items() if delta
+    }
+    if not values:
+        return
+
+    # Đảm bảo các thay đổi trong phiên đã được ghi xuống trước khi cập nhật
+    db.session.flush()
+    result = db.session.execute(
+        update(SectionAttendanceSummary)
+        .where(SectionAttendanceSummary.section_id == section_id)
+        .values(**values)
+    )
+
+    if result.rowcount == 0:
+        # Lớp chưa có dòng tổng hợp (dữ liệu cũ): tính lại từ bảng gốc,
+        # số liệu này đã bao gồm thay đổi vừa flush nên không cộng delta nữa
+        db.session.add(SectionAttendanceSummary(
+            section_id=section_id,
+            **_compute_attendance_summary(section_id)
+        ))
+
+def record_attendance_marks(section_id, inserted_count, new_session):
+    # Gọi sau khi lưu điểm danh một buổi: inserted_count là số bản ghi mới,
+    # new_session = True nếu đây là lần đầu buổi học này được điểm danh
+    _adjust_attendance_summary(
+        section_id,
+        total_marked=inserted_count,
+        sessions_marked=1 if new_session else 0
+    )
+
+def rebuild_attendance_summaries():
+    # Đối soát toàn bộ bảng tổng hợp từ bảng gốc, trả về số lớp đã tính lại
+    marked = select(
+        Attendance.section_id.label('section_id'),
+        func.count(distinct(Attendance.session_number)).label('sessions_marked'),
+        func.count(Attendance.id).label('total_marked')
+    ).group_by(Attendance.section_id).subquery()
+
+    source = select(
+        Section.id,
+        func.coalesce(marked.c.sessions_marked, 0),
+        func.coalesce(marked.c.total_marked, 0),
+        func.now()
+    ).select_from(Section)\
+        .outerjoin(marked, marked.c.section_id == Section.id)
+
+    db.session.execute(delete(SectionAttendanceSummary))
+    result = db.session.execute(
+        insert(SectionAttendanceSummary).from_select(
+            ['section_id', 'sessions_marked', 'total_marked', 'updated_at'],
+            source
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+# ========== BÁO CÁO ĐIỂM TOÀN TRƯỜNG ==========
+def _compute_grade_report():
+    # AVG/COUNT bỏ qua các điểm NULL (chưa nhập điểm)
+    avg_score, graded_count = db.session.query(
+        func.avg(Grade.score),
+        func.count(Grade.score)
+    ).one()
+
+    grade_distribution = dict.fromkeys(GRADE_LETTERS, 0)
+    letter_counts = db.session.query(Grade.grade_letter, func.count(Grade.id))\
+        .filter(Grade.grade_letter.isnot(None))\
+        .group_by(Grade.grade_letter)
+    for letter, count in letter_counts:
+        grade_distribution[letter] = count
+
+    return {
+        'avg_score': round(float(avg_score), 2) if avg_score is not None else 0,
+        'graded_count': graded_count,
+        'grade_distribution': grade_distribution
+    }
+
+def _stored_grade_report():
+    def stored(column):
+        return select(column).where(ReportSnapshot.name == GRADE_REPORT).scalar_subquery()
+
+    return db.session.execute(select(
+        version_of(GRADES, 0),
+        stored(ReportSnapshot.data_version),
+        stored(ReportSnapshot.payload),
+        stored(ReportSnapshot.generated_at)
+    )).one()
+
+def get_grade_report():
+    # Trả về (số liệu, thời điểm tính); chỉ tính lại khi phiên bản điểm đã đổi từ lúc chụp
+    current, stored_version, payload, generated_at = _stored_grade_report()
+    if payload is not None and stored_version == current:
+        return json.loads(payload), generated_at
+
+    # Ảnh chụp được giữ đến lần nhập điểm sau: phải tính từ primary, không từ replica còn trễ.
+    # Phiên bản được đọc trước khi tính: điểm ghi xen vào làm ảnh chụp mang phiên bản cũ
+    # và được tính lại ở lần xem sau, thay vì giữ số liệu cũ đến lần nhập điểm kế tiếp
+    use_primary()
+    current = _stored_grade_report()[0]
+    report = _compute_grade_report()
+    generated_at = datetime.utcnow()
+    with derived_write():
+        upsert(ReportSnapshot, [{
+            'name': GRADE_REPORT,
+            'data_version': current,
+            'payload': json.dumps(report),
+            'generated_at': generated_at
+        }], conflict_columns=['name'], update_columns=['data_version', 'payload', 'generated_at'])
+        db.session.commit()
+    return report, generated_at
+
+def invalidate_grade_report():
+    # Gọi trong cùng transaction với thao tác ghi / xóa điểm: ảnh chụp hiện có trở thành cũ
+    bump_versions(GRADES, [0])
+
+# ========== TỔNG HỢP ĐIỂM THEO SINH VIÊN ==========
+# Mỗi điểm có số (score) đóng góp: tín chỉ đã học = số tín chỉ môn, tín chỉ đạt = số tín chỉ
+# nếu điểm chữ khác F, tổng có trọng số = tín chỉ × điểm. Khi nhập điểm, chênh lệch giữa
+# đóng góp cũ và mới được cộng vào dòng tổng hợp của sinh viên và của học kỳ tương ứng.
+def _earned_credits(credits, score, grade_letter):
+    if grade_letter:
+        return 0 if grade_letter == 'F' else credits
+    return credits if float(score) >= PASSING_SCORE else 0
+
+def _grade_contribution(credits, score, grade_letter):
+    if score is None:
+        return 0, 0, 0
+    return credits, _earned_credits(credits, score, grade_letter), credits * float(score)
+
+def _graded_rows(enrollment_ids):
+    return db.session.query(
+        Enrollment.id, Enrollment.student_id, Section.semester_id,
+        Course.credits, Grade.score, Grade.grade_letter
+    ).join(Section, Enrollment.section_id == Section.id)\
+        .join(Course, Section.course_id == Course.id)\
+        .outerjoin(Grade, Grade.enrollment_id == Enrollment.id)\
+        .filter(Enrollment.id.in_(enrollment_ids))
+
+def snapshot_grades(enrollment_ids):
+    # Gọi trước khi ghi điểm: lưu lại đóng góp hiện tại của các đăng ký sắp được nhập điểm
+    return {
+        enrollment_id: (student_id, semester_id, _grade_contribution(credits, score, grade_letter))
+        for enrollment_id, student_id, semester_id, credits, score, grade_letter in _graded_rows(list(enrollment_ids))
+    }
+
+def record_grade_changes(snapshot):
+    # Gọi sau khi ghi điểm, trong cùng transaction: cộng chênh lệch vào bảng tổng hợp bằng một
+    # câu upsert cho mỗi bảng (mỗi lô), kể cả khi sinh viên chưa có dòng tổng hợp nào.
+    # Dòng còn thiếu được tạo từ chính chênh lệch, nên dữ liệu điểm nhập thẳng bằng SQL
+    # cần chạy "flask rebuild-grade-summary" trước (xem README)
+    if not snapshot:
+        return
+    db.session.flush()
+    overall = defaultdict(lambda: [0, 0, 0])
+    by_semester = defaultdict(lambda: [0, 0, 0])
+    for enrollment_id, student_id, semester_id, credits, score, grade_letter in _graded_rows(list(snapshot)):
+        old = snapshot[enrollment_id][2]
+        new = _grade_contribution(credits, score, grade_letter)
+        for totals in (overall[(student_id,)], by_semester[(student_id, semester_id)]):
+            for index in range(3):
+                totals[index] += new[index] - old[index]
+
+    now = datetime.utcnow()
+    for model, deltas, keys in ((StudentGradeSummary, overall, ['student_id']),
+                                (StudentSemesterGradeSummary, by_semester, ['student_id', 'semester_id'])):
+        # Sắp xếp để các transaction đồng thời khóa các dòng theo cùng thứ tự
+        rows = [
+            dict(zip(keys, key), credits_attempted=attempted, credits_earned=earned,
+                 weighted_score_sum=round(weighted, 2), updated_at=now)
+            for key, (attempted, earned, weighted) in sorted(deltas.items())
+            if attempted or earned or weighted
+        ]
+        upsert_increment(model, rows, conflict_columns=keys,
+                         columns=['credits_attempted', 'credits_earned', 'weighted_score_sum'],
+                         update_columns=['updated_at'])
+
+def _grade_summary_columns():
+    earned = case(
+        (or_(Grade.grade_letter == 'F', and_(Grade.grade_letter.is_(None), Grade.score < PASSING_SCORE)), 0),
+        else_=Course.credits
+    )
+    return (
+        func.coalesce(func.sum(Course.credits), 0),
+        func.coalesce(func.sum(earned), 0),
+        func.coalesce(func.sum(Course.credits * Grade.score), 0)
+    )
+
+def _graded_enrollments(query):
+    return query.select_from(Grade)\
+        .join(Enrollment, Grade.enrollment_id == Enrollment.id)\
+        .join(Section, Enrollment.section_id == Section.id)\
+        .join(Course, Section.course_id == Course.id)\
+        .where(Grade.score.isnot(None))
+
+def _insert_grade_summaries(student_ids=None):
+    columns = ['credits_attempted', 'credits_earned', 'weighted_score_sum', 'updated_at']
+    by_semester = _graded_enrollments(
+        select(Enrollment.student_id, Section.semester_id, *_grade_summary_columns(), func.now())
+    ).group_by(Enrollment.student_id, Section.semester_id)
+    overall = _graded_enrollments(
+        select(Enrollment.student_id, *_grade_summary_columns(), func.now())
+    ).group_by(Enrollment.student_id)
+    removed = [delete(StudentSemesterGradeSummary), delete(StudentGradeSummary)]
+    if student_ids is not None:
+        by_semester = by_semester.where(Enrollment.student_id.in_(student_ids))
+        overall = overall.where(Enrollment.student_id.in_(student_ids))
+        removed = [
+            delete(StudentSemesterGradeSummary).where(StudentSemesterGradeSummary.student_id.in_(student_ids)),
+            delete(StudentGradeSummary).where(StudentGradeSummary.student_id.in_(student_ids))
+        ]
+
+    for statement in removed:
+        db.session.execute(statement)
+    db.session.execute(insert(StudentSemesterGradeSummary).from_select(['student_id', 'semester_id'] + columns, by_semester))
+    return db.session.execute(insert(StudentGradeSummary).from_select(['student_id'] + columns, overall)).rowcount
+
+def refresh_grade_summaries(student_ids):
+    # Tính lại tổng hợp của một số sinh viên khi thay đổi không đi qua nhập điểm
+    # (đổi số tín chỉ môn, chuyển lớp sang môn / học kỳ khác, xóa lớp); caller commit
+    student_ids = list(set(student_ids))
+    if student_ids:
+        db.session.flush()
+        _insert_grade_summaries(student_ids)
+
+def rebuild_grade_summaries():
+    # Tính lại toàn bộ bảng tổng hợp điểm từ bảng gốc, trả về số sinh viên có điểm
+    count = _insert_grade_summaries()
+    bump_catalog()  # Bảng điểm dựng sẵn chứa số liệu tổng hợp cũ
+    db.session.commit()
+    return count
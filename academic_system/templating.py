@@ -0,0 +1,36 @@
+import os
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+# ========== BỘ NHỚ ĐỆM BYTECODE CỦA TEMPLATE ==========
+# Jinja biên dịch mỗi template thành mã Python ở lần dùng đầu tiên của từng tiến trình,
+# nên mỗi worker vừa fork / khởi động lại đều chậm ở các request đầu. Bytecode đã biên dịch
+# được lưu trong TEMPLATE_CACHE_DIR (theo tên template và checksum nội dung, sửa template
+# thì tự biên dịch lại) để các worker sau chỉ cần nạp lại; "flask precompile-templates"
+# biên dịch sẵn toàn bộ lúc build / deploy. Jinja nạp bytecode bằng marshal, ai ghi được
+# vào thư mục này là chạy được mã trong worker, nên mặc định dùng thư mục instance/jinja_cache
+# (quyền 700) thay vì thư mục tạm dùng chung.
+
+def template_cache_dir(app):
+    # Thư mục bộ nhớ đệm, None nếu đã tắt
+    if not app.config['TEMPLATE_CACHE_ENABLED']:
+        return None
+    return app.config['TEMPLATE_CACHE_DIR'] or os.path.join(app.instance_path, 'jinja_cache')
+
+def init_template_cache(app):
+    # Gọi trước khi app.jinja_env được tạo (lần đầu truy cập), vì jinja_options chỉ đọc lúc đó
+    cache_dir = template_cache_dir(app)
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(cache_dir))
+
+def precompile_templates(app):
+    # Biên dịch mọi template của ứng dụng vào bộ nhớ đệm; trả về (số template, danh sách (tên, lỗi))
+    errors = []
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateError as e:
+            errors.append((name, str(e)))
+    return len(names), errors
@@ -0,0 +1,247 @@
+import re
+from collections import namedtuple
+from datetime import time
+from sqlalchemy import delete, select, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from academic_system.models import db, Section, SectionMeeting, Enrollment, StudentTimetable
+
+# ========== THỜI KHÓA BIỂU ==========
+# schedule_info của lớp ("Thứ 2,4 - 7h-9h - Phòng A101", nhiều nhóm cách nhau bằng ";")
+# được phân tích thành các buổi học (section_meetings) và một mặt nạ bit: mỗi ngày từ Thứ 2
+# đến Chủ nhật có SLOTS_PER_DAY ô SLOT_MINUTES phút tính từ FIRST_HOUR giờ. Các ô sinh viên
+# đã bận trong học kỳ được lưu trong student_timetables, nên kiểm tra trùng lịch khi đăng ký
+# chỉ là một phép AND giữa hai số nguyên thay vì so từng cặp lớp.
+
+FIRST_HOUR = 6
+LAST_HOUR = 22
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = (LAST_HOUR - FIRST_HOUR) * 60 // SLOT_MINUTES
+WEEKDAYS = range(2, 9)  # 2..7 = Thứ 2..Thứ 7, 8 = Chủ nhật
+SUNDAY = 8
+SCHEDULE_EXAMPLE = 'Thứ 2,4 - 7h-9h - Phòng A101'
+
+Meeting = namedtuple('Meeting', 'weekday start_time end_time room')
+
+_DAY = r'(?:[2-7]|cn|chủ nhật)'
+_GROUP = re.compile(
+    rf'^(?:thứ\s*)?(?P<days>{_DAY}(?:\s*,\s*{_DAY})*)'
+    r'\s*-\s*(?P<start_hour>\d{1,2})\s*[h:]\s*(?P<start_minute>\d{2})?'
+    r'\s*-\s*(?P<end_hour>\d{1,2})\s*[h:]\s*(?P<end_minute>\d{2})?'
+    r'(?:\s*-\s*(?:phòng\s*)?(?P<room>\S.*?))?\s*$',
+    re.IGNORECASE
+)
+
+def weekday_label(weekday):
+    return 'Chủ nhật' if weekday == SUNDAY else f'Thứ {weekday}'
+
+def _time(hour, minute):
+    hour, minute = int(hour), int(minute or 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f'Giờ {hour}h{minute:02d} không hợp lệ')
+    return time(hour, minute)
+
+def parse_schedule(text):
+    # Trả về danh sách Meeting (rỗng nếu không có lịch); ValueError nếu sai định dạng
+    meetings = []
+    for group in filter(None, (part.strip() for part in (text or '').split(';'))):
+        match = _GROUP.match(group)
+        if not match:
+            raise ValueError(f'Lịch học "{group}" không đúng định dạng (VD: {SCHEDULE_EXAMPLE})')
+
+        start = _time(match.group('start_hour'), match.group('start_minute'))
+        end = _time(match.group('end_hour'), match.group('end_minute'))
+        if start >= end:
+            raise ValueError(f'Lịch học "{group}": giờ kết thúc phải sau giờ bắt đầu')
+        if start < time(FIRST_HOUR) or end > time(LAST_HOUR):
+            raise ValueError(f'Lịch học "{group}": chỉ xếp lịch từ {FIRST_HOUR}h đến {LAST_HOUR}h')
+        room = (match.group('room') or '').upper() or None  # So trùng phòng không phân biệt hoa / thường
+        if room and len(room) > 20:
+            raise ValueError(f'Lịch học "{group}": tên phòng quá dài')
+
+        for day in re.split(r'\s*,\s*', match.group('days')):
+            weekday = SUNDAY if not day.isdigit() else int(day)
+            meetings.append(Meeting(weekday, start, end, room))
+    return meetings
+
+def _minutes(value):
+    return (value.hour - FIRST_HOUR) * 60 + value.minute
+
+def meetings_mask(meetings):
+    mask = 0
+    for meeting in meetings:
+        first = _minutes(meeting.start_time) // SLOT_MINUTES
+        last = -(-_minutes(meeting.end_time) // SLOT_MINUTES)  # làm tròn lên: 7h45 chiếm cả ô 7h30-8h
+        offset = (meeting.weekday - WEEKDAYS[0]) * SLOTS_PER_DAY
+        mask |= ((1 << (last - first)) - 1) << (offset + first)
+    return mask
+
+def apply_schedule(section, schedule_info):
+    # Gán lịch học khi thêm / sửa lớp: lưu các buổi học và mặt nạ; ValueError nếu sai định dạng
+    meetings = parse_schedule(schedule_info)
+    section.schedule_info = schedule_info or None
+    section.meetings = [SectionMeeting(**meeting._asdict()) for meeting in meetings]
+    section.schedule_mask = meetings_mask(meetings)
+
+def _mask_of(schedule_mask, schedule_info):
+    # Lớp chưa phân tích lịch (schedule_mask NULL, vd dữ liệu từ data.sql) được phân tích tại chỗ;
+    # lịch sai định dạng coi như không có giờ học cố định
+    if schedule_mask is not None:
+        return schedule_mask
+    try:
+        return meetings_mask(parse_schedule(schedule_info))
+    except ValueError:
+        return 0
+
+def section_mask(section):
+    return _mask_of(section.schedule_mask, section.schedule_info)
+
+def section_meetings(section):
+    if section.schedule_mask is not None:
+        return [Meeting(m.weekday, m.start_time, m.end_time, m.room) for m in section.meetings]
+    try:
+        return parse_schedule(section.schedule_info)
+    except ValueError:
+        return []
+
+# ========== CÁC Ô ĐÃ BẬN CỦA SINH VIÊN ==========
+def occupied_masks(student_ids, semester_id):
+    # Tính từ các lớp đang học trong học kỳ: {student_id: mặt nạ}
+    masks = dict.fromkeys(student_ids, 0)
+    rows = db.session.query(Enrollment.student_id, Section.schedule_mask, Section.schedule_info)\
+        .join(Section, Enrollment.section_id == Section.id)\
+        .filter(Enrollment.student_id.in_(list(masks)),
+                Enrollment.status == 'active',
+                Section.semester_id == semester_id)
+    for student_id, schedule_mask, schedule_info in rows:
+        masks[student_id] |= _mask_of(schedule_mask, schedule_info)
+    return masks
+
+def lock_timetables(student_ids, semester_id):
+    # Khóa (SELECT ... FOR UPDATE) và trả về {student_id: StudentTimetable} trong transaction đăng ký;
+    # dòng còn thiếu được tính từ các lớp đang học. Gọi trước khi tạo / kích hoạt đăng ký mới
+    student_ids = sorted(set(student_ids))
+    timetables = {
+        timetable.student_id: timetable for timetable in StudentTimetable.query.filter(
+            StudentTimetable.semester_id == semester_id,
+            StudentTimetable.student_id.in_(student_ids)
+        ).populate_existing().with_for_update()
+    }
+    missing = [student_id for student_id in student_ids if student_id not in timetables]
+    if missing:
+        created = [
+            StudentTimetable(student_id=student_id, semester_id=semester_id, occupied_mask=mask)
+            for student_id, mask in occupied_masks(missing, semester_id).items()
+        ]
+        try:
+            with db.session.begin_nested():
+                db.session.add_all(created)
+        except IntegrityError:
+            # Request khác vừa tạo dòng cho cùng sinh viên: đọc lại (có khóa)
+            return lock_timetables(student_ids, semester_id)
+        timetables.update((timetable.student_id, timetable) for timetable in created)
+    return timetables
+
+def invalidate_timetables(student_ids):
+    # Xóa các dòng đã bận (tự tính lại ở lần đăng ký sau) khi lớp đang học bị hủy / đổi lịch
+    student_ids = list(set(student_ids))
+    if student_ids:
+        db.session.execute(delete(StudentTimetable).where(StudentTimetable.student_id.in_(student_ids)))
+
+def release_timetable(student_id, section_id):
+    # Hủy đăng ký: xóa dòng đã bận của học kỳ chứa lớp này
+    semester_id = select(Section.semester_id).where(Section.id == section_id).scalar_subquery()
+    db.session.execute(delete(StudentTimetable).where(
+        StudentTimetable.student_id == student_id,
+        StudentTimetable.semester_id == semester_id
+    ))
+
+def rebuild_timetables():
+    # Phân tích lại lịch của mọi lớp và xóa các dòng đã bận (tự tính lại khi cần).
+    # Trả về (số lớp, danh sách (lớp, lỗi) của lịch sai định dạng)
+    errors = []
+    sections = Section.query.options(selectinload(Section.meetings)).all()
+    for section in sections:
+        try:
+            apply_schedule(section, section.schedule_info)
+        except ValueError as e:
+            errors.append((section, str(e)))
+            section.meetings = []
+            section.schedule_mask = 0
+    db.session.execute(delete(StudentTimetable))
+    db.session.commit()
+    return len(sections), errors
+
+def weekly_grid(sections):
+    # {weekday: [(Meeting, section), ...]} sắp theo giờ bắt đầu, cho trang thời khóa biểu
+    grid = {weekday: [] for weekday in WEEKDAYS}
+    for section in sections:
+        for meeting in section_meetings(section):
+            grid[meeting.weekday].append((meeting, section))
+    for items in grid.values():
+        items.sort(key=lambda item: item[0].start_time)
+    return grid
+
+# ========== TRÙNG LỊCH GIẢNG VIÊN / PHÒNG HỌC ==========
+# Các buổi học được sắp theo (thứ, giờ bắt đầu) rồi quét một lượt: mỗi giảng viên / phòng
+# giữ danh sách buổi đang diễn ra, buổi mới trùng với mọi buổi trong danh sách chưa kết thúc.
+Clash = namedtuple('Clash', 'kind resource weekday start_time end_time first second')  # first / second: (Meeting, lớp)
+
+def _resources(meeting, section):
+    yield 'instructor', section.instructor_id
+    if meeting.room:
+        yield 'room', meeting.room
+
+def find_clashes(items):
+    # items: các cặp (Meeting, lớp); trả về danh sách Clash theo thứ tự thời gian
+    clashes = []
+    running = {}
+    weekday = None
+    for meeting, section in sorted(items, key=lambda item: (item[0].weekday, item[0].start_time)):
+        if meeting.weekday != weekday:
+            weekday, running = meeting.weekday, {}
+        for kind, resource in _resources(meeting, section):
+            active = [item for item in running.get((kind, resource), []) if item[0].end_time > meeting.start_time]
+            for other_meeting, other in active:
+                if other is not section:
+                    clashes.append(Clash(kind, resource, weekday, meeting.start_time,
+                                         min(meeting.end_time, other_meeting.end_time),
+                                         (other_meeting, other), (meeting, section)))
+            active.append((meeting, section))
+            running[(kind, resource)] = active
+    return clashes
+
+def semester_clashes(semester_id):
+    # Báo cáo trùng lịch giảng viên / phòng học của cả học kỳ
+    sections = Section.query.filter(Section.semester_id == semester_id)\
+        .options(selectinload(Section.meetings), joinedload(Section.instructor)).all()
+    return find_clashes([(meeting, section) for section in sections for meeting in section_meetings(section)])
+
+def assignment_clashes(section):
+    # Gọi khi thêm / sửa lớp (sau apply_schedule): trùng giờ với lớp khác cùng học kỳ
+    # có cùng giảng viên hoặc cùng phòng. Chỉ nạp các lớp có thể trùng (cùng giảng viên,
+    # có buổi ở cùng phòng + thứ, hoặc chưa phân tích lịch)
+    meetings = section_meetings(section)
+    if not meetings:
+        return []
+    rooms = {meeting.room for meeting in meetings if meeting.room}
+    candidates = Section.query.filter(
+        Section.semester_id == section.semester_id,
+        or_(Section.instructor_id == section.instructor_id,
+            Section.schedule_mask.is_(None),
+            Section.meetings.any(and_(SectionMeeting.room.in_(list(rooms)),
+                                      SectionMeeting.weekday.in_(list({meeting.weekday for meeting in meetings})))))
+    ).options(selectinload(Section.meetings))
+    if section.id is not None:
+        candidates = candidates.filter(Section.id != section.id)
+
+    items = [(meeting, section) for meeting in meetings]
+    items += [(meeting, other) for other in candidates for meeting in section_meetings(other)]
+    return [clash for clash in find_clashes(items) if section in (clash.first[1], clash.second[1])]
+
+def clash_message(clash, section):
+    # Thông báo cho lớp đang thêm / sửa (section) về lớp bị trùng
+    other = clash.first[1] if clash.second[1] is section else clash.second[1]
+    who = 'Giảng viên' if clash.kind == 'instructor' else f'Phòng {clash.resource}'
+    return (f'{who} đã có lớp {other.section_code} ({other.course.name}) vào {weekday_label(clash.weekday)} '
+            f'{clash.start_time:%H:%M}-{clash.end_time:%H:%M}')
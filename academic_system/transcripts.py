@@ -0,0 +1,98 @@
+import json
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import select
+from academic_system.models import (db, Enrollment, Section, Course, Semester, Grade, StudentTranscript,
+                                    StudentGradeSummary, StudentSemesterGradeSummary)
+from academic_system.dialects import upsert
+from academic_system.db_routing import derived_write
+from academic_system.versions import STUDENT, CATALOG, version_of
+
+# ========== BẢNG ĐIỂM DỰNG SẴN ==========
+# Bảng điểm của sinh viên được lưu thành một tài liệu JSON gọn (mảng thay vì object) kèm
+# phiên bản dữ liệu lúc dựng. Mỗi lần xem chỉ cần một câu truy vấn lấy tài liệu và phiên
+# bản hiện tại; tài liệu chỉ được dựng lại khi điểm / đăng ký của sinh viên hoặc danh mục
+# môn học, lớp học phần đã thay đổi (xem versions.py).
+
+TRANSCRIPT_FORMAT = 1  # Tăng khi đổi cấu trúc tài liệu để các bản đã lưu tự dựng lại
+
+Transcript = namedtuple('Transcript', 'rows semesters total')
+TranscriptRow = namedtuple('TranscriptRow', 'semester_name course_code course_name credits section_code score grade_letter')
+SemesterTotal = namedtuple('SemesterTotal', 'semester_name credits_attempted credits_earned average')
+OverallTotal = namedtuple('OverallTotal', 'credits_attempted credits_earned average')
+
+def get_transcript(student_id):
+    current_student, current_catalog, stored_student, stored_catalog, payload = _stored(student_id)
+    if payload is not None and (stored_student, stored_catalog) == (current_student, current_catalog):
+        document = json.loads(payload)
+        if document.get('format') == TRANSCRIPT_FORMAT:
+            return _decode(document)
+
+    # Phiên bản được đọc trước khi dựng: nếu có thao tác ghi xen vào, tài liệu mang
+    # phiên bản cũ và sẽ được dựng lại ở lần xem sau
+    # (kể cả khi đọc từ replica còn trễ: phiên bản trên primary đã mới hơn)
+    document = _build(student_id)
+    with derived_write():
+        upsert(StudentTranscript, [{
+            'student_id': student_id,
+            'student_version': current_student,
+            'catalog_version': current_catalog,
+            'payload': json.dumps(document, ensure_ascii=False, separators=(',', ':')),
+            'generated_at': datetime.utcnow()
+        }], conflict_columns=['student_id'],
+           update_columns=['student_version', 'catalog_version', 'payload', 'generated_at'])
+        db.session.commit()
+    return _decode(document)
+
+def _stored(student_id):
+    def stored(column):
+        return select(column).where(StudentTranscript.student_id == student_id).scalar_subquery()
+
+    return db.session.execute(select(
+        version_of(STUDENT, student_id),
+        version_of(CATALOG, 0),
+        stored(StudentTranscript.student_version),
+        stored(StudentTranscript.catalog_version),
+        stored(StudentTranscript.payload)
+    )).one()
+
+def _score(value):
+    return round(float(value), 2) if value is not None else None
+
+def _build(student_id):
+    rows = db.session.query(
+        Semester.name, Course.course_code, Course.name, Course.credits,
+        Section.section_code, Grade.score, Grade.grade_letter
+    ).select_from(Enrollment)\
+        .join(Section, Enrollment.section_id == Section.id)\
+        .join(Course, Section.course_id == Course.id)\
+        .join(Semester, Section.semester_id == Semester.id)\
+        .outerjoin(Grade, Grade.enrollment_id == Enrollment.id)\
+        .filter(Enrollment.student_id == student_id)\
+        .order_by(Semester.start_date, Course.course_code, Section.section_code)
+
+    semesters = db.session.query(StudentSemesterGradeSummary, Semester.name)\
+        .join(Semester, StudentSemesterGradeSummary.semester_id == Semester.id)\
+        .filter(StudentSemesterGradeSummary.student_id == student_id)\
+        .order_by(Semester.start_date)
+    total = db.session.get(StudentGradeSummary, student_id)
+
+    return {
+        'format': TRANSCRIPT_FORMAT,
+        'rows': [
+            [semester, code, name, credits, section_code, _score(score), letter]
+            for semester, code, name, credits, section_code, score, letter in rows
+        ],
+        'semesters': [
+            [name, summary.credits_attempted, summary.credits_earned, summary.average]
+            for summary, name in semesters
+        ],
+        'total': [total.credits_attempted, total.credits_earned, total.average] if total else None
+    }
+
+def _decode(document):
+    return Transcript(
+        rows=[TranscriptRow(*row) for row in document['rows']],
+        semesters=[SemesterTotal(*row) for row in document['semesters']],
+        total=OverallTotal(*document['total']) if document['total'] else None
+    )
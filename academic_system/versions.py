@@ -0,0 +1,37 @@
+from sqlalchemy import func, select
+from academic_system.models import DataVersion
+from academic_system.dialects import upsert_increment
+
+# ========== PHIÊN BẢN DỮ LIỆU ==========
+# Mỗi thao tác ghi tăng phiên bản của phạm vi bị ảnh hưởng, trong cùng transaction:
+#   STUDENT (scope_id = student_id): điểm hoặc đăng ký của sinh viên thay đổi
+#   SECTION (scope_id = section_id): đăng ký, điểm hoặc điểm danh của lớp thay đổi
+#   CATALOG (scope_id = 0): môn học / lớp học phần / giảng viên thay đổi (tên, tín chỉ, học kỳ...)
+#   GRADES (scope_id = 0): điểm bất kỳ được ghi hoặc bị xóa (báo cáo điểm toàn trường)
+# Dữ liệu dựng sẵn (vd bảng điểm) lưu phiên bản lúc dựng và chỉ dựng lại khi số này đổi;
+# ETag của các trang xem cũng được tính từ các phiên bản này (xem conditional.py).
+# Phạm vi chưa có dòng nào có phiên bản 0.
+
+STUDENT = 'student'
+SECTION = 'section'
+CATALOG = 'catalog'
+GRADES = 'grades'
+
+def bump_versions(scope, scope_ids):
+    # Sắp xếp để các transaction đồng thời khóa các dòng theo cùng thứ tự
+    scope_ids = sorted(set(scope_ids))
+    upsert_increment(DataVersion, [
+        {'scope': scope, 'scope_id': scope_id, 'version': 1} for scope_id in scope_ids
+    ], conflict_columns=['scope', 'scope_id'], columns=['version'])
+
+def bump_catalog():
+    bump_versions(CATALOG, [0])
+
+def version_of(scope, scope_id):
+    # Biểu thức SQL (scalar subquery) cho phiên bản hiện tại, dùng ghép vào câu truy vấn khác
+    return func.coalesce(
+        select(DataVersion.version)
+        .where(DataVersion.scope == scope, DataVersion.scope_id == scope_id)
+        .scalar_subquery(),
+        0
+    )
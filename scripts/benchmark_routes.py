@@ -0,0 +1,255 @@
+"""Benchmark các trang chính theo từng vai trò.
+
+Tạo CSDL SQLite tạm (hoặc dùng --db-uri), sinh dữ liệu bằng seed-scale rồi gọi các
+trang GET của sinh viên, giảng viên và quản trị viên với phiên đăng nhập thật của
+từng vai trò. In ra throughput, độ trễ p50/p95/p99 và số câu SQL mỗi request (đọc từ
+header X-DB-Queries). Kết quả có thể lưu làm baseline JSON; khi so với baseline,
+script trả mã lỗi 1 nếu route nào chậm đi quá ngưỡng hoặc chạy nhiều câu SQL hơn.
+
+    python scripts/benchmark_routes.py --save-baseline benchmarks/baseline.json
+    python scripts/benchmark_routes.py --baseline benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from academic_system import create_app  # noqa: E402
+from academic_system.config import Config  # noqa: E402
+from academic_system.models import db, User, Student, Instructor, Section, Semester, Enrollment  # noqa: E402
+from academic_system.seeding import MAX_SECTIONS_PER_RESOURCE, SeedOptions, seed_scale  # noqa: E402
+
+# (vai trò, endpoint, hàm tạo URL từ dữ liệu mẫu của người dùng)
+SCENARIOS = [
+    ('student', 'student.dashboard', lambda user: '/student/dashboard'),
+    ('student', 'student.schedule', lambda user: '/student/schedule'),
+    ('student', 'student.grades', lambda user: '/student/grades'),
+    ('student', 'student.profile', lambda user: '/student/profile'),
+    ('student', 'student.enroll', lambda user: '/student/enroll'),
+    ('lecturer', 'lecturer.dashboard', lambda user: '/lecturer/dashboard'),
+    ('lecturer', 'lecturer.sections', lambda user: '/lecturer/sections'),
+    ('lecturer', 'lecturer.section_students', lambda user: f'/lecturer/section/{user["section_id"]}/students'),
+    ('lecturer', 'lecturer.section_report', lambda user: f'/lecturer/section/{user["section_id"]}/report'),
+    ('lecturer', 'lecturer.grade_section', lambda user: f'/lecturer/section/{user["section_id"]}/grades'),
+    ('lecturer', 'lecturer.section_attendance', lambda user: f'/lecturer/section/{user["section_id"]}/attendance'),
+    ('lecturer', 'lecturer.mark_attendance', lambda user: f'/lecturer/section/{user["section_id"]}/attendance/session/1'),
+    ('lecturer', 'lecturer.view_student_profile', lambda user: f'/lecturer/student/{user["student_id"]}/profile'),
+    ('admin', 'admin.dashboard', lambda user: '/admin/dashboard'),
+    ('admin', 'admin.students', lambda user: '/admin/students'),
+    ('admin', 'admin.instructors', lambda user: '/admin/instructors'),
+    ('admin', 'admin.courses', lambda user: '/admin/courses'),
+    ('admin', 'admin.sections', lambda user: f'/admin/sections?semester_id={user["semester_id"]}'),
+    ('admin', 'admin.reports', lambda user: '/admin/reports'),
+    ('admin', 'admin.attendance', lambda user: '/admin/attendance'),
+    ('admin', 'admin.section_attendance_detail', lambda user: f'/admin/attendance/section/{user["section_id"]}'),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-uri', help='CSDL đã có dữ liệu (mặc định: SQLite tạm và tự sinh dữ liệu)')
+    parser.add_argument('--students', type=int, default=2000, help='số sinh viên khi sinh dữ liệu')
+    parser.add_argument('--sections-per-semester', type=int, default=100, help='số lớp mỗi học kỳ khi sinh dữ liệu')
+    parser.add_argument('--requests', type=int, default=200, help='số request mỗi route')
+    parser.add_argument('--concurrency', type=int, default=4, help='số luồng gửi request đồng thời')
+    parser.add_argument('--warmup', type=int, default=5, help='số request khởi động mỗi route (không tính)')
+    parser.add_argument('--routes', help='chỉ chạy các endpoint chứa chuỗi này (vd: lecturer.)')
+    parser.add_argument('--seed', type=int, default=42, help='seed sinh dữ liệu và chọn người dùng')
+    parser.add_argument('--save-baseline', metavar='PATH', help='lưu kết quả làm baseline JSON')
+    parser.add_argument('--baseline', metavar='PATH', help='so sánh với baseline JSON')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='tỷ lệ chậm đi tối đa của p95 so với baseline (0.25 = 25%%)')
+    parser.add_argument('--min-slack-ms', type=float, default=2.0,
+                        help='bỏ qua chênh lệch p95 nhỏ hơn số ms này (tránh nhiễu ở route rất nhanh)')
+    return parser.parse_args()
+
+def make_config(db_uri):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = db_uri
+        TESTING = True
+        SQL_METRICS_ENABLED = True
+        SQL_N_PLUS_ONE_THRESHOLD = 10 ** 9  # không ghi cảnh báo trong lúc đo
+        REGISTRATION_QUEUE_ENABLED = False
+        SQLALCHEMY_REPLICA_URI = None
+    return BenchmarkConfig
+
+def sample_users(rng, count=20):
+    # Chọn ngẫu nhiên (tất định) các phiên đăng nhập mẫu cho từng vai trò
+    semester_id = db.session.query(Semester.id).order_by(Semester.start_date.desc()).limit(1).scalar()
+
+    students = db.session.query(Student.id, Student.user_id)\
+        .join(Enrollment, Enrollment.student_id == Student.id)\
+        .filter(Enrollment.status == 'active').distinct().order_by(Student.id).limit(count * 50).all()
+    sections = db.session.query(Section.id, Section.instructor_id)\
+        .filter(Section.semester_id == semester_id, Section.enrolled_count > 0)\
+        .order_by(Section.id).all()
+    instructors = dict(db.session.query(Instructor.id, Instructor.user_id))
+    admin = User.query.filter_by(role='admin').first()
+    if not admin:
+        admin = User(username='bench_admin', password='x', role='admin')
+        db.session.add(admin)
+        db.session.commit()
+    if not students or not sections:
+        raise SystemExit('CSDL chưa có đăng ký / lớp học phần để benchmark')
+
+    users = {'student': [], 'lecturer': [], 'admin': []}
+    for student_id, user_id in rng.sample(students, min(count, len(students))):
+        users['student'].append({'session': {'user_id': user_id, 'role': 'student', 'student_id': student_id}})
+    for section_id, instructor_id in rng.sample(sections, min(count, len(sections))):
+        student_id = db.session.query(Enrollment.student_id).filter_by(section_id=section_id, status='active')\
+            .order_by(Enrollment.id).limit(1).scalar()
+        users['lecturer'].append({
+            'session': {'user_id': instructors[instructor_id], 'role': 'lecturer', 'instructor_id': instructor_id},
+            'section_id': section_id, 'student_id': student_id
+        })
+        users['admin'].append({
+            'session': {'user_id': admin.id, 'role': 'admin'},
+            'section_id': section_id, 'semester_id': semester_id
+        })
+    return users
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def run_route(app, users, build_url, args, rng_seed):
+    samples = []
+    lock = threading.Lock()
+    per_thread = [args.requests // args.concurrency + (1 if i < args.requests % args.concurrency else 0)
+                  for i in range(args.concurrency)]
+
+    def worker(index, total):
+        rng = random.Random(rng_seed + index)
+        user = rng.choice(users)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(user['session'])
+        url = build_url(user)
+        for _ in range(args.warmup if index == 0 else 0):
+            client.get(url)
+        barrier.wait()
+        for _ in range(total):
+            started = time.perf_counter()
+            response = client.get(url)
+            finished = time.perf_counter()
+            with lock:
+                samples.append((started, finished, response.status_code,
+                                int(response.headers.get('X-DB-Queries', 0))))
+
+    barrier = threading.Barrier(args.concurrency)
+    threads = [threading.Thread(target=worker, args=(i, total)) for i, total in enumerate(per_thread)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = max(end for _, end, _, _ in samples) - min(start for start, _, _, _ in samples)
+    latencies = sorted(end - start for start, end, _, _ in samples)
+    queries = [count for _, _, _, count in samples]
+    errors = sum(1 for _, _, status, _ in samples if status >= 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries_avg': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries)
+    }
+
+def compare(results, baseline, args):
+    # Trả về danh sách mô tả các route bị chậm đi / tăng số câu SQL so với baseline
+    regressions = []
+    for endpoint, current in results.items():
+        previous = baseline.get('routes', {}).get(endpoint)
+        if not previous:
+            continue
+        if current['queries_max'] > previous['queries_max']:
+            regressions.append(f'{endpoint}: số câu SQL {previous["queries_max"]} -> {current["queries_max"]}')
+        limit = previous['p95_ms'] * (1 + args.threshold)
+        if current['p95_ms'] > limit and current['p95_ms'] - previous['p95_ms'] > args.min_slack_ms:
+            regressions.append(f'{endpoint}: p95 {previous["p95_ms"]}ms -> {current["p95_ms"]}ms '
+                               f'(ngưỡng {limit:.2f}ms)')
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f'{endpoint}: {current["errors"]} request lỗi')
+    return regressions
+
+def main():
+    args = parse_args()
+    db_uri = args.db_uri
+    if not db_uri:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='benchmark_routes_'), 'bench.db')
+        db_uri = f'sqlite:///{db_path}'
+    app = create_app(make_config(db_uri))
+
+    with app.app_context():
+        if not args.db_uri:
+            db.create_all()
+            started = time.perf_counter()
+            # Đủ giảng viên để xếp mọi lớp không trùng giờ
+            instructors = max(10, args.students // 50, -(-args.sections_per_semester // MAX_SECTIONS_PER_RESOURCE))
+            seed_scale(SeedOptions(students=args.students, instructors=instructors,
+                                   courses=max(20, args.sections_per_semester // 2),
+                                   sections_per_semester=args.sections_per_semester, seed=args.seed))
+            print(f'Đã sinh dữ liệu vào {db_uri} trong {time.perf_counter() - started:.1f}s')
+        users = sample_users(random.Random(args.seed))
+
+    results = {}
+    print(f'{"endpoint":<36} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL/req":>8} {"lỗi":>5}')
+    for offset, (role, endpoint, build_url) in enumerate(SCENARIOS):
+        if args.routes and args.routes not in endpoint:
+            continue
+        result = run_route(app, users[role], build_url, args, args.seed + offset * 1000)
+        results[endpoint] = result
+        print(f'{endpoint:<36} {result["throughput"]:>8} {result["p50_ms"]:>8} {result["p95_ms"]:>8} '
+              f'{result["p99_ms"]:>8} {result["queries_avg"]:>8} {result["errors"]:>5}')
+
+    covered = {endpoint for _, endpoint, _ in SCENARIOS}
+    skipped = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if 'GET' in rule.methods and rule.endpoint not in covered
+                     and rule.endpoint.split('.')[0] in ('student', 'lecturer', 'admin'))
+    if skipped and not args.routes:
+        print('Không đo (xuất file / trạng thái / form):', ', '.join(skipped))
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        changed = {key: value for key, value in baseline.get('settings', {}).items() if getattr(args, key, value) != value}
+        if changed:
+            print('Cảnh báo: baseline được đo với tham số khác:', changed)
+        regressions = compare(results, baseline, args)
+        for line in regressions:
+            print('CHẬM ĐI:', line)
+        if regressions:
+            print(f'THẤT BẠI: {len(regressions)} route kém hơn baseline')
+            exit_code = 1
+        else:
+            print('OK: không route nào kém hơn baseline')
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'machine': platform.node(),
+                'python': platform.python_version(),
+                'settings': {key: getattr(args, key) for key in
+                             ('students', 'sections_per_semester', 'requests', 'concurrency', 'seed')},
+                'routes': results
+            }, f, ensure_ascii=False, indent=2)
+        print(f'Đã lưu baseline: {args.save_baseline}')
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
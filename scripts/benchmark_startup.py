@@ -0,0 +1,159 @@
+"""Đo thời gian tới response đầu tiên của một worker vừa khởi động, theo từng blueprint.
+
+Tạo CSDL SQLite tạm và sinh dữ liệu bằng seed-scale. Với mỗi blueprint (auth, student,
+lecturer, admin), script chạy một tiến trình Python mới, giống một worker vừa fork hoặc
+vừa được recycle. Tiến trình đó tạo app rồi lần lượt gọi các trang GET của blueprint
+với phiên đăng nhập thật, hai lần mỗi trang. Lần đầu phải nạp / biên dịch template,
+lần hai dùng template đã có trong bộ nhớ.
+
+Mỗi blueprint được đo ở ba chế độ bộ nhớ đệm bytecode template (TEMPLATE_CACHE_ENABLED / _DIR):
+    none - tắt bộ nhớ đệm
+    cold - thư mục rỗng, như lần deploy đầu chưa chạy precompile-templates
+    warm - đã chạy precompile-templates
+
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 5 --modes none,warm
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from benchmark_routes import SCENARIOS, make_config, sample_users  # noqa: E402
+
+MODES = ('none', 'cold', 'warm')
+BLUEPRINTS = ('auth', 'student', 'lecturer', 'admin')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=300, help='số sinh viên khi sinh dữ liệu')
+    parser.add_argument('--runs', type=int, default=3, help='số lần đo mỗi blueprint / chế độ (lấy trung vị)')
+    parser.add_argument('--modes', default=','.join(MODES), help='các chế độ cần đo, cách nhau bằng dấu phẩy')
+    parser.add_argument('--seed', type=int, default=42, help='seed sinh dữ liệu và chọn người dùng')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def _config(db_uri, cache_dir):
+    config = make_config(db_uri)
+    config.TEMPLATE_CACHE_ENABLED = bool(cache_dir)
+    config.TEMPLATE_CACHE_DIR = cache_dir
+    config.FRAGMENT_CACHE_ENABLED = False  # chỉ đo template, không đo fragment cache
+    return config
+
+# ========== TIẾN TRÌNH CON: MỘT WORKER MỚI ==========
+def run_child(spec):
+    from academic_system import create_app
+    started = time.perf_counter()
+    app = create_app(_config(spec['db_uri'], spec['cache_dir']))
+    created = time.perf_counter()
+
+    client = app.test_client()
+    if spec['session']:
+        with client.session_transaction() as sess:
+            sess.update(spec['session'])
+
+    pages = []
+    for endpoint, url in spec['pages']:
+        timings = []
+        for _ in range(2):
+            request_started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - request_started)
+        pages.append({'endpoint': endpoint, 'status': response.status_code,
+                      'first_ms': timings[0] * 1000, 'second_ms': timings[1] * 1000})
+
+    print(json.dumps({
+        'create_app_ms': (created - started) * 1000,
+        'pages': pages
+    }))
+
+# ========== TIẾN TRÌNH CHÍNH ==========
+def blueprint_specs(users):
+    specs = {'auth': {'session': None, 'pages': [('auth.login', '/login')]}}
+    for role in ('student', 'lecturer', 'admin'):
+        user = users[role][0]
+        specs[role] = {
+            'session': user['session'],
+            'pages': [(endpoint, build_url(user)) for scenario_role, endpoint, build_url in SCENARIOS
+                      if scenario_role == role]
+        }
+    return specs
+
+def measure(spec):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f'Tiến trình đo bị lỗi:\n{result.stderr}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_child(json.loads(args.child))
+        return 0
+
+    from academic_system import create_app
+    from academic_system.models import db
+    from academic_system.seeding import SeedOptions, seed_scale
+    from academic_system.templating import precompile_templates
+
+    modes = [mode for mode in args.modes.split(',') if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        raise SystemExit(f'Chế độ không hợp lệ: {", ".join(sorted(unknown))} (chọn trong {", ".join(MODES)})')
+
+    work_dir = tempfile.mkdtemp(prefix='benchmark_startup_')
+    db_uri = f'sqlite:///{os.path.join(work_dir, "bench.db")}'
+    warm_dir = os.path.join(work_dir, 'warm_cache')
+    try:
+        app = create_app(_config(db_uri, warm_dir))
+        with app.app_context():
+            db.create_all()
+            seed_scale(SeedOptions(students=args.students, instructors=10, courses=20,
+                                   sections_per_semester=40, seed=args.seed))
+            users = sample_users(random.Random(args.seed), count=1)
+        count, errors = precompile_templates(app)
+        if errors:
+            raise SystemExit(f'Không biên dịch được template: {errors}')
+        print(f'Đã sinh dữ liệu vào {db_uri}, biên dịch sẵn {count} template cho chế độ warm')
+
+        specs = blueprint_specs(users)
+        print(f'{"blueprint":<10} {"chế độ":<6} {"create_app":>11} {"response đầu":>13} '
+              f'{"trang lần đầu":>14} {"trang lần hai":>14}  (ms, trung vị {args.runs} lần)')
+        for blueprint in BLUEPRINTS:
+            for mode in modes:
+                samples = []
+                for run in range(args.runs):
+                    cache_dir = ''
+                    if mode == 'warm':
+                        cache_dir = warm_dir
+                    elif mode == 'cold':
+                        cache_dir = os.path.join(work_dir, f'cold_{blueprint}_{run}')
+                    samples.append(measure(dict(specs[blueprint], db_uri=db_uri, cache_dir=cache_dir)))
+
+                failed = {page['endpoint'] for sample in samples for page in sample['pages'] if page['status'] >= 400}
+                create_app_ms = statistics.median(sample['create_app_ms'] for sample in samples)
+                first_response = statistics.median(sample['pages'][0]['first_ms'] for sample in samples)
+                first_pages = statistics.median(
+                    statistics.mean(page['first_ms'] for page in sample['pages']) for sample in samples)
+                second_pages = statistics.median(
+                    statistics.mean(page['second_ms'] for page in sample['pages']) for sample in samples)
+                print(f'{blueprint:<10} {mode:<6} {create_app_ms:>11.1f} {first_response:>13.1f} '
+                      f'{first_pages:>14.1f} {second_pages:>14.1f}'
+                      + (f'  lỗi: {", ".join(sorted(failed))}' if failed else ''))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""So sánh kết quả giữa hai CSDL (vd MySQL và SQLite).
+
+Tạo schema từ models.py trên từng CSDL, sinh cùng một bộ dữ liệu bằng seed-scale
+(cùng seed), rồi chạy các truy vấn báo cáo / tổng hợp / xuất file và so sánh kết quả.
+Mỗi CSDL phải trống (hoặc dùng --drop để xóa bảng trước).
+
+    python scripts/compare_backends.py                                   # SQLite file vs SQLite trong bộ nhớ
+    python scripts/compare_backends.py mysql+pymysql://root:@localhost/academic_bench sqlite:// --drop
+"""
+import argparse
+import os
+import sys
+import tempfile
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from academic_system import create_app  # noqa: E402
+from academic_system.config import Config  # noqa: E402
+from academic_system.models import db, Student, Section, SectionAttendanceSummary, StudentSemesterGradeSummary  # noqa: E402
+from academic_system.seeding import SeedOptions, seed_scale  # noqa: E402
+from academic_system.summaries import _compute_grade_report  # noqa: E402
+from academic_system.exports import iter_attendance_matrix, iter_grades, max_total_sessions  # noqa: E402
+from academic_system.registration import recount_enrollments  # noqa: E402
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('uris', nargs='*', help='hai URI CSDL cần so sánh')
+    parser.add_argument('--students', type=int, default=500, help='số sinh viên sinh ra')
+    parser.add_argument('--seed', type=int, default=42, help='seed sinh dữ liệu')
+    parser.add_argument('--drop', action='store_true', help='xóa toàn bộ bảng trước khi tạo schema')
+    return parser.parse_args()
+
+def normalize(value):
+    if isinstance(value, (float, Decimal)):
+        return round(float(value), 2)
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    return value
+
+def collect(uri, args):
+    class CompareConfig(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_REPLICA_URI = None
+        REGISTRATION_QUEUE_ENABLED = False
+        SQL_METRICS_ENABLED = False
+    app = create_app(CompareConfig)
+
+    with app.app_context():
+        if args.drop:
+            db.drop_all()
+        db.create_all()
+        seed_scale(SeedOptions(students=args.students, instructors=20, courses=30, semesters=2,
+                               sections_per_semester=40, seed=args.seed))
+
+        semester_id = db.session.query(Section.semester_id).order_by(Section.semester_id).limit(1).scalar()
+        total_sessions = max_total_sessions(semester_id=semester_id)
+        results = {
+            'grade_report': _compute_grade_report(),
+            'attendance_summary': [
+                (row.section_id, row.sessions_marked, row.total_marked)
+                for row in SectionAttendanceSummary.query.order_by(SectionAttendanceSummary.section_id)
+            ],
+            'student_grade_summary': [
+                (row.student_id, row.semester_id, row.credits_attempted, row.credits_earned, row.weighted_score_sum)
+                for row in StudentSemesterGradeSummary.query.order_by(StudentSemesterGradeSummary.student_id,
+                                                                      StudentSemesterGradeSummary.semester_id)
+            ],
+            'enrolled_count': [
+                tuple(row) for row in db.session.query(Section.id, Section.enrolled_count).order_by(Section.id)
+            ],
+            'recount_mismatches': [tuple(row) for row in recount_enrollments()],
+            'students_by_name': [
+                tuple(row) for row in db.session.query(Student.full_name, Student.id)
+                .order_by(Student.full_name, Student.id).limit(200)
+            ],
+            'grade_export': list(iter_grades(semester_id=semester_id)),
+            'attendance_export': list(iter_attendance_matrix(total_sessions, semester_id=semester_id))
+        }
+        # Bỏ cột thời gian nhập điểm (phụ thuộc thời điểm chạy)
+        results['grade_export'] = [row[:-1] for row in results['grade_export']]
+        db.session.remove()
+    return normalize(results)
+
+def main():
+    args = parse_args()
+    uris = args.uris or ['sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='compare_backends_'), 'a.db'), 'sqlite://']
+    if len(uris) != 2:
+        print('Cần đúng hai URI CSDL')
+        return 2
+
+    first, second = (collect(uri, args) for uri in uris)
+    differences = 0
+    for name in first:
+        if first[name] == second[name]:
+            print(f'  {name}: giống nhau ({len(first[name])} mục)')
+            continue
+        differences += 1
+        print(f'  {name}: KHÁC NHAU')
+        if isinstance(first[name], list):
+            for index, (left, right) in enumerate(zip(first[name], second[name])):
+                if left != right:
+                    print(f'    mục {index}: {left!r} != {right!r}')
+                    break
+            if len(first[name]) != len(second[name]):
+                print(f'    số mục: {len(first[name])} != {len(second[name])}')
+
+    if differences:
+        print(f'THẤT BẠI: {differences} kết quả khác nhau giữa hai CSDL')
+        return 1
+    print('OK: kết quả giống nhau giữa hai CSDL')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Kiểm thử tải đăng ký tín chỉ giờ cao điểm.
+
+Tạo một CSDL SQLite tạm, sinh sinh viên và vài lớp học phần "nóng", sau đó cho
+N sinh viên cùng lúc gửi POST /student/enroll/<section_id> (mặc định qua hàng đợi
+đăng ký) và hỏi lại kết quả cho đến khi xong. In ra độ trễ p50/p95/p99 và kiểm tra
+không lớp nào vượt sĩ số tối đa.
+
+    python scripts/load_test_registration.py --requesters 5000
+    python scripts/load_test_registration.py --requesters 5000 --direct   # không dùng hàng đợi
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert  # noqa: E402
+from academic_system import create_app  # noqa: E402
+from academic_system.config import Config  # noqa: E402
+from academic_system.models import db, User, Student, Instructor, Course, Semester, Section, Enrollment  # noqa: E402
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requesters', type=int, default=5000, help='số sinh viên gửi yêu cầu đồng thời')
+    parser.add_argument('--sections', type=int, default=5, help='số lớp học phần bị tranh chấp')
+    parser.add_argument('--capacity', type=int, default=300, help='sĩ số tối đa mỗi lớp')
+    parser.add_argument('--direct', action='store_true', help='tắt hàng đợi, gọi thẳng enroll_section')
+    parser.add_argument('--poll-interval', type=float, default=0.05,
+                        help='giây chờ trước lần hỏi kết quả đầu tiên (tăng dần đến 1s)')
+    parser.add_argument('--timeout', type=float, default=120, help='thời gian chờ tối đa mỗi yêu cầu (giây)')
+    parser.add_argument('--db', help='đường dẫn file SQLite (mặc định: file tạm)')
+    return parser.parse_args()
+
+def make_config(args, db_path):
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 60}}
+        TESTING = True
+        REGISTRATION_QUEUE_ENABLED = not args.direct
+        REGISTRATION_QUEUE_SIZE = max(args.requesters, 1)
+    return LoadTestConfig
+
+def seed(args):
+    db.drop_all()
+    db.create_all()
+    semester = Semester(name='LOAD', start_date=date.today(), end_date=date(date.today().year + 1, 12, 31))
+    lecturer = User(username='load_lecturer', password='x', role='lecturer')
+    db.session.add_all([semester, lecturer])
+    db.session.flush()
+    instructor = Instructor(user_id=lecturer.id, full_name='Load Lecturer', instructor_code='LOADGV')
+    db.session.add(instructor)
+    db.session.flush()
+
+    section_ids = []
+    for i in range(args.sections):
+        course = Course(course_code=f'LOAD{i:03d}', name=f'Load course {i}', credits=3)
+        db.session.add(course)
+        db.session.flush()
+        section = Section(course_id=course.id, instructor_id=instructor.id, semester_id=semester.id,
+                          section_code=f'L{i:03d}', max_capacity=args.capacity)
+        db.session.add(section)
+        db.session.flush()
+        section_ids.append(section.id)
+
+    db.session.execute(insert(User), [
+        {'username': f'load_sv{k}', 'password': 'x', 'role': 'student'} for k in range(args.requesters)
+    ])
+    user_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'student').order_by(User.id)]
+    db.session.execute(insert(Student), [
+        {'user_id': user_id, 'full_name': f'Load Student {k}', 'student_code': f'LOAD{k:06d}', 'is_active': True}
+        for k, user_id in enumerate(user_ids)
+    ])
+    db.session.commit()
+    student_ids = [row[0] for row in db.session.query(Student.id).order_by(Student.id)]
+    return student_ids, section_ids
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def run_requester(app, args, student_id, section_id, barrier, results):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = student_id
+        sess['role'] = 'student'
+        sess['student_id'] = student_id
+    headers = {'Accept': 'application/json'}
+    barrier.wait()
+
+    started = time.perf_counter()
+    response = client.post(f'/student/enroll/{section_id}', headers=headers)
+    outcome = str(response.status_code)
+    if response.status_code == 202:
+        status_url = response.get_json()['status_url']
+        deadline = started + args.timeout
+        interval = args.poll_interval
+        outcome = 'timeout'
+        while time.perf_counter() < deadline:
+            time.sleep(interval)
+            status = client.get(status_url, headers=headers).get_json()['status']
+            if status != 'pending':
+                outcome = status
+                break
+            interval = min(interval * 2, 1.0)
+    elif response.status_code == 503:
+        outcome = 'busy'
+    results.append((started, time.perf_counter(), outcome))
+
+def main():
+    args = parse_args()
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='load_registration_'), 'load.db')
+    app = create_app(make_config(args, db_path))
+
+    with app.app_context():
+        student_ids, section_ids = seed(args)
+    print(f'CSDL: {db_path}')
+    print(f'{len(student_ids)} sinh viên, {len(section_ids)} lớp x {args.capacity} chỗ, '
+          f'chế độ {"trực tiếp" if args.direct else "hàng đợi"}')
+
+    threading.stack_size(512 * 1024)
+    barrier = threading.Barrier(len(student_ids) + 1)
+    results = []
+    threads = [
+        threading.Thread(target=run_requester,
+                         args=(app, args, student_id, section_ids[k % len(section_ids)], barrier, results))
+        for k, student_id in enumerate(student_ids)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    # Đo theo mốc thời gian của chính các luồng gửi yêu cầu (luồng chính có thể bị trễ vì GIL)
+    elapsed = max(end for _, end, _ in results) - min(start for start, _, _ in results)
+    latencies = sorted(end - start for start, end, _ in results)
+    print(f'Hoàn tất {len(results)} yêu cầu trong {elapsed:.2f}s ({len(results) / elapsed:.0f} req/s)')
+    print('Độ trễ: p50={:.0f}ms p95={:.0f}ms p99={:.0f}ms max={:.0f}ms'.format(
+        *(percentile(latencies, pct) * 1000 for pct in (50, 95, 99, 100))))
+    print('Kết quả:', dict(Counter(outcome for _, _, outcome in results)))
+
+    over_enrolled = 0
+    with app.app_context():
+        for section in Section.query.filter(Section.id.in_(section_ids)):
+            active = db.session.query(func.count(Enrollment.id)).filter_by(
+                section_id=section.id, status='active').scalar()
+            flag = ''
+            if active > section.max_capacity or active != section.enrolled_count:
+                over_enrolled += 1
+                flag = '  <-- SAI'
+            print(f'  {section.section_code}: {active}/{section.max_capacity} '
+                  f'(enrolled_count={section.enrolled_count}){flag}')
+
+    if over_enrolled:
+        print(f'THẤT BẠI: {over_enrolled} lớp vượt sĩ số hoặc lệch bộ đếm')
+        return 1
+    print('OK: không lớp nào vượt sĩ số')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import datetime as dt
+from itertools import count
+
+import pytest
+from sqlalchemy import event
+
+from academic_system import create_app
+from academic_system.config import Config
+from academic_system.models import (db, User, Semester, Course, Instructor, Student, Section,
+                                    Enrollment, Grade)
+from academic_system.timetable import apply_schedule
+
+# ========== APP KIỂM THỬ: SQLITE TRONG BỘ NHỚ ==========
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = 'test'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'  # mỗi app một CSDL mới, schema tạo lúc khởi động
+    SQLALCHEMY_REPLICA_URI = None
+    REGISTRATION_QUEUE_ENABLED = False
+    TEMPLATE_CACHE_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+    STATIC_MANIFEST_ENABLED = False
+
+@pytest.fixture
+def app():
+    # Không giữ app context trong lúc test: mỗi request dùng session riêng như khi chạy thật,
+    # phần chuẩn bị dữ liệu tự mở "with app.app_context()"
+    return create_app(TestConfig)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login_as(client, role, user_id, profile_id=None):
+    # Gán phiên đăng nhập trực tiếp (như sau auth.login), không tốn request
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['role'] = role
+        if role == 'student':
+            sess['student_id'] = profile_id
+        elif role == 'lecturer':
+            sess['instructor_id'] = profile_id
+
+@pytest.fixture
+def login(client):
+    return lambda role, user_id, profile_id=None: login_as(client, role, user_id, profile_id)
+
+class QueryCounter:
+    # Đếm số câu SQL gửi tới CSDL trong khối with
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+@pytest.fixture
+def queries(app):
+    with app.app_context():
+        return QueryCounter(db.engine)
+
+# ========== DỮ LIỆU MẪU ==========
+class Builder:
+    def __init__(self):
+        self._seq = count(1)
+
+    def semester(self, name='2025_1'):
+        semester = Semester(name=name, start_date=dt.date(2025, 8, 1), end_date=dt.date(2026, 1, 15))
+        db.session.add(semester)
+        db.session.flush()
+        return semester
+
+    def admin(self):
+        user = User(username=f'admin{next(self._seq)}', password='123', role='admin')
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    def instructor(self):
+        n = next(self._seq)
+        user = User(username=f'gv{n}', password='123', role='lecturer')
+        db.session.add(user)
+        db.session.flush()
+        instructor = Instructor(user_id=user.id, full_name=f'Giảng viên {n}', instructor_code=f'GV{n:03d}',
+                                department='CNTT')
+        db.session.add(instructor)
+        db.session.flush()
+        return instructor
+
+    def student(self):
+        n = next(self._seq)
+        user = User(username=f'sv{n}', password='123', role='student')
+        db.session.add(user)
+        db.session.flush()
+        student = Student(user_id=user.id, full_name=f'Sinh viên {n}', student_code=f'SV{n:05d}')
+        db.session.add(student)
+        db.session.flush()
+        return student
+
+    def section(self, instructor, semester, schedule_info='Thứ 2 - 7h-9h - Phòng A101', max_capacity=50, credits=3):
+        n = next(self._seq)
+        course = Course(course_code=f'C{n:03d}', name=f'Môn {n}', credits=credits)
+        db.session.add(course)
+        db.session.flush()
+        section = Section(course_id=course.id, instructor_id=instructor.id, semester_id=semester.id,
+                          section_code=f'L{n:02d}', max_capacity=max_capacity, total_sessions=15)
+        apply_schedule(section, schedule_info)
+        db.session.add(section)
+        db.session.flush()
+        return section
+
+    def enroll(self, student, section, score=None):
+        enrollment = Enrollment(student_id=student.id, section_id=section.id, status='active',
+                                enroll_date=dt.date(2025, 8, 15))
+        db.session.add(enrollment)
+        section.enrolled_count += 1
+        db.session.flush()
+        if score is not None:
+            db.session.add(Grade(enrollment_id=enrollment.id, score=score, grade_letter='B',
+                                 submitted_by=section.instructor_id))
+        return enrollment
+
+@pytest.fixture
+def build():
+    return Builder()
@@ -0,0 +1,64 @@
+import io
+
+from academic_system.accounts_import import import_accounts, iter_account_rows
+from academic_system.models import db, User, Student
+
+HEADER = 'username,password,full_name,student_code,date_of_birth,email\n'
+
+def _rows(text):
+    return iter_account_rows(io.BytesIO((HEADER + text).encode('utf-8')), 'accounts.csv')
+
+def test_rejects_values_longer_than_columns(app):
+    with app.app_context():
+        result = import_accounts('students', _rows(
+            f'{"u" * 51},123,A,SV1,,\n'
+            f'ok,123,{"A" * 101},SV2,,\n'
+            f'ok2,123,B,SV3,,{"e" * 95}@x.com\n'
+            'ok3,123,C,SV4,,\n'
+        ))
+        assert result.created == 1
+        assert [line for line, _ in result.errors] == [2, 3, 4]
+        assert 'username (tối đa 50 ký tự)' in result.errors[0][1]
+
+def test_duplicates_are_case_insensitive(app, build):
+    with app.app_context():
+        build.student()  # username sv1, mã SV00001
+        db.session.commit()
+        result = import_accounts('students', _rows(
+            'SV1,123,A,X1,,\n'
+            'new,123,B,sv00001,,\n'
+            'fresh,123,C,X2,,\n'
+            'FRESH,123,D,X3,,\n'
+            'other,123,E,x2,,\n'
+            'last,123,F,X4,,Last@Mail.com\n'
+        ))
+        assert result.created == 2
+        assert [line for line, _ in result.errors] == [2, 3, 5, 6]
+        assert db.session.query(Student.email).filter_by(student_code='X4').scalar() == 'last@mail.com'
+
+def test_database_rejection_reports_row_and_keeps_others(app):
+    def rows():
+        rows = list(_rows('a,123,A,SV1,,\nlate,123,B,SV2,,\nc,123,C,SV3,,\n'))
+        yield rows[0]
+        # Tài khoản được tạo bởi người khác sau khi đã lấy danh sách username
+        db.session.add(User(username='late', password='x', role='student'))
+        db.session.commit()
+        yield from rows[1:]
+
+    with app.app_context():
+        result = import_accounts('students', rows())
+        assert result.created == 2
+        assert [line for line, _ in result.errors] == [3]
+        assert {username for (username,) in db.session.query(User.username)} == {'a', 'late', 'c'}
+
+def test_import_view_reports_errors_without_failing(app, client, build, login):
+    with app.app_context():
+        admin_id = build.admin().id
+        db.session.commit()
+    login('admin', admin_id)
+    response = client.post('/admin/students/import', data={
+        'accounts_file': (io.BytesIO((HEADER + f'{"u" * 60},123,A,SV1,,\nb,123,B,SV2,,\n').encode('utf-8')),
+                          'accounts.csv')
+    })
+    assert response.status_code == 200
+    assert 'Đã tạo 1 tài khoản, 1 dòng lỗi' in response.get_data(as_text=True)
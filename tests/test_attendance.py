@@ -0,0 +1,50 @@
+from sqlalchemy import event
+
+from academic_system.db_routing import RoutingSession
+from academic_system.models import db, Section, SectionAttendanceSummary
+
+# Lưu điểm danh một buổi cộng đúng một lần vào bảng tổng hợp của lớp
+
+def _section(app, build, students):
+    with app.app_context():
+        instructor = build.instructor()
+        section = build.section(instructor, build.semester())
+        enrollments = [build.enroll(build.student(), section) for _ in range(students)]
+        section.attendance_summary = SectionAttendanceSummary()
+        db.session.commit()
+        return section.id, (instructor.user_id, instructor.id), [enrollment.id for enrollment in enrollments]
+
+def _summary(app, section_id):
+    with app.app_context():
+        summary = db.session.get(SectionAttendanceSummary, section_id)
+        return summary.sessions_marked, summary.total_marked
+
+def test_resubmitted_session_counts_once(app, build, client, login):
+    section_id, lecturer, enrollment_ids = _section(app, build, students=3)
+    login('lecturer', *lecturer)
+    url = f'/lecturer/section/{section_id}/attendance/session/1'
+    form = {f'status_{enrollment_id}': 'present' for enrollment_id in enrollment_ids}
+    client.post(url, data=form)
+    client.post(url, data=form)
+    assert _summary(app, section_id) == (1, 3)
+
+    client.post(f'/lecturer/section/{section_id}/attendance/session/2', data=form)
+    assert _summary(app, section_id) == (2, 6)
+
+def test_section_is_locked_before_reading_marked_rows(app, build, client, login):
+    section_id, lecturer, enrollment_ids = _section(app, build, students=1)
+    login('lecturer', *lecturer)
+    locked = []
+
+    def record(orm_execute_state):
+        statement = orm_execute_state.statement
+        if orm_execute_state.is_select and statement._for_update_arg is not None:
+            locked.append(statement.get_final_froms()[0].name)
+
+    event.listen(RoutingSession, 'do_orm_execute', record)
+    try:
+        client.post(f'/lecturer/section/{section_id}/attendance/session/1',
+                    data={f'status_{enrollment_ids[0]}': 'late'})
+    finally:
+        event.remove(RoutingSession, 'do_orm_execute', record)
+    assert locked == [Section.__tablename__, 'attendance']
@@ -0,0 +1,32 @@
+import warnings
+
+from academic_system.models import db
+
+def _login_admin(app, build, login):
+    with app.app_context():
+        admin_id = build.admin().id
+        db.session.commit()
+    login('admin', admin_id)
+
+def test_semester_attendance_export_requires_semester(app, build, client, login):
+    _login_admin(app, build, login)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # không còn SAWarning "fully NULL primary key"
+        response = client.get('/admin/attendance/export.csv')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/admin/attendance')
+    with client.session_transaction() as sess:
+        assert sess['_flashes'] == [('warning', 'Vui lòng chọn học kỳ cần xuất điểm danh')]
+
+def test_semester_attendance_export_streams_csv(app, build, client, login):
+    with app.app_context():
+        semester = build.semester()
+        section = build.section(build.instructor(), semester)
+        build.enroll(build.student(), section)
+        db.session.commit()
+        semester_id = semester.id
+    _login_admin(app, build, login)
+    response = client.get(f'/admin/attendance/export.csv?semester_id={semester_id}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert len(response.get_data(as_text=True).strip().splitlines()) == 2
@@ -0,0 +1,98 @@
+import os
+import stat
+
+import pytest
+
+from academic_system import create_app
+from academic_system.fragments import SEATS, FileSystemBackend, FragmentCache, init_fragment_cache
+from academic_system.models import db
+
+from conftest import TestConfig
+
+class FragmentConfig(TestConfig):
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_BACKEND = 'memory'
+
+@pytest.fixture
+def app():
+    return create_app(FragmentConfig)
+
+def _tokens(app, *tags):
+    return app.extensions['fragment_cache'].backend.tag_tokens(tags)
+
+def _section_with_admin(app, build):
+    with app.app_context():
+        section = build.section(build.instructor(), build.semester())
+        student = build.student()
+        admin_id = build.admin().id
+        db.session.commit()
+        return section.id, (student.user_id, student.id), admin_id
+
+def test_admin_sections_hit_skips_queries(app, build, client, login, queries):
+    _, _, admin_id = _section_with_admin(app, build)
+    login('admin', admin_id)
+    client.get('/admin/sections')  # nạp cache hồ sơ người đăng nhập và đoạn HTML
+
+    with queries:
+        response = client.get('/admin/sections')
+    assert response.status_code == 200
+    assert queries.count == 0
+    assert app.extensions['fragment_cache'].snapshot()['fragments']['admin-sections'] == {'hits': 1, 'misses': 1}
+
+def test_enrollment_rotates_seats_not_sections(app, build, client, login):
+    section_id, student, _ = _section_with_admin(app, build)
+    sections_before, seats_before = _tokens(app, 'sections', SEATS)
+
+    login('student', *student)
+    client.post(f'/student/enroll/{section_id}')
+    sections_after, seats_after = _tokens(app, 'sections', SEATS)
+    assert sections_after == sections_before
+    assert seats_after != seats_before
+
+    client.post(f'/student/enroll/{section_id}/drop')
+    assert _tokens(app, 'sections') == [sections_before]
+    assert _tokens(app, SEATS) != [seats_after]
+
+def test_admin_attendance_shows_new_enrollment(app, build, client, login):
+    section_id, student, admin_id = _section_with_admin(app, build)
+    login('admin', admin_id)
+    client.get('/admin/attendance')
+
+    login('student', *student)
+    client.post(f'/student/enroll/{section_id}')
+    login('admin', admin_id)
+    client.get('/admin/attendance')
+    assert app.extensions['fragment_cache'].snapshot()['fragments']['admin-attendance'] == {'hits': 0, 'misses': 2}
+
+def test_filesystem_backend_defaults_to_private_instance_folder(tmp_path):
+    app = create_app(TestConfig)
+    app.instance_path = str(tmp_path)
+    app.config.update(FRAGMENT_CACHE_ENABLED=True, FRAGMENT_CACHE_BACKEND='filesystem', FRAGMENT_CACHE_DIR='')
+    init_fragment_cache(app)
+
+    backend = app.extensions['fragment_cache'].backend
+    assert isinstance(backend, FileSystemBackend)
+    assert backend.directory == os.path.join(str(tmp_path), 'fragments')
+    assert stat.S_IMODE(os.stat(backend.directory).st_mode) & 0o077 == 0
+
+def test_filesystem_backend_sweeps_orphaned_fragments(tmp_path):
+    backend = FileSystemBackend(str(tmp_path), max_size=3)
+    cache = FragmentCache(backend, ttl=300)
+    for page in range(5):
+        cache.get_or_render('list', page, ('sections',), lambda: 'html')
+        cache.invalidate(['sections'])  # các file vừa ghi mang mã tag cũ, không còn được đọc
+    backend.set('expired', 'html', ttl=-1)
+
+    assert backend.sweep() == 3  # một file hết hạn và hai file cũ nhất vượt max_size
+    assert len([name for name in os.listdir(tmp_path) if len(name) == 40]) == 3
+
+def test_filesystem_backend_sweeps_on_write(tmp_path):
+    backend = FileSystemBackend(str(tmp_path), max_size=100)
+    backend.set('new', 'html', ttl=300)  # lần ghi đầu dọn ngay, các lần sau chờ SWEEP_INTERVAL
+    backend.set('old', 'html', ttl=-1)
+    assert os.path.exists(backend._path('old'))
+
+    backend._next_sweep = 0
+    backend.set('newer', 'html', ttl=300)
+    assert not os.path.exists(backend._path('old'))
+    assert backend.get('new') == backend.get('newer') == 'html'
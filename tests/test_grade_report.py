@@ -0,0 +1,61 @@
+from academic_system import summaries
+from academic_system.models import db, Enrollment
+from academic_system.summaries import get_grade_report, invalidate_grade_report
+
+# Báo cáo điểm toàn trường được chụp lại theo phiên bản điểm, không giữ số liệu cũ
+
+def _graded(build, score):
+    semester = build.semester()
+    section = build.section(build.instructor(), semester)
+    enrollment = build.enroll(build.student(), section, score=score)
+    db.session.commit()
+    return section, enrollment
+
+def test_snapshot_is_reused_until_grades_change(app, build, queries):
+    with app.app_context():
+        _graded(build, 8)
+        assert get_grade_report()[0]['graded_count'] == 1
+        with queries:
+            report, _ = get_grade_report()
+        assert queries.count == 1
+        assert report['avg_score'] == 8
+
+        _graded(build, 6)
+        invalidate_grade_report()
+        db.session.commit()
+        assert get_grade_report()[0]['avg_score'] == 7
+
+def test_grade_saved_while_computing_is_not_lost(app, build, monkeypatch):
+    compute = summaries._compute_grade_report
+
+    def compute_then_grade_is_saved():
+        report = compute()
+        # Điểm mới được lưu (và phiên bản tăng) sau khi đã tính xong số liệu
+        _graded(build, 4)
+        invalidate_grade_report()
+        db.session.commit()
+        return report
+
+    with app.app_context():
+        _graded(build, 10)
+        monkeypatch.setattr(summaries, '_compute_grade_report', compute_then_grade_is_saved)
+        assert get_grade_report()[0]['graded_count'] == 1
+        monkeypatch.setattr(summaries, '_compute_grade_report', compute)
+        assert get_grade_report()[0]['graded_count'] == 2
+
+def test_deleting_section_refreshes_report(app, build, client, login):
+    with app.app_context():
+        _graded(build, 9)
+        section, enrollment = _graded(build, 3)
+        enrollment.status = 'dropped'  # chỉ xóa được lớp không còn đăng ký active
+        admin_id = build.admin().id
+        db.session.commit()
+        section_id = section.id
+        assert get_grade_report()[0]['graded_count'] == 2
+
+    login('admin', admin_id)
+    client.post(f'/admin/sections/{section_id}/delete')
+    with app.app_context():
+        assert Enrollment.query.count() == 1
+        report, _ = get_grade_report()
+        assert (report['graded_count'], report['avg_score']) == (1, 9)
@@ -0,0 +1,50 @@
+from academic_system.grading import save_grades
+from academic_system.models import db, StudentGradeSummary, StudentSemesterGradeSummary
+from academic_system.summaries import rebuild_grade_summaries
+
+# Tổng hợp điểm được cộng dồn khi nhập điểm, với số câu SQL không đổi theo sĩ số lớp
+
+def _summaries():
+    overall = {(row.student_id,): (row.credits_attempted, row.credits_earned, float(row.weighted_score_sum))
+               for row in StudentGradeSummary.query}
+    by_semester = {(row.student_id, row.semester_id): (row.credits_attempted, row.credits_earned,
+                                                       float(row.weighted_score_sum))
+                   for row in StudentSemesterGradeSummary.query}
+    return overall, by_semester
+
+def _section(build, size):
+    semester = build.semester()
+    section = build.section(build.instructor(), semester, credits=3)
+    enrollments = [build.enroll(build.student(), section) for _ in range(size)]
+    db.session.commit()
+    # Chỉ giữ id: đối tượng hết hạn sau commit sẽ bị nạp lại từng dòng khi đọc thuộc tính
+    return (section.id, section.instructor_id), [(enrollment.id, enrollment.student_id) for enrollment in enrollments]
+
+def _save(section, enrollments, score):
+    section_id, instructor_id = section
+    save_grades(section_id, [{'enrollment_id': enrollment_id, 'score': score, 'grade_letter': None}
+                             for enrollment_id, _ in enrollments], instructor_id)
+    db.session.commit()
+
+def test_batch_save_uses_constant_statements(app, build, queries):
+    counts = []
+    with app.app_context():
+        for size in (2, 40):
+            section, enrollments = _section(build, size)
+            with queries:
+                _save(section, enrollments, 7)
+            counts.append(queries.count)
+    assert counts[0] == counts[1]
+
+def test_summaries_match_rebuild_after_new_and_changed_grades(app, build):
+    with app.app_context():
+        section, enrollments = _section(build, 3)
+        _save(section, enrollments, 8)  # chưa có dòng tổng hợp nào
+        _save(section, enrollments[:2], 3)  # sửa điểm: trừ đóng góp cũ
+        other, others = _section(build, 1)
+        _save(other, others, 9)
+
+        incremental = _summaries()
+        assert incremental[0][(enrollments[0][1],)] == (3, 0, 9.0)
+        rebuild_grade_summaries()
+        assert _summaries() == incremental
@@ -0,0 +1,24 @@
+import pytest
+
+from academic_system.models import db
+from academic_system.pagination import decode_cursor, encode_cursor
+
+@pytest.mark.parametrize('values', [5, {'id': 1}, 'abc', None, [1], [1, 2, 3], [[1], 2], [{'a': 1}, 2]])
+def test_decode_cursor_rejects_tampered_values(values):
+    assert decode_cursor(encode_cursor(values), 2) is None
+
+def test_decode_cursor_accepts_scalars():
+    assert decode_cursor(encode_cursor(['L01', 7]), 2) == ['L01', 7]
+    assert decode_cursor('not base64!', 2) is None
+
+def test_crafted_cursor_shows_first_page(app, build, client, login):
+    with app.app_context():
+        build.section(build.instructor(), build.semester())
+        admin_id = build.admin().id
+        db.session.commit()
+    login('admin', admin_id)
+    for cursor in (encode_cursor(5), encode_cursor({'id': 1}), encode_cursor([[1], 2])):
+        for direction in ('after', 'before'):
+            response = client.get(f'/admin/sections?{direction}={cursor}')
+            assert response.status_code == 200
+            assert 'Giảng viên' in response.get_data(as_text=True)
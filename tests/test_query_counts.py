@@ -0,0 +1,76 @@
+from academic_system.models import db
+
+# Số câu SQL của các trang đã bỏ N+1 không được tăng theo sĩ số lớp / số môn đã học.
+# Mỗi kịch bản đo cùng một trang với dữ liệu nhỏ và lớn trong cùng CSDL.
+
+SMALL, LARGE = 2, 30
+MAX_QUERIES = 12
+
+def _count(client, queries, url):
+    with queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return queries.count
+
+def _assert_bounded(counts):
+    small, large = counts
+    assert large == small
+    assert large <= MAX_QUERIES
+
+def _rosters(app, build):
+    # Một giảng viên dạy hai lớp: SMALL và LARGE sinh viên, mỗi sinh viên đã có điểm
+    with app.app_context():
+        semester = build.semester()
+        instructor = build.instructor()
+        section_ids = []
+        for size in (SMALL, LARGE):
+            section = build.section(instructor, semester)
+            for _ in range(size):
+                build.enroll(build.student(), section, score=7.5)
+            section_ids.append(section.id)
+        db.session.commit()
+        return (instructor.user_id, instructor.id), section_ids
+
+def _student_histories(app, build):
+    # Hai sinh viên đã học SMALL và LARGE môn, mỗi môn một lớp riêng
+    with app.app_context():
+        semester = build.semester()
+        instructor = build.instructor()
+        students = []
+        for size in (SMALL, LARGE):
+            student = build.student()
+            for _ in range(size):
+                build.enroll(student, build.section(instructor, semester, schedule_info=None), score=8)
+            students.append((student.user_id, student.id))
+        db.session.commit()
+        return (instructor.user_id, instructor.id), students
+
+def test_section_students_queries_do_not_grow_with_roster(app, build, login, client, queries):
+    lecturer, section_ids = _rosters(app, build)
+    login('lecturer', *lecturer)
+    client.get(f'/lecturer/section/{section_ids[0]}/students')  # nạp phiên đăng nhập vào cache
+    _assert_bounded([_count(client, queries, f'/lecturer/section/{section_id}/students')
+                     for section_id in section_ids])
+
+def test_section_report_queries_do_not_grow_with_roster(app, build, login, client, queries):
+    lecturer, section_ids = _rosters(app, build)
+    login('lecturer', *lecturer)
+    client.get(f'/lecturer/section/{section_ids[0]}/report')
+    _assert_bounded([_count(client, queries, f'/lecturer/section/{section_id}/report')
+                     for section_id in section_ids])
+
+def test_view_student_profile_queries_do_not_grow_with_history(app, build, login, client, queries):
+    lecturer, students = _student_histories(app, build)
+    login('lecturer', *lecturer)
+    client.get(f'/lecturer/student/{students[0][1]}/profile')
+    _assert_bounded([_count(client, queries, f'/lecturer/student/{student_id}/profile')
+                     for _, student_id in students])
+
+def test_student_grades_queries_do_not_grow_with_history(app, build, login, client, queries):
+    _, students = _student_histories(app, build)
+    counts = []
+    for user_id, student_id in students:
+        login('student', user_id, student_id)
+        client.get('/student/profile')
+        counts.append(_count(client, queries, '/student/grades'))
+    _assert_bounded(counts)
@@ -0,0 +1,86 @@
+import datetime as dt
+
+from academic_system.models import db, Section, Enrollment
+from academic_system.registration import admit_batch, recount_enrollments, reserve_seat
+
+# Sĩ số lớp (sections.enrolled_count) luôn khớp số đăng ký active và không vượt sức chứa
+
+def _flashes(client):
+    with client.session_transaction() as sess:
+        return [message for _, message in sess.pop('_flashes', [])]
+
+def _seats(app, section_id):
+    with app.app_context():
+        section = db.session.get(Section, section_id)
+        active = Enrollment.query.filter_by(section_id=section_id, status='active').count()
+        return section.enrolled_count, active
+
+def _section_code(app, section_id):
+    with app.app_context():
+        return db.session.get(Section, section_id).section_code
+
+def _full_section(app, build, capacity, students):
+    with app.app_context():
+        semester = build.semester()
+        section = build.section(build.instructor(), semester, max_capacity=capacity)
+        created = [build.student() for _ in range(students)]
+        db.session.commit()
+        return section.id, [(student.user_id, student.id) for student in created]
+
+def test_reserve_seat_stops_at_capacity(app, build):
+    section_id, _ = _full_section(app, build, capacity=2, students=0)
+    with app.app_context():
+        assert [reserve_seat(section_id) for _ in range(3)] == [True, True, False]
+        db.session.commit()
+        assert db.session.get(Section, section_id).enrolled_count == 2
+
+def test_enroll_rejects_when_section_full(app, build, client, login):
+    section_id, students = _full_section(app, build, capacity=1, students=2)
+
+    login('student', *students[0])
+    client.post(f'/student/enroll/{section_id}')
+    assert _flashes(client) == [f'Đăng ký lớp {_section_code(app, section_id)} thành công!']
+
+    login('student', *students[1])
+    client.post(f'/student/enroll/{section_id}')
+    assert _flashes(client) == ['Lớp học đã đầy, không thể đăng ký']
+    assert _seats(app, section_id) == (1, 1)
+
+def test_drop_releases_seat_and_reenroll_takes_it_back(app, build, client, login):
+    section_id, students = _full_section(app, build, capacity=1, students=2)
+    login('student', *students[0])
+    client.post(f'/student/enroll/{section_id}')
+    client.post(f'/student/enroll/{section_id}/drop')
+    assert _seats(app, section_id) == (0, 0)
+
+    login('student', *students[1])
+    client.post(f'/student/enroll/{section_id}')
+    login('student', *students[0])
+    _flashes(client)
+    client.post(f'/student/enroll/{section_id}')
+    assert _flashes(client) == ['Lớp học đã đầy, không thể đăng ký']
+    assert _seats(app, section_id) == (1, 1)
+
+def test_admit_batch_fills_in_arrival_order(app, build):
+    section_id, students = _full_section(app, build, capacity=2, students=3)
+    student_ids = [student_id for _, student_id in students]
+    with app.app_context():
+        outcomes = admit_batch(section_id, student_ids + student_ids[:1], dt.date(2025, 8, 20))
+    assert [outcomes[student_id] for student_id in student_ids] == ['enrolled', 'enrolled', 'full']
+    assert _seats(app, section_id) == (2, 2)
+
+    with app.app_context():
+        outcomes = admit_batch(section_id, student_ids[:1], dt.date(2025, 8, 21))
+    assert outcomes == {student_ids[0]: 'already'}
+    assert _seats(app, section_id) == (2, 2)
+
+def test_recount_enrollments_repairs_drift(app, build):
+    section_id, students = _full_section(app, build, capacity=5, students=2)
+    with app.app_context():
+        section = db.session.get(Section, section_id)
+        for _, student_id in students:
+            db.session.add(Enrollment(student_id=student_id, section_id=section_id, status='active'))
+        section.enrolled_count = 0  # dữ liệu nhập tay không qua registration.py
+        db.session.commit()
+        assert recount_enrollments() == [(section_id, 0, 2)]
+    assert _seats(app, section_id) == (2, 2)
@@ -0,0 +1,106 @@
+import json
+import time
+
+import pytest
+from flask import g
+from sqlalchemy import select
+
+from academic_system import create_app
+from academic_system.db_routing import PRIMARY_UNTIL_KEY, REPLICA_BIND
+from academic_system.models import db, Course, ReportSnapshot, Semester
+from academic_system.summaries import GRADE_REPORT
+
+from conftest import TestConfig
+
+class ReplicaConfig(TestConfig):
+    SQLALCHEMY_REPLICA_URI = 'sqlite://'  # CSDL riêng, đóng vai replica còn trễ
+
+@pytest.fixture
+def app():
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.metadata.create_all(db.engines[REPLICA_BIND])
+    return app
+
+def _graded_section(build, score):
+    semester = build.semester()
+    section = build.section(build.instructor(), semester)
+    build.enroll(build.student(), section, score=score)
+    admin_id = build.admin().id
+    db.session.commit()
+    return admin_id
+
+def _copy_to_replica(app, *lagging):
+    # Chép dữ liệu primary sang replica rồi chạy các câu lệnh "lagging" trên replica (dữ liệu cũ)
+    with app.app_context():
+        with db.engines[REPLICA_BIND].begin() as connection:
+            for table in db.metadata.sorted_tables:
+                rows = [dict(row._mapping) for row in db.session.execute(table.select())]
+                if rows:
+                    connection.execute(table.insert(), rows)
+            for statement in lagging:
+                connection.execute(statement)
+
+def _semester_names():
+    return db.session.execute(select(Semester.name)).scalars().all()
+
+def _semester_on_replica(app, build):
+    with app.app_context():
+        build.semester('primary')
+        admin_id = build.admin().id
+        db.session.commit()
+    _copy_to_replica(app, db.metadata.tables['semesters'].update().values(name='replica'))
+    return admin_id
+
+def test_select_goes_to_replica_when_enabled(app, build):
+    _semester_on_replica(app, build)
+    with app.test_request_context():
+        assert _semester_names() == ['primary']
+        g.use_replica = True
+        assert _semester_names() == ['replica']
+
+def test_locking_reads_and_reads_after_write_use_primary(app, build):
+    _semester_on_replica(app, build)
+    with app.test_request_context():
+        g.use_replica = True
+        assert db.session.execute(select(Semester.name).with_for_update()).scalars().all() == ['primary']
+        assert _semester_names() == ['replica']
+
+        db.session.add(Course(course_code='NEW', name='Môn mới', credits=3))
+        db.session.flush()
+        assert _semester_names() == ['primary']  # đọc-sau-ghi trong cùng request
+        db.session.rollback()
+
+def test_write_request_sticks_browser_to_primary(app, build, client, login):
+    admin_id = _semester_on_replica(app, build)
+    login('admin', admin_id)
+
+    def conflicts_page():
+        return client.get('/admin/sections/conflicts').get_data(as_text=True)
+
+    assert 'replica' in conflicts_page()
+    client.post('/admin/courses/add', data={'course_code': 'NEW', 'name': 'Môn mới', 'credits': 3})
+    with client.session_transaction() as sess:
+        assert sess[PRIMARY_UNTIL_KEY] > time.time()
+    page = conflicts_page()
+    assert 'primary' in page and 'replica' not in page
+
+    with client.session_transaction() as sess:
+        sess[PRIMARY_UNTIL_KEY] = time.time() - 1  # hết thời gian đọc-sau-ghi
+    assert 'replica' in conflicts_page()
+
+def test_grade_report_snapshot_is_built_from_primary(app, build, client, login):
+    with app.app_context():
+        admin_id = _graded_section(build, score=9)
+    # Replica chưa nhận được điểm mới: cùng dữ liệu nhưng điểm cũ
+    _copy_to_replica(app, db.metadata.tables['grades'].update().values(score=2))
+
+    login('admin', admin_id)
+    response = client.get('/admin/reports')
+    assert response.status_code == 200
+
+    with app.app_context():
+        snapshot = db.session.get(ReportSnapshot, GRADE_REPORT)
+        assert json.loads(snapshot.payload)['avg_score'] == 9
+    with client.session_transaction() as sess:
+        assert PRIMARY_UNTIL_KEY not in sess  # lưu ảnh chụp không phải thao tác ghi của người dùng
@@ -0,0 +1,64 @@
+import json
+import logging
+
+import pytest
+
+from academic_system import create_app
+from academic_system.models import db
+
+from conftest import TestConfig
+
+class MetricsConfig(TestConfig):
+    SQL_METRICS_ENABLED = True
+    SQL_N_PLUS_ONE_THRESHOLD = 3
+
+@pytest.fixture
+def app():
+    return create_app(MetricsConfig)
+
+def _logged(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records
+            if record.name == 'academic_system.sql_metrics' and record.levelno == logging.INFO]
+
+def test_metrics_are_off_by_default():
+    assert 'X-DB-Queries' not in create_app(TestConfig).test_client().get('/login').headers
+
+def test_summary_is_logged_without_logging_setup(app, client, caplog):
+    assert logging.getLogger('academic_system.sql_metrics').isEnabledFor(logging.INFO)
+    with caplog.at_level(logging.NOTSET):
+        response = client.get('/login')
+    assert response.headers['X-DB-Queries'] == '0'
+    assert _logged(caplog)[-1]['endpoint'] == 'auth.login'
+
+def test_streamed_export_queries_are_logged_on_close(app, build, client, login, caplog):
+    with app.app_context():
+        semester = build.semester()
+        section = build.section(build.instructor(), semester)
+        build.enroll(build.student(), section, score=8)
+        admin_id = build.admin().id
+        db.session.commit()
+    login('admin', admin_id)
+
+    with caplog.at_level(logging.NOTSET):
+        response = client.get('/admin/reports/grades/export.csv')
+        header_count = int(response.headers['X-DB-Queries'])
+        assert not _logged(caplog)  # chưa gửi xong body
+        response.get_data()
+        response.close()
+    logged = _logged(caplog)
+    assert logged[-1]['endpoint'] == 'admin.export_grades'
+    assert logged[-1]['queries'] >= header_count
+
+def test_repeated_statements_are_flagged(app, client, caplog):
+    @app.route('/_n_plus_one')
+    def n_plus_one():
+        # Cùng dạng câu lệnh, khác tham số và độ dài danh sách IN
+        for size in range(1, 6):
+            db.session.execute(db.text(f'SELECT 1 WHERE 1 IN ({", ".join(":p%d" % i for i in range(size))})'),
+                               {f'p{i}': i for i in range(size)})
+        return 'ok'
+
+    with caplog.at_level(logging.NOTSET):
+        client.get('/_n_plus_one')
+    warnings = [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+    assert any('Nghi vấn N+1' in message for message in warnings)
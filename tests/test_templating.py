@@ -0,0 +1,28 @@
+import os
+import stat
+
+from academic_system import create_app
+from academic_system.templating import init_template_cache, template_cache_dir
+
+from conftest import TestConfig
+
+def _app(tmp_path, **config):
+    app = create_app(TestConfig)
+    app.instance_path = str(tmp_path)
+    app.config.update(config)
+    return app
+
+def test_bytecode_cache_defaults_to_private_instance_folder(tmp_path):
+    app = _app(tmp_path, TEMPLATE_CACHE_ENABLED=True, TEMPLATE_CACHE_DIR='')
+    init_template_cache(app)
+
+    cache_dir = os.path.join(str(tmp_path), 'jinja_cache')
+    assert app.jinja_options['bytecode_cache'].directory == cache_dir
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) & 0o077 == 0
+
+def test_bytecode_cache_can_be_disabled(tmp_path):
+    app = _app(tmp_path, TEMPLATE_CACHE_ENABLED=False, TEMPLATE_CACHE_DIR=str(tmp_path / 'cache'))
+    init_template_cache(app)
+    assert template_cache_dir(app) is None
+    assert 'bytecode_cache' not in app.jinja_options
+    assert not os.path.exists(tmp_path / 'cache')